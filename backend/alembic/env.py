@@ -17,7 +17,9 @@ from app.db.base import Base
 from app.models.user import User
 from app.models.book import Book
 from app.models.review import Review
-from app.models.document import Document
+from app.models.document import Document, IngestionJob, IngestionRun
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.models.llm_response_cache import LLMResponseCacheEntry
 from app.core.config import settings
 
 config = context.config
@@ -0,0 +1,47 @@
+"""Add typed book columns to document_chunks
+
+Revision ID: 03be2f3a4b5c
+Revises: f2ad1e2f3a4b
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '03be2f3a4b5c'
+down_revision = 'f2ad1e2f3a4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('book_id', sa.Integer(), nullable=True))
+    op.add_column('document_chunks', sa.Column('genre', sa.String(), nullable=True))
+    op.add_column('document_chunks', sa.Column('author', sa.String(), nullable=True))
+    op.add_column('document_chunks', sa.Column('year_published', sa.Integer(), nullable=True))
+    # Backfill from the linked book of each chunk's document
+    op.execute("""
+        UPDATE document_chunks AS dc
+        SET book_id = b.id, genre = b.genre, author = b.author, year_published = b.year_published
+        FROM documents AS d
+        JOIN books AS b ON b.id = d.book_id
+        WHERE dc.document_id = d.id
+    """)
+    op.create_index(op.f('ix_document_chunks_book_id'), 'document_chunks', ['book_id'], unique=False)
+    # Filters compare case-insensitively
+    op.create_index('ix_document_chunks_genre_lower', 'document_chunks', [sa.text('lower(genre)')], unique=False)
+    op.create_index('ix_document_chunks_author_lower', 'document_chunks', [sa.text('lower(author)')], unique=False)
+    op.create_index(op.f('ix_document_chunks_year_published'), 'document_chunks', ['year_published'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_chunks_year_published'), table_name='document_chunks')
+    op.drop_index('ix_document_chunks_author_lower', table_name='document_chunks')
+    op.drop_index('ix_document_chunks_genre_lower', table_name='document_chunks')
+    op.drop_index(op.f('ix_document_chunks_book_id'), table_name='document_chunks')
+    op.drop_column('document_chunks', 'year_published')
+    op.drop_column('document_chunks', 'author')
+    op.drop_column('document_chunks', 'genre')
+    op.drop_column('document_chunks', 'book_id')
@@ -0,0 +1,36 @@
+"""Add full-text search column to document_chunks
+
+Revision ID: 14cf3a4b5c6d
+Revises: 03be2f3a4b5c
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14cf3a4b5c6d'
+down_revision = '03be2f3a4b5c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Generated, so every write path (ORM, bulk INSERT, COPY) keeps it current.
+    # The 'english' configuration must match TEXT_SEARCH_CONFIG in rag_service.
+    op.execute(
+        "ALTER TABLE document_chunks ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_chunks_content_tsv "
+            "ON document_chunks USING gin (content_tsv)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_document_chunks_content_tsv")
+    op.drop_column('document_chunks', 'content_tsv')
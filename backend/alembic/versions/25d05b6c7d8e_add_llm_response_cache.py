@@ -0,0 +1,35 @@
+"""Add llm_response_cache
+
+Revision ID: 25d05b6c7d8e
+Revises: 14cf3a4b5c6d
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '25d05b6c7d8e'
+down_revision = '14cf3a4b5c6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('llm_response_cache',
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('task', sa.String(), nullable=False),
+    sa.Column('template_version', sa.Integer(), nullable=False),
+    sa.Column('input_hash', sa.String(length=64), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('model', 'task', 'template_version', 'input_hash')
+    )
+    op.create_index(op.f('ix_llm_response_cache_last_used_at'), 'llm_response_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_llm_response_cache_last_used_at'), table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
@@ -0,0 +1,37 @@
+"""Add review summary upkeep columns to books
+
+Revision ID: 36e06c7d8e9f
+Revises: 25d05b6c7d8e
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36e06c7d8e9f'
+down_revision = '25d05b6c7d8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('review_summary_dirty_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('books', sa.Column('review_summary_review_id', sa.Integer(), nullable=True))
+    op.add_column('books', sa.Column('review_summary_updates', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('review_summary_rebuild', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_index(op.f('ix_books_review_summary_dirty_at'), 'books', ['review_summary_dirty_at'], unique=False)
+    # Books with reviews but no summary get one from the refresher
+    op.execute(
+        "UPDATE books SET review_summary_dirty_at = now() "
+        "WHERE ai_review_summary IS NULL AND EXISTS (SELECT 1 FROM reviews WHERE reviews.book_id = books.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_books_review_summary_dirty_at'), table_name='books')
+    op.drop_column('books', 'review_summary_rebuild')
+    op.drop_column('books', 'review_summary_updates')
+    op.drop_column('books', 'review_summary_review_id')
+    op.drop_column('books', 'review_summary_dirty_at')
@@ -0,0 +1,26 @@
+"""Add updated_at to document chunks
+
+Revision ID: 47a08f9e0a1b
+Revises: 36e06c7d8e9f
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47a08f9e0a1b'
+down_revision = '36e06c7d8e9f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_document_chunks_updated_at'), 'document_chunks', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_chunks_updated_at'), table_name='document_chunks')
+    op.drop_column('document_chunks', 'updated_at')
@@ -0,0 +1,24 @@
+"""Add page_number to document_chunks
+
+Revision ID: 8b3c4d5e6f7a
+Revises: 7a2b3c4d5e6f
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3c4d5e6f7a'
+down_revision = '7a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('page_number', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('document_chunks', 'page_number')
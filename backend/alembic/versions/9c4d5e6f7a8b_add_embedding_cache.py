@@ -0,0 +1,34 @@
+"""Add embedding_cache
+
+Revision ID: 9c4d5e6f7a8b
+Revises: 8b3c4d5e6f7a
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d5e6f7a8b'
+down_revision = '8b3c4d5e6f7a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.Vector(dim=1536), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('model', 'text_hash')
+    )
+    op.create_index(op.f('ix_embedding_cache_last_used_at'), 'embedding_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_embedding_cache_last_used_at'), table_name='embedding_cache')
+    op.drop_table('embedding_cache')
@@ -0,0 +1,30 @@
+"""Add chunk content_hash and document ingest_report
+
+Revision ID: ad5e6f7a8b9c
+Revises: 9c4d5e6f7a8b
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ad5e6f7a8b9c'
+down_revision = '9c4d5e6f7a8b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_document_chunks_document_id'), 'document_chunks', ['document_id'], unique=False)
+    op.add_column('documents', sa.Column('ingest_report', sa.Text(), nullable=True))
+    # Backfill hashes so existing chunks can be reused by incremental re-ingest
+    op.execute("UPDATE document_chunks SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'ingest_report')
+    op.drop_index(op.f('ix_document_chunks_document_id'), table_name='document_chunks')
+    op.drop_column('document_chunks', 'content_hash')
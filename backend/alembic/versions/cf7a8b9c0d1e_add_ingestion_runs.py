@@ -0,0 +1,46 @@
+"""Add ingestion_runs
+
+Revision ID: cf7a8b9c0d1e
+Revises: be6f7a8b9c0d
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf7a8b9c0d1e'
+down_revision = 'be6f7a8b9c0d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ingestion_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('mode', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_seconds', sa.Float(), nullable=False),
+    sa.Column('file_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('text_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('pages', sa.Integer(), nullable=False),
+    sa.Column('chunks', sa.Integer(), nullable=False),
+    sa.Column('tokens', sa.BigInteger(), nullable=False),
+    sa.Column('stages', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ingestion_runs_id'), 'ingestion_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_ingestion_runs_document_id'), 'ingestion_runs', ['document_id'], unique=False)
+    op.create_index(op.f('ix_ingestion_runs_created_at'), 'ingestion_runs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ingestion_runs_created_at'), table_name='ingestion_runs')
+    op.drop_index(op.f('ix_ingestion_runs_document_id'), table_name='ingestion_runs')
+    op.drop_index(op.f('ix_ingestion_runs_id'), table_name='ingestion_runs')
+    op.drop_table('ingestion_runs')
@@ -0,0 +1,29 @@
+"""Add content_hash and file_size to documents
+
+Revision ID: d08b9c0d1e2f
+Revises: cf7a8b9c0d1e
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd08b9c0d1e2f'
+down_revision = 'cf7a8b9c0d1e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing documents keep their filename-based paths and have no hash
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_documents_content_hash'), 'documents', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_content_hash'), table_name='documents')
+    op.drop_column('documents', 'file_size')
+    op.drop_column('documents', 'content_hash')
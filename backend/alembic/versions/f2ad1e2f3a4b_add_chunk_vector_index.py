@@ -0,0 +1,40 @@
+"""Add ANN index on document_chunks.embedding
+
+Revision ID: f2ad1e2f3a4b
+Revises: d08b9c0d1e2f
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.vector_index import INDEX_METHODS, OPERATOR_CLASSES, create_index_sql, drop_index_sql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2ad1e2f3a4b'
+down_revision = 'd08b9c0d1e2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built for the configured VECTOR_INDEX / VECTOR_DISTANCE; use
+    # scripts/rebuild_vector_index.py to switch later.
+    rows = 0
+    if settings.VECTOR_INDEX == "ivfflat":
+        # IVFFlat picks its list centroids from the rows present at build time
+        rows = op.get_bind().execute(sa.text("SELECT count(*) FROM document_chunks")).scalar()
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute(create_index_sql(
+            "document_chunks", "embedding", settings.VECTOR_INDEX, settings.VECTOR_DISTANCE, rows=rows
+        ))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for method in INDEX_METHODS:
+            for metric in OPERATOR_CLASSES:
+                op.execute(drop_index_sql("document_chunks", "embedding", method, metric))
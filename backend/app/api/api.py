@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import login, users, books, reviews, ai, documents
+from app.api.endpoints import login, users, books, reviews, ai, documents, metrics
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -9,3 +9,4 @@ api_router.include_router(books.router, prefix="/books", tags=["books"])
 api_router.include_router(reviews.router, prefix="/reviews", tags=["reviews"])
 api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
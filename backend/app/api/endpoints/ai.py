@@ -6,6 +6,7 @@ from sqlalchemy import select
 from app.services.llm_service import llm_service
 from app.services.rag_service import RAGService
 from app.models.document import Document
+from app.schemas.document import ChunkFilter
 from app.api import deps
 from app.db.session import get_db
 
@@ -15,12 +16,14 @@ router = APIRouter()
 async def generate_summary(
     book_id: Optional[int] = Body(None),
     text: Optional[str] = Body(None),
+    use_cache: bool = Body(True),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Generate a summary for a given book. 
     Prefers RAG if book_id and document are provided.
+    Summaries are cached; set use_cache to false to generate a fresh one.
     """
     if book_id:
         # Check for ingested document
@@ -32,18 +35,17 @@ async def generate_summary(
         if doc:
             rag_service = RAGService(db)
             # Use RAG to pull key chunks for a summary
-            chunks = await rag_service.search_similar_chunks("Provide a comprehensive summary of this book", book_title=None, limit=5)
-            context = "\n\n".join([c.content for c in chunks])
-            
-            prompt = f"Based on the following excerpts from the book, provide a concise summary:\n\n{context}"
-            summary = await llm_service.llm.ainvoke(prompt)
-            return {"summary": summary.content}
+            chunks = await rag_service.search_similar_chunks(
+                "Provide a comprehensive summary of this book", limit=5, filters=ChunkFilter(book_ids=[book_id])
+            )
+            summary = await llm_service.summarize_excerpts([c.content for c in chunks], db.bind, cache=use_cache)
+            return {"summary": summary}
         else:
             return {"error": "Please upload and ingest the book document first to generate an accurate summary."}
 
     if text:
         # Fallback for manual text summary
-        summary = await llm_service.generate_summary(text)
+        summary = await llm_service.generate_summary(text, db.bind, cache=use_cache)
         return {"summary": summary}
         
     raise HTTPException(status_code=400, detail="Either book_id or text must be provided")
\ No newline at end of file
@@ -1,15 +1,16 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 
+from app.core.config import settings
 from app.crud.crud_book import book as crud_book
 from app.api import deps
 from app.schemas.book import Book, BookCreate, BookUpdate
 from app.db.session import get_db
 from app.models.book import Book as BookModel
 from app.models.review import Review
-from app.services.llm_service import llm_service
+from app.services.review_summaries import refresh_review_summary
 
 from app.services.recommendation_service import RecommendationService
 
@@ -77,33 +78,44 @@ async def get_book_summary_ai(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Get reviews
-    result = await db.execute(select(Review).where(Review.book_id == id))
-    reviews = result.scalars().all()
+    # Aggregated in SQL: loading every review (and its embedding) is slow for popular books
+    result = await db.execute(
+        select(func.count(Review.id), func.count(Review.review_text), func.avg(Review.rating)).where(Review.book_id == id)
+    )
+    review_count, text_count, avg_rating = result.one()
     
-    if not reviews:
+    if not review_count:
         return {
             "summary": book.summary or "No summary available.",
             "review_summary": "No reviews yet.",
             "average_rating": 0
         }
     
-    avg_rating = sum([r.rating for r in reviews]) / len(reviews)
-    
+    # Stale while revalidating: the refresher updates the summary after review writes
+    stale = book.review_summary_dirty_at is not None
+    if not settings.REVIEW_SUMMARY_BACKGROUND and (stale or not book.ai_review_summary):
+        full = book.review_summary_rebuild
+        book.review_summary_dirty_at = None
+        book.review_summary_rebuild = False
+        await refresh_review_summary(db, book, full=full)
+        stale = False
+    elif not book.ai_review_summary and not stale and text_count:
+        # Reviewed before summaries were maintained in the background
+        await crud_book.mark_review_summary_stale(db, book_id=id)
+        stale = True
+
     if book.ai_review_summary:
         review_summary = book.ai_review_summary
+    elif stale:
+        review_summary = "The review summary is being generated."
     else:
-        review_texts = [r.review_text for r in reviews if r.review_text]
         review_summary = "No detailed reviews to summarize."
-        if review_texts:
-            review_summary = await llm_service.generate_review_summary(review_texts)
-            # Cache the summary
-            await crud_book.update(db, db_obj=book, obj_in={"ai_review_summary": review_summary})
         
     return {
         "summary": book.summary,
         "review_summary": review_summary,
-        "average_rating": avg_rating
+        "review_summary_stale": stale,
+        "average_rating": float(avg_rating)
     }
 
 @router.get("/{id}", response_model=Book)
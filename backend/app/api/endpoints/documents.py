@@ -1,22 +1,27 @@
-import os
-import shutil
+import asyncio
+import json
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.crud_document import document as crud_document
+from app.crud.crud_ingestion_job import ingestion_job as crud_ingestion_job
+from app.crud.crud_ingestion_run import ingestion_run as crud_ingestion_run
 from app.api import deps
 from app.schemas.document import Document, DocumentCreate, ChatQuery, ChatResponse
+from app.schemas.ingestion_job import IngestionJob, QueueDepth
+from app.schemas.ingestion_run import IngestionRun
 from app.db.session import get_db
-from app.services.ingestion_service import IngestionService
 from app.services.rag_service import RAGService
+from app.services.storage import storage, UploadTooLarge
+from app.services.vector_store import get_vector_store
+from app.services.answer_cache import answer_cache
+from app.services.chat_metrics import chat_metrics
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
 @router.post("/upload", response_model=Document)
 async def upload_document(
     file: UploadFile = File(...),
@@ -26,17 +31,20 @@ async def upload_document(
 ) -> Any:
     """
     Upload a document and optionally link it to a book.
+    Files are stored by content hash, so re-uploading the same file does not store it twice.
     """
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    doc_in = DocumentCreate(filename=file.filename, file_path=file_path)
+    try:
+        stored = await storage.save(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
     # Use a manual create or update crud to handle book_id since it's extra
     from app.models.document import Document as DocumentModel
     db_obj = DocumentModel(
         filename=file.filename,
-        file_path=file_path,
+        file_path=stored.path,
+        content_hash=stored.sha256,
+        file_size=stored.size,
         book_id=book_id
     )
     db.add(db_obj)
@@ -44,35 +52,73 @@ async def upload_document(
     await db.refresh(db_obj)
     return db_obj
 
-from app.db.session import get_db, AsyncSessionLocal
-
-async def run_ingestion(document_id: int):
-    async with AsyncSessionLocal() as session:
-        ingestion_service = IngestionService(session)
-        await ingestion_service.ingest_document(document_id)
+INGESTION_MODES = ("full", "incremental")
 
 @router.post("/{id}/ingest", response_model=Document)
 async def ingest_document(
     id: int,
-    background_tasks: BackgroundTasks,
+    mode: str = "full",
+    priority: int = 0,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Trigger ingestion for a document.
+    Queue ingestion for a document. Jobs are run by the ingestion worker (worker.py).
+    Use mode=incremental to refresh an ingested document, re-embedding only changed chunks.
     """
+    if mode not in INGESTION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(INGESTION_MODES)}")
+
     from app.models.document import Document as DocumentModel
     doc = await db.get(DocumentModel, id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    doc.status = "processing"
-    await db.commit()
-    
-    background_tasks.add_task(run_ingestion, id)
-    
+    conflict = HTTPException(status_code=409, detail="Ingestion is already queued or running for this document")
+    if await crud_ingestion_job.get_active_for_document(db, document_id=id):
+        raise conflict
+    try:
+        await crud_ingestion_job.enqueue(db, document_id=id, mode=mode, priority=priority)
+    except IntegrityError:
+        # A concurrent request enqueued first; the unique index on active jobs kept it to one
+        await db.rollback()
+        raise conflict
+    await db.refresh(doc)
     return doc
 
+@router.get("/queue", response_model=QueueDepth)
+async def read_queue_depth(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Number of queued and running ingestion jobs.
+    """
+    return await crud_ingestion_job.queue_depth(db)
+
+@router.get("/{id}/jobs", response_model=List[IngestionJob])
+async def read_document_jobs(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Ingestion jobs for a document, newest first, with progress (chunks_done / chunks_total).
+    """
+    return await crud_ingestion_job.get_multi_by_document(db, document_id=id)
+
+@router.get("/{id}/runs", response_model=List[IngestionRun])
+async def read_document_runs(
+    id: int,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Ingestion runs for a document, newest first, with per-stage timings and throughput.
+    """
+    return await crud_ingestion_run.get_multi_by_document(db, document_id=id, limit=limit)
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     query: ChatQuery,
@@ -86,6 +132,49 @@ async def chat(
     answer, sources = await rag_service_inst.answer_question(query.question)
     return {"answer": answer, "sources": sources}
 
+def sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    query: ChatQuery,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Ask a question and receive the answer as server-sent events: `sources`
+    as soon as retrieval is done, `token` events as the answer is generated,
+    then `done` with the timings (or `error`).
+    """
+    bind = db.bind
+
+    async def events():
+        # The request's session is closed before a streaming body is sent, so use our own
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            rag_service_inst = RAGService(session)
+            answer = rag_service_inst.stream_answer(query.question)
+            try:
+                async for event, data in answer:
+                    yield sse(event, data)
+                info = rag_service_inst.last_answer
+                yield sse("done", {key: info.get(key) for key in ("intent", "cached", "ttfb", "ttft", "seconds", "context_tokens", "context_tokens_saved")})
+            except asyncio.CancelledError:
+                # Starlette cancels the response when the client disconnects
+                chat_metrics.count_disconnect()
+                raise
+            except Exception as e:
+                print(f"Error streaming chat answer: {e}")
+                yield sse("error", {"detail": "Failed to answer the question"})
+            finally:
+                # Stops the upstream LLM generation if it is still running
+                await answer.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/", response_model=List[Document])
 async def read_documents(
     db: AsyncSession = Depends(get_db),
@@ -103,17 +192,18 @@ async def delete_document(
     current_user = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Delete a document and its file.
+    Delete a document, and its file if no other document shares it.
     """
     from app.models.document import Document as DocumentModel
     doc = await db.get(DocumentModel, id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-    
-    # Remove file from filesystem
-    if os.path.exists(doc.file_path):
-        os.remove(doc.file_path)
-    
+
     await db.delete(doc)
     await db.commit()
+    await get_vector_store().delete_document(db, id)
+    answer_cache.invalidate(book_ids=[doc.book_id] if doc.book_id else [], document_ids=[id])
+
+    # Remove file from filesystem once nothing references it
+    await storage.release(db, doc.file_path)
     return doc
\ No newline at end of file
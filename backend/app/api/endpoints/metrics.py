@@ -0,0 +1,96 @@
+from typing import Any
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.crud.crud_ingestion_job import ingestion_job as crud_ingestion_job
+from app.crud.crud_ingestion_run import ingestion_run as crud_ingestion_run
+from app.db.session import get_db
+from app.services.batch_embedder import batch_embedder
+from app.services.embedding_cache import embedding_cache
+from app.services.ingestion_metrics import render_prometheus
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.llm_cache import llm_response_cache
+from app.services.chat_metrics import chat_metrics
+from app.services.llm_gateway import llm_gateway
+
+router = APIRouter()
+
+async def metrics_access(request: Request, db: AsyncSession = Depends(get_db)):
+    """Requires an active user unless METRICS_PUBLIC is set."""
+    if settings.METRICS_PUBLIC:
+        return None
+    token = await deps.reusable_oauth2(request)
+    return await deps.get_current_active_user(await deps.get_current_user(db, token))
+
+@router.get("", response_class=PlainTextResponse)
+async def read_metrics(db: AsyncSession = Depends(get_db), current_user = Depends(metrics_access)) -> Any:
+    """
+    Prometheus exporter. Ingestion totals and per-stage timings come from
+    the ingestion_runs table, so they cover every worker process; embedding
+    cache and batch counters are for this API process only. Needs a login
+    unless METRICS_PUBLIC is set.
+    """
+    totals = await crud_ingestion_run.totals(db)
+    stages = await crud_ingestion_run.recent_stage_totals(db, window=settings.INGESTION_METRICS_WINDOW)
+    depth = await crud_ingestion_job.queue_depth(db)
+
+    def by_run(key):
+        return [({"mode": t["mode"], "status": t["status"]}, t[key]) for t in totals]
+
+    def by_stage(key):
+        return [({"stage": stage}, entry[key]) for stage, entry in stages.items() if key in entry]
+
+    cache = embedding_cache.stats()
+    query_cache = query_embedding_cache.stats()
+    answers = answer_cache.stats()
+    responses = llm_response_cache.stats()
+    metrics = [
+        ("ingestion_runs_total", "counter", "Ingestion runs recorded.", by_run("runs")),
+        ("ingestion_seconds_total", "counter", "Wall-clock seconds spent in ingestion runs.", by_run("seconds")),
+        ("ingestion_file_bytes_total", "counter", "Source file bytes ingested.", by_run("file_bytes")),
+        ("ingestion_pages_total", "counter", "PDF pages ingested.", by_run("pages")),
+        ("ingestion_chunks_total", "counter", "Chunks ingested.", by_run("chunks")),
+        ("ingestion_tokens_total", "counter", "Estimated tokens ingested.", by_run("tokens")),
+        ("ingestion_stage_seconds", "gauge", "Busy seconds per stage over recent successful runs.", by_stage("seconds")),
+        ("ingestion_stage_calls", "gauge", "Calls per stage over recent successful runs.", by_stage("calls")),
+        ("ingestion_stage_chunks", "gauge", "Chunks handled per stage over recent successful runs.", by_stage("chunks")),
+        ("ingestion_stage_tokens", "gauge", "Estimated tokens handled per stage over recent successful runs.", by_stage("tokens")),
+        ("ingestion_queue_jobs", "gauge", "Ingestion jobs by queue status.", [({"status": k}, v) for k, v in depth.items()]),
+        ("embedding_cache_lookups_total", "counter", "Embedding cache lookups in this process.",
+            [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+        ("embedding_cache_writes_total", "counter", "Embedding cache entries written by this process.", [({}, cache["writes"])]),
+        ("embedding_cache_evicted_total", "counter", "Embedding cache entries evicted by this process.", [({}, cache["evicted"])]),
+        ("query_embedding_cache_lookups_total", "counter", "Query embedding cache lookups in this process.",
+            [({"result": "hit"}, query_cache["hits"]), ({"result": "miss"}, query_cache["misses"])]),
+        ("query_embedding_cache_entries", "gauge", "Query embeddings held in this process.", [({}, query_cache["size"])]),
+        ("answer_cache_lookups_total", "counter", "Semantic answer cache lookups in this process.",
+            [({"result": "hit"}, answers["hits"]), ({"result": "miss"}, answers["misses"])]),
+        ("answer_cache_stale_total", "counter", "Cached answers dropped because their documents changed.", [({}, answers["stale"])]),
+        ("answer_cache_seconds_saved_total", "counter", "Answer latency saved by cache hits in this process.", [({}, answers["seconds_saved"])]),
+        ("llm_response_cache_lookups_total", "counter", "LLM response cache lookups in this process.",
+            [({"result": "hit"}, responses["hits"]), ({"result": "miss"}, responses["misses"])]),
+        ("llm_response_cache_writes_total", "counter", "LLM responses cached by this process.", [({}, responses["writes"])]),
+        ("llm_response_cache_evicted_total", "counter", "LLM response cache entries evicted by this process.", [({}, responses["evicted"])]),
+        ("embedding_batches_total", "counter", "Embedding batches sent by this process.", [({}, batch_embedder.batches)]),
+        ("embedding_batch_retries_total", "counter", "Embedding batch retries in this process.", [({}, batch_embedder.retries)]),
+        ("embedding_batch_failures_total", "counter", "Embedding batches that exhausted their retries.", [({}, batch_embedder.failures)]),
+    ]
+    metrics += chat_metrics.prometheus()
+
+    upstream = {model: stats.as_dict() for model, stats in llm_gateway.stats.items()}
+    def by_model(key):
+        return [({"model": model}, stats[key]) for model, stats in upstream.items()]
+    metrics += [
+        ("llm_requests_total", "counter", "Requests sent to the model provider by this process.", by_model("requests")),
+        ("llm_coalesced_requests_total", "counter", "Requests served by an identical request already in flight.", by_model("coalesced")),
+        ("llm_request_errors_total", "counter", "Upstream requests that failed.", by_model("errors")),
+        ("llm_queue_wait_seconds_total", "counter", "Seconds spent waiting for a per-model concurrency slot.", by_model("queue_seconds")),
+        ("llm_upstream_seconds_total", "counter", "Seconds spent waiting on the model provider.", by_model("upstream_seconds")),
+        ("llm_requests_waiting", "gauge", "Requests queued for a concurrency slot.", by_model("waiting")),
+        ("llm_requests_in_flight", "gauge", "Requests currently upstream.", by_model("in_flight")),
+    ]
+    return render_prometheus(metrics)
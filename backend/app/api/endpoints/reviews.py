@@ -55,8 +55,8 @@ async def create_review(
         db, obj_in=review_in, book_id=book_id, user_id=current_user.id
     )
     
-    # Invalidate AI summary
-    await crud_book.update(db, db_obj=book, obj_in={"ai_review_summary": None})
+    # The AI summary is refreshed in the background; reads serve the old one until then
+    await crud_book.mark_review_summary_stale(db, book_id=book_id)
     
     return review
 
@@ -77,11 +77,10 @@ async def delete_review(
     if not current_user.is_superuser and (review.user_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
         
-    book = await crud_book.get(db, id=review.book_id)
+    book_id = review.book_id
     await crud_review.remove(db, id=review_id)
     
-    # Invalidate AI summary
-    if book:
-         await crud_book.update(db, db_obj=book, obj_in={"ai_review_summary": None})
+    # The AI summary is rebuilt in the background; reads serve the old one until then
+    await crud_book.mark_review_summary_stale(db, book_id=book_id, deleted=True)
          
     return review
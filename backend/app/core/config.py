@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, computed_field
-from typing import Optional, List
+from typing import Dict, Optional, List
 import os
 
 class Settings(BaseSettings):
@@ -29,7 +29,140 @@ class Settings(BaseSettings):
     USERS_OPEN_REGISTRATION: bool = True
     
     OPENROUTER_API_KEY: Optional[str] = None
-    
+
+    # Model provider, reached through app.services.llm_gateway. "fake" runs offline
+    # (app.services.fake_providers): for tests and benchmarks, not for real answers.
+    LLM_PROVIDER: str = "openrouter" # openrouter or fake
+    EMBEDDING_PROVIDER: str = "openrouter" # openrouter or fake
+    LLM_BASE_URL: str = "https://openrouter.ai/api/v1"
+    LLM_MODEL: str = "meta-llama/llama-3.3-70b-instruct:free"
+    EMBEDDING_MODEL: str = "openai/text-embedding-3-small"
+    LLM_REQUEST_TIMEOUT: float = 120.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_SECONDS: float = 30.0
+    # Concurrent upstream requests per model and process; LLM_MODEL_CONCURRENCY overrides by model name
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {}
+    # Simulated upstream timing of the fake providers
+    FAKE_LLM_LATENCY_SECONDS: float = 0.0 # Before the first token
+    FAKE_LLM_TOKENS_PER_SECOND: float = 0.0 # 0: the whole reply at once
+    FAKE_LLM_RESPONSE_TOKENS: int = 64
+    FAKE_EMBEDDING_LATENCY_SECONDS: float = 0.0 # Per request
+    # Temperature of deterministic tasks (summaries, routing), whose responses are cached
+    LLM_CACHED_TEMPERATURE: float = 0.0
+
+    # Persistent cache of deterministic LLM responses
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_DAYS: int = 30
+    LLM_CACHE_MAX_ENTRIES: int = 100_000
+    LLM_CACHE_EVICT_EVERY: int = 1000
+
+    # Ingestion pipeline
+    INGESTION_CHUNK_SIZE: int = 1000
+    INGESTION_CHUNK_OVERLAP: int = 200
+    INGESTION_BATCH_SIZE: int = 64
+    INGESTION_PAGES_PER_TASK: int = 32
+    # Write chunk batches with COPY on Postgres instead of multi-row INSERT
+    CHUNK_BULK_COPY: bool = True
+
+    # Embedding requests: one batch of INGESTION_BATCH_SIZE chunks per request
+    EMBEDDING_MAX_BATCHES_IN_FLIGHT: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_RETRY_BASE_DELAY: float = 0.5
+    EMBEDDING_RETRY_MAX_DELAY: float = 30.0
+
+    # Content-hash embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_TTL_DAYS: int = 90
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 1_000_000
+    EMBEDDING_CACHE_EVICT_EVERY: int = 5000
+
+    # Vector search. The index built by the migrations (and scripts/rebuild_vector_index.py)
+    # must use the same method and distance, or queries fall back to a sequential scan.
+    VECTOR_INDEX: str = "hnsw" # hnsw or ivfflat
+    VECTOR_DISTANCE: str = "cosine" # cosine or l2
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_PROBES: int = 10
+    # pgvector >= 0.8 (ignored on older versions): keep scanning the HNSW graph until filtered queries fill their LIMIT
+    HNSW_ITERATIVE_SCAN: str = "strict_order" # off, strict_order or relaxed_order
+
+    # Where vector search runs: pgvector (in Postgres) or numpy (exact search in the API process)
+    VECTOR_STORE: str = "pgvector"
+    # Directory the numpy store is loaded from (memory-mapped) and saved to on shutdown
+    VECTOR_STORE_PATH: Optional[str] = None
+    VECTOR_STORE_SYNC_SECONDS: float = 5.0
+    VECTOR_STORE_SYNC_OVERLAP: int = 5000
+    # Metadata UPDATEs (book edits, re-ingests) are re-read if committed within this long of running
+    VECTOR_STORE_SYNC_LOOKBACK_SECONDS: float = 60.0
+
+    # Retrieval for chat: vector, lexical or hybrid (both, merged with reciprocal-rank fusion)
+    RAG_RETRIEVAL_MODE: str = "hybrid"
+    RAG_HYBRID_CANDIDATES: int = 20 # Hits taken from each leg before fusion
+    RAG_RRF_K: int = 60
+    # Chat routing: "structured" extracts intent, title and filters in one LLM call;
+    # "sequential" is the older router + extraction calls, kept for latency comparisons
+    RAG_ROUTER: str = "structured"
+    # Start retrieval while the router is still deciding; the hits are used if the intent is CONTENT
+    RAG_SPECULATIVE_RETRIEVAL: bool = True
+    RAG_SPECULATIVE_CANDIDATES: int = 10 # Fetched up front so a title filter can still fill the context
+    RAG_SPECULATIVE_MAX_INFLIGHT: int = 16 # Per process; beyond this, questions wait for the router
+    # Token budgets of the QA prompt; neighbouring chunks are merged without their overlap first
+    RAG_CONTEXT_MAX_TOKENS: int = 3000
+    RAG_HISTORY_MAX_TOKENS: int = 1000
+    RAG_TOKENIZER: str = "cl100k_base" # tiktoken encoding; estimated from length if it cannot be loaded
+    # In-process LRU of query embeddings for chat and summaries
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 3600
+    # Reuse chat answers for near-identical questions while their source documents are unchanged
+    RAG_ANSWER_CACHE_ENABLED: bool = True
+    RAG_ANSWER_CACHE_SIMILARITY: float = 0.95 # Cosine similarity of the question embeddings
+    RAG_ANSWER_CACHE_SIZE: int = 2048
+    RAG_ANSWER_CACHE_TTL_SECONDS: float = 86400
+
+    # Map-reduce book summaries, generated while chunks are embedded
+    SUMMARY_SECTION_CHARS: int = 12000
+    SUMMARY_MAX_SECTIONS: int = 48
+    SUMMARY_REDUCE_FANOUT: int = 6
+    SUMMARY_MAX_CONCURRENCY: int = 4
+
+    # Durable ingestion queue (see worker.py)
+    INGESTION_WORKER_SLOTS: int = 2
+    INGESTION_WORKER_POLL_SECONDS: float = 2.0
+    INGESTION_JOB_LEASE_SECONDS: int = 120
+    INGESTION_JOB_HEARTBEAT_SECONDS: float = 15.0
+    INGESTION_JOB_MAX_ATTEMPTS: int = 3
+    # Run a worker inside the API process as well (handy for local development)
+    INGESTION_EMBEDDED_WORKER_SLOTS: int = 0
+    # Number of recent runs the /metrics per-stage gauges are computed over
+    INGESTION_METRICS_WINDOW: int = 100
+    # Serve /metrics without a login, for scrapers that cannot send a bearer token
+    METRICS_PUBLIC: bool = False
+
+    # AI review summaries, refreshed by worker.py after review writes; reads serve the
+    # previous summary meanwhile. False rebuilds a stale summary inline on the next read.
+    REVIEW_SUMMARY_BACKGROUND: bool = True
+    REVIEW_SUMMARY_DEBOUNCE_SECONDS: float = 30.0 # Writes within this window share one refresh
+    REVIEW_SUMMARY_POLL_SECONDS: float = 5.0
+    REVIEW_SUMMARY_BATCH_SIZE: int = 10 # Books refreshed per poll
+    REVIEW_SUMMARY_FULL_REBUILD_EVERY: int = 10 # Incremental updates before the next full rebuild
+    REVIEW_SUMMARY_EMBEDDED_REFRESHER: bool = False # Also refresh inside the API process
+
+    # Content-addressed upload storage
+    UPLOAD_DIR: str = "uploads"
+    MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    # Unreferenced files younger than this are kept, in case a duplicate upload is still committing
+    STORAGE_DELETE_GRACE_SECONDS: float = 5.0
+    # How often the ingestion worker deletes unreferenced files left by the grace period (0: never)
+    STORAGE_SWEEP_SECONDS: float = 300.0
+
+    # Executors for work that must not run on the event loop
+    CPU_PROCESS_WORKERS: int = max((os.cpu_count() or 2) - 1, 1)
+    IO_THREAD_WORKERS: int = 8
+
     @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
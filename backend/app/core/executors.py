@@ -0,0 +1,53 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_process_pool: Optional[Executor] = None
+_thread_pool: Optional[Executor] = None
+
+def get_process_pool() -> Executor:
+    """
+    Pool for CPU-bound work such as PDF parsing and text splitting.
+    With CPU_PROCESS_WORKERS=0 the work falls back to the I/O thread pool,
+    which still keeps it off the event loop but shares the GIL.
+    """
+    global _process_pool
+    if _process_pool is None:
+        if settings.CPU_PROCESS_WORKERS > 0:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.CPU_PROCESS_WORKERS)
+        else:
+            _process_pool = get_thread_pool()
+    return _process_pool
+
+def get_thread_pool() -> Executor:
+    """Pool for blocking file I/O."""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=settings.IO_THREAD_WORKERS,
+            thread_name_prefix="io",
+        )
+    return _thread_pool
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a picklable, module-level function on the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(fn, *args, **kwargs))
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking I/O call on the thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), functools.partial(fn, *args, **kwargs))
+
+def shutdown_executors(wait: bool = True):
+    global _process_pool, _thread_pool
+    if _process_pool is not None and _process_pool is not _thread_pool:
+        _process_pool.shutdown(wait=wait)
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=wait)
+    _process_pool = None
+    _thread_pool = None
@@ -1,8 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple, Union
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.crud.base import CRUDBase
 from app.models.book import Book
+from app.models.document import DocumentChunk
 from app.schemas.book import BookCreate, BookUpdate
 
+# Book columns that are copied onto document chunks for filtering
+CHUNK_COLUMNS = ("genre", "author", "year_published")
+
 class CRUDBook(CRUDBase[Book, BookCreate, BookUpdate]):
-    pass
+    async def update(
+        self, db: AsyncSession, *, db_obj: Book, obj_in: Union[BookUpdate, Dict[str, Any]]
+    ) -> Book:
+        book = await super().update(db, db_obj=db_obj, obj_in=obj_in)
+        # Keep the filter columns of already-ingested chunks in step with the book
+        await db.execute(
+            update(DocumentChunk)
+            .where(DocumentChunk.book_id == book.id)
+            .values({column: getattr(book, column) for column in CHUNK_COLUMNS})
+        )
+        await db.commit()
+        return book
+
+    async def mark_review_summary_stale(self, db: AsyncSession, *, book_id: int, deleted: bool = False):
+        """
+        Queue the book's review summary for a refresh. The first write since
+        the last refresh starts the debounce window; later writes join it.
+        """
+        values = {"review_summary_dirty_at": func.coalesce(Book.review_summary_dirty_at, datetime.now(timezone.utc))}
+        if deleted:
+            # A deleted review cannot be folded out of the summary
+            values["review_summary_rebuild"] = True
+        await db.execute(update(Book).where(Book.id == book_id).values(values))
+        await db.commit()
+
+    async def due_review_summaries(self, db: AsyncSession, *, limit: int) -> List[Tuple[int, datetime, bool]]:
+        """(book id, dirty_at, rebuild) of stale summaries whose debounce window has passed, oldest first."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.REVIEW_SUMMARY_DEBOUNCE_SECONDS)
+        result = await db.execute(
+            select(Book.id, Book.review_summary_dirty_at, Book.review_summary_rebuild)
+            .where(Book.review_summary_dirty_at <= cutoff)
+            .order_by(Book.review_summary_dirty_at)
+            .limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def claim_review_summary(self, db: AsyncSession, *, book_id: int, dirty_at: datetime, rebuild: bool) -> bool:
+        """
+        Take a due refresh by clearing its marker, unless another process
+        got there first. Writes after the claim mark the book again.
+        """
+        result = await db.execute(
+            update(Book)
+            .where(
+                Book.id == book_id,
+                Book.review_summary_dirty_at == dirty_at,
+                Book.review_summary_rebuild == rebuild,
+            )
+            .values(review_summary_dirty_at=None, review_summary_rebuild=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def release_review_summary(self, db: AsyncSession, *, book_id: int, dirty_at: datetime, rebuild: bool):
+        """Put back a claimed refresh that failed, so it is retried."""
+        values = {"review_summary_dirty_at": func.coalesce(Book.review_summary_dirty_at, dirty_at)}
+        if rebuild:
+            values["review_summary_rebuild"] = True
+        await db.execute(update(Book).where(Book.id == book_id).values(values))
+        await db.commit()
 
 book = CRUDBook(Book)
@@ -1,11 +1,41 @@
-from typing import List
+from typing import Any, Dict, List
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from app.crud.base import CRUDBase
+from app.core.config import settings
 from app.models.document import Document, DocumentChunk
 from app.schemas.document import DocumentCreate, DocumentBase
 
 class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentBase]):
     pass
 
+class CRUDDocumentChunk(CRUDBase[DocumentChunk, BaseModel, BaseModel]):
+    async def bulk_create(self, db: AsyncSession, *, rows: List[Dict[str, Any]], commit: bool = True) -> int:
+        """
+        Write chunk rows without creating ORM objects.
+
+        On Postgres the rows are streamed with a binary COPY; other databases
+        (the SQLite test engine) get a multi-row INSERT.
+        """
+        if not rows:
+            return 0
+        conn = await db.connection()
+        if conn.dialect.driver == "asyncpg" and settings.CHUNK_BULK_COPY:
+            columns = list(rows[0].keys())
+            # Run a statement first so the adapter has opened its transaction and the COPY is part of it
+            await conn.exec_driver_sql("SELECT 1")
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                self.model.__tablename__,
+                records=[tuple(row[c] for c in columns) for row in rows],
+                columns=columns,
+            )
+        else:
+            await conn.execute(insert(self.model.__table__), rows)
+        if commit:
+            await db.commit()
+        return len(rows)
+
 document = CRUDDocument(Document)
+document_chunk = CRUDDocumentChunk(DocumentChunk)
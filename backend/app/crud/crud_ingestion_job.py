@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from app.crud.base import CRUDBase
+from app.core.config import settings
+from app.models.document import Document, IngestionJob
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class CRUDIngestionJob(CRUDBase[IngestionJob, BaseModel, BaseModel]):
+    async def enqueue(
+        self, db: AsyncSession, *, document_id: int, mode: str = "full", priority: int = 0
+    ) -> IngestionJob:
+        job = IngestionJob(
+            document_id=document_id,
+            mode=mode,
+            status="queued",
+            priority=priority,
+            attempts=0,
+            max_attempts=settings.INGESTION_JOB_MAX_ATTEMPTS,
+            chunks_done=0,
+        )
+        db.add(job)
+        await db.execute(update(Document).where(Document.id == document_id).values(status="processing"))
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    async def get_active_for_document(self, db: AsyncSession, *, document_id: int) -> Optional[IngestionJob]:
+        result = await db.execute(
+            select(IngestionJob).where(
+                IngestionJob.document_id == document_id,
+                IngestionJob.status.in_(ACTIVE_STATUSES),
+            )
+        )
+        return result.scalars().first()
+
+    async def get_multi_by_document(self, db: AsyncSession, *, document_id: int, limit: int = 20) -> List[IngestionJob]:
+        result = await db.execute(
+            select(IngestionJob)
+            .where(IngestionJob.document_id == document_id)
+            .order_by(IngestionJob.id.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def lease(self, db: AsyncSession, *, worker_id: str, limit: int = 1) -> List[IngestionJob]:
+        """
+        Claim up to `limit` queued jobs, highest priority first. On Postgres
+        the rows are locked with FOR UPDATE SKIP LOCKED so concurrent workers
+        never claim the same job.
+        """
+        result = await db.execute(
+            select(IngestionJob)
+            .where(IngestionJob.status == "queued")
+            .order_by(IngestionJob.priority.desc(), IngestionJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = result.scalars().all()
+        now = _now()
+        for job in jobs:
+            job.status = "running"
+            job.worker_id = worker_id
+            job.attempts += 1
+            job.started_at = now
+            job.heartbeat_at = now
+            job.lease_expires_at = now + timedelta(seconds=settings.INGESTION_JOB_LEASE_SECONDS)
+            job.error = None
+        await db.commit()
+        return jobs
+
+    async def heartbeat(
+        self, db: AsyncSession, *, job_id: int, worker_id: str, chunks_done: int, chunks_total: Optional[int]
+    ) -> bool:
+        """Extend the lease and record progress. False means the lease was lost."""
+        now = _now()
+        result = await db.execute(
+            update(IngestionJob)
+            .where(
+                IngestionJob.id == job_id,
+                IngestionJob.worker_id == worker_id,
+                IngestionJob.status == "running",
+            )
+            .values(
+                heartbeat_at=now,
+                lease_expires_at=now + timedelta(seconds=settings.INGESTION_JOB_LEASE_SECONDS),
+                chunks_done=chunks_done,
+                chunks_total=chunks_total,
+            )
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def finish(
+        self,
+        db: AsyncSession,
+        *,
+        job_id: int,
+        worker_id: str,
+        chunks_done: int,
+        chunks_total: Optional[int],
+        error: Optional[str] = None,
+    ) -> Optional[IngestionJob]:
+        """Mark a job succeeded, or failed/requeued depending on attempts left."""
+        job = await db.get(IngestionJob, job_id, with_for_update=True)
+        if not job or job.worker_id != worker_id or job.status != "running":
+            return None
+        job.chunks_done = chunks_done
+        job.chunks_total = chunks_total
+        job.lease_expires_at = None
+        if error is None:
+            job.status = "succeeded"
+            job.finished_at = _now()
+        else:
+            self._retry_or_fail(job, error)
+            if job.status == "queued":
+                # ingest_document flagged the document as failed; it is going to be retried
+                await db.execute(update(Document).where(Document.id == job.document_id).values(status="processing"))
+        await db.commit()
+        return job
+
+    def _retry_or_fail(self, job: IngestionJob, error: str):
+        job.error = error[:2000]
+        job.worker_id = None
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+        else:
+            job.status = "failed"
+            job.finished_at = _now()
+
+    async def recover_stalled(self, db: AsyncSession) -> int:
+        """Requeue (or fail) running jobs whose worker stopped sending heartbeats."""
+        result = await db.execute(
+            select(IngestionJob)
+            .where(IngestionJob.status == "running", IngestionJob.lease_expires_at < _now())
+            .with_for_update(skip_locked=True)
+        )
+        jobs = result.scalars().all()
+        for job in jobs:
+            self._retry_or_fail(job, f"Lease expired (last heartbeat {job.heartbeat_at})")
+            job.lease_expires_at = None
+            if job.status == "failed":
+                await db.execute(update(Document).where(Document.id == job.document_id).values(status="failed"))
+        await db.commit()
+        return len(jobs)
+
+    async def queue_depth(self, db: AsyncSession) -> Dict[str, int]:
+        result = await db.execute(
+            select(IngestionJob.status, func.count(IngestionJob.id))
+            .where(IngestionJob.status.in_(ACTIVE_STATUSES))
+            .group_by(IngestionJob.status)
+        )
+        counts = dict(result.all())
+        return {status: counts.get(status, 0) for status in ACTIVE_STATUSES}
+
+ingestion_job = CRUDIngestionJob(IngestionJob)
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Dict, List
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from app.crud.base import CRUDBase
+from app.models.document import IngestionRun
+
+class CRUDIngestionRun(CRUDBase[IngestionRun, BaseModel, BaseModel]):
+    async def get_multi_by_document(self, db: AsyncSession, *, document_id: int, limit: int = 20) -> List[IngestionRun]:
+        result = await db.execute(
+            select(IngestionRun)
+            .where(IngestionRun.document_id == document_id)
+            .order_by(IngestionRun.id.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def totals(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Run counts and summed sizes/timings per (mode, status), over all recorded runs."""
+        result = await db.execute(
+            select(
+                IngestionRun.mode,
+                IngestionRun.status,
+                func.count(IngestionRun.id).label("runs"),
+                func.coalesce(func.sum(IngestionRun.total_seconds), 0).label("seconds"),
+                func.coalesce(func.sum(IngestionRun.file_bytes), 0).label("file_bytes"),
+                func.coalesce(func.sum(IngestionRun.pages), 0).label("pages"),
+                func.coalesce(func.sum(IngestionRun.chunks), 0).label("chunks"),
+                func.coalesce(func.sum(IngestionRun.tokens), 0).label("tokens"),
+            ).group_by(IngestionRun.mode, IngestionRun.status)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def recent_stage_totals(self, db: AsyncSession, *, window: int = 100) -> Dict[str, Dict[str, float]]:
+        """Per-stage seconds and counts summed over the last `window` successful runs."""
+        result = await db.execute(
+            select(IngestionRun.stages)
+            .where(IngestionRun.status == "succeeded")
+            .order_by(IngestionRun.id.desc())
+            .limit(window)
+        )
+        totals: Dict[str, Dict[str, float]] = {}
+        for stages_json in result.scalars().all():
+            for stage, entry in json.loads(stages_json or "{}").items():
+                stage_totals = totals.setdefault(stage, {})
+                for key in ("seconds", "calls", "pages", "chunks", "tokens"):
+                    if key in entry:
+                        stage_totals[key] = stage_totals.get(key, 0) + entry[key]
+        return totals
+
+ingestion_run = CRUDIngestionRun(IngestionRun)
@@ -7,6 +7,7 @@ from app.models.review import Review
 from app.schemas.review import ReviewCreate, ReviewBase
 
 from app.services.ingestion_service import embedding_service
+from app.services.embedding_cache import embedding_cache
 
 class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewBase]):
     async def get_multi_by_book(
@@ -27,7 +28,7 @@ class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewBase]):
         # Generate embedding for the review text for better recommendations
         embedding = None
         if obj_in.review_text:
-            embedding = await embedding_service.aembed_query(obj_in.review_text)
+            embedding = await embedding_cache.embed_query(db, embedding_service, obj_in.review_text)
 
         db_obj = Review(
             **obj_in.model_dump(),
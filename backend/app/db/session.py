@@ -1,9 +1,17 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from pgvector.asyncpg import register_vector
 from app.core.config import settings
 
 engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, future=True, echo=False)
 
+if engine.dialect.driver == "asyncpg":
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_vector_codec(dbapi_connection, connection_record):
+        # Binary vector codec: required for COPY and cheaper than the text format
+        dbapi_connection.run_async(register_vector)
+
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
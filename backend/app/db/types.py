@@ -0,0 +1,19 @@
+from pgvector.sqlalchemy import Vector as PGVector
+
+class Vector(PGVector):
+    """
+    pgvector column type. On asyncpg, vectors are passed to the driver as-is
+    and encoded by the binary codec registered in app.db.session; other
+    drivers (SQLite in tests) keep pgvector's text format.
+    """
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        if dialect.driver != "asyncpg":
+            return super().bind_processor(dialect)
+
+        def process(value):
+            if value is not None and self.dim is not None and len(value) != self.dim:
+                raise ValueError('expected %d dimensions, not %d' % (self.dim, len(value)))
+            return value
+        return process
@@ -0,0 +1,99 @@
+import logging
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Operator class each distance metric needs for its index to be used
+OPERATOR_CLASSES = {
+    "cosine": "vector_cosine_ops",
+    "l2": "vector_l2_ops",
+}
+INDEX_METHODS = ("hnsw", "ivfflat")
+
+# hnsw.iterative_scan was added in pgvector 0.8
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+
+# Whether each database (by URL) supports iterative scans, checked once per process
+_iterative_scan_support: Dict[str, bool] = {}
+
+def check_config(method: str, distance: str):
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unknown vector index method {method!r}, expected one of {INDEX_METHODS}")
+    if distance not in OPERATOR_CLASSES:
+        raise ValueError(f"Unknown vector distance {distance!r}, expected one of {tuple(OPERATOR_CLASSES)}")
+
+def distance(column, vector, metric: Optional[str] = None):
+    """Distance expression for ORDER BY, matching the configured index operator class."""
+    metric = metric or settings.VECTOR_DISTANCE
+    if metric == "cosine":
+        return column.cosine_distance(vector)
+    if metric == "l2":
+        return column.l2_distance(vector)
+    raise ValueError(f"Unknown vector distance {metric!r}")
+
+def index_name(table: str, column: str, method: str, metric: str) -> str:
+    return f"ix_{table}_{column}_{method}_{metric}"
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guideline: rows / 1000 lists up to 1M rows, sqrt(rows) beyond."""
+    if rows > 1_000_000:
+        return int(rows ** 0.5)
+    return max(rows // 1000, 10)
+
+def create_index_sql(table: str, column: str, method: str, metric: str, rows: int = 0) -> str:
+    """
+    CREATE INDEX CONCURRENTLY statement for a vector column. Must run
+    outside a transaction block.
+    """
+    check_config(method, metric)
+    if method == "hnsw":
+        options = f"(m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION})"
+    else:
+        options = f"(lists = {ivfflat_lists(rows)})"
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(table, column, method, metric)} "
+        f"ON {table} USING {method} ({column} {OPERATOR_CLASSES[metric]}) WITH {options}"
+    )
+
+def drop_index_sql(table: str, column: str, method: str, metric: str) -> str:
+    return f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(table, column, method, metric)}"
+
+def supports_iterative_scan(extversion: Optional[str]) -> bool:
+    if not extversion:
+        return False
+    try:
+        version = tuple(int(part) for part in extversion.split(".")[:2])
+    except ValueError:
+        return False
+    return version >= ITERATIVE_SCAN_MIN_VERSION
+
+async def iterative_scan_supported(db: AsyncSession) -> bool:
+    key = str(db.bind.url)
+    if key not in _iterative_scan_support:
+        result = await db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+        extversion = result.scalar()
+        _iterative_scan_support[key] = supports_iterative_scan(extversion)
+        if not _iterative_scan_support[key]:
+            logger.warning("pgvector %s has no iterative index scans; HNSW_ITERATIVE_SCAN is ignored", extversion)
+    return _iterative_scan_support[key]
+
+async def apply_search_settings(db: AsyncSession, filtered: bool = False):
+    """
+    Set the per-query ANN accuracy knobs for the current transaction:
+    hnsw.ef_search (candidates kept while searching the graph, must be at
+    least the LIMIT) and ivfflat.probes (lists scanned). Filtered searches
+    also enable iterative index scans, so rows removed by the WHERE clause
+    do not leave the result short (pgvector >= 0.8 only; older servers
+    skip it). No-op off Postgres.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    sql = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+    params = {"ef_search": str(settings.HNSW_EF_SEARCH), "probes": str(settings.IVFFLAT_PROBES)}
+    if filtered and settings.HNSW_ITERATIVE_SCAN != "off" and await iterative_scan_supported(db):
+        sql += ", set_config('hnsw.iterative_scan', :iterative_scan, true)"
+        params["iterative_scan"] = settings.HNSW_ITERATIVE_SCAN
+    await db.execute(text(sql), params)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, false
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -12,6 +12,11 @@ class Book(Base):
     year_published = Column(Integer)
     summary = Column(Text, nullable=True)
     ai_review_summary = Column(Text, nullable=True)
+    # Upkeep of ai_review_summary (app.services.review_summaries)
+    review_summary_dirty_at = Column(DateTime(timezone=True), nullable=True, index=True) # First review write not yet summarized
+    review_summary_review_id = Column(Integer, nullable=True) # Newest review folded into the summary
+    review_summary_updates = Column(Integer, nullable=False, default=0, server_default="0") # Incremental updates since the last full rebuild
+    review_summary_rebuild = Column(Boolean, nullable=False, default=False, server_default=false()) # A review was deleted: rebuild in full
 
     reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan")
     documents = relationship("Document", back_populates="book", cascade="all, delete-orphan")
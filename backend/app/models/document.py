@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, Float, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from app.db.types import Vector
 from app.db.base import Base
 
 class Document(Base):
@@ -11,20 +12,94 @@ class Document(Base):
     book_id = Column(Integer, ForeignKey("books.id"), nullable=True) # Linked to a book
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True) # SHA-256 of the stored file
+    file_size = Column(BigInteger, nullable=True)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(String, default="uploaded")
+    ingest_report = Column(Text, nullable=True) # JSON summary of the last ingestion
 
     book = relationship("Book", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
+    jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
+    runs = relationship("IngestionRun", back_populates="document", cascade="all, delete-orphan")
 
 class DocumentChunk(Base):
     __tablename__ = "document_chunks"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
     chunk_index = Column(Integer, nullable=False)
+    page_number = Column(Integer, nullable=True) # Source page for PDFs
     content = Column(Text, nullable=False)
-    metadata_json = Column(Text, nullable=True) # Store title, author etc here for filtering
+    content_hash = Column(String(64), nullable=True) # SHA-256 of content, used by incremental re-ingest
+    metadata_json = Column(Text, nullable=True) # Title, author etc. for display in sources
+    # Copied from the linked book at ingest time so retrieval can filter on indexed columns
+    book_id = Column(Integer, nullable=True, index=True)
+    genre = Column(String, nullable=True)
+    author = Column(String, nullable=True)
+    year_published = Column(Integer, nullable=True, index=True)
     embedding = Column(Vector(1536))
+    # Set on every UPDATE (at statement time, not transaction start) so the numpy store can pull changed metadata
+    updated_at = Column(DateTime(timezone=True), nullable=True, index=True, onupdate=lambda: datetime.now(timezone.utc))
+    # content_tsv: generated tsvector column with a GIN index, Postgres only, created by a
+    # migration and not mapped here. Used by RAGService.lexical_search.
 
     document = relationship("Document", back_populates="chunks")
+
+    __table_args__ = (
+        # Filters compare case-insensitively
+        Index("ix_document_chunks_genre_lower", func.lower(genre)),
+        Index("ix_document_chunks_author_lower", func.lower(author)),
+    )
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    mode = Column(String, nullable=False, default="full")
+    status = Column(String, nullable=False, default="queued", index=True) # queued, running, succeeded, failed
+    priority = Column(Integer, nullable=False, default=0) # Higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    chunks_done = Column(Integer, nullable=False, default=0)
+    chunks_total = Column(Integer, nullable=True) # Estimated while running, exact once finished
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    document = relationship("Document", back_populates="jobs")
+
+    __table_args__ = (
+        # At most one queued or running job per document, however many requests race to enqueue
+        Index(
+            "uq_ingestion_jobs_active_document",
+            document_id,
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+class IngestionRun(Base):
+    __tablename__ = "ingestion_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    mode = Column(String, nullable=False)
+    status = Column(String, nullable=False) # succeeded, failed
+    total_seconds = Column(Float, nullable=False)
+    file_bytes = Column(BigInteger, nullable=False, default=0)
+    text_bytes = Column(BigInteger, nullable=False, default=0)
+    pages = Column(Integer, nullable=False, default=0)
+    chunks = Column(Integer, nullable=False, default=0)
+    tokens = Column(BigInteger, nullable=False, default=0) # Estimated, ~4 characters per token
+    stages = Column(Text, nullable=True) # JSON per-stage seconds, calls, counts and throughput
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    document = relationship("Document", back_populates="runs")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+from app.db.types import Vector
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)
+    text_hash = Column(String(64), primary_key=True) # SHA-256 of the normalized text
+    embedding = Column(Vector(1536), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+
+    model = Column(String, primary_key=True)
+    task = Column(String, primary_key=True) # route, review_summary, ...
+    template_version = Column(Integer, primary_key=True) # Bumped when the task's prompt changes
+    input_hash = Column(String(64), primary_key=True) # SHA-256 of the rendered prompt
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
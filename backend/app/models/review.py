@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Text, ForeignKey
 from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
+from app.db.types import Vector
 from app.db.base import Base
 
 class Review(Base):
@@ -1,6 +1,6 @@
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Json, field_validator
 
 class DocumentBase(BaseModel):
     filename: str
@@ -13,10 +13,60 @@ class Document(DocumentBase):
     id: int
     upload_date: datetime
     status: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
+    ingest_report: Optional[Json[Any]] = None
 
     class Config:
         from_attributes = True
 
+class ChunkFilter(BaseModel):
+    """Structured retrieval filters, matched against indexed chunk columns."""
+    book_ids: Optional[List[int]] = None
+    exclude_book_ids: Optional[List[int]] = None # Also excludes chunks not linked to a book
+    genre: Optional[str] = None
+    author: Optional[str] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+MAX_ROUTE_LIMIT = 50
+
+class QueryRoute(BaseModel):
+    """Intent and search criteria extracted from a chat question in one LLM call."""
+    intent: Literal["NON_BOOK", "METADATA", "CONTENT"] = "CONTENT"
+    title: Optional[str] = None # Book the question is about (CONTENT)
+    genre: Optional[str] = None # Listing criteria (METADATA)
+    author: Optional[str] = None
+    limit: Optional[int] = None # Clamped to 1..MAX_ROUTE_LIMIT
+
+    @field_validator("intent", mode="before")
+    @classmethod
+    def normalize_intent(cls, value):
+        return value.strip().upper().replace("-", "_").replace(" ", "_") if isinstance(value, str) else value
+
+    @field_validator("title", "genre", "author", mode="before")
+    @classmethod
+    def empty_to_none(cls, value):
+        if isinstance(value, str) and value.strip().lower() in ("", "none", "null", "n/a"):
+            return None
+        return value
+
+    @field_validator("limit", mode="before")
+    @classmethod
+    def clamp_limit(cls, value):
+        # An out-of-range count should not cost the route its other criteria
+        if value is None or isinstance(value, bool):
+            return None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return None
+        return min(max(value, 1), MAX_ROUTE_LIMIT)
+
+    def metadata_params(self) -> Dict[str, Any]:
+        """Criteria in the form RAGService.get_book_metadata takes."""
+        return {k: v for k, v in {"genre": self.genre, "author": self.author, "limit": self.limit}.items() if v is not None}
+
 class ChatQuery(BaseModel):
     question: str
     
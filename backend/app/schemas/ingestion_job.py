@@ -0,0 +1,25 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+class IngestionJob(BaseModel):
+    id: int
+    document_id: int
+    mode: str
+    status: str
+    priority: int
+    attempts: int
+    chunks_done: int
+    chunks_total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class QueueDepth(BaseModel):
+    queued: int
+    running: int
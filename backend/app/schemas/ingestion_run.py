@@ -0,0 +1,21 @@
+from typing import Any, Optional
+from datetime import datetime
+from pydantic import BaseModel, Json
+
+class IngestionRun(BaseModel):
+    id: int
+    document_id: int
+    mode: str
+    status: str
+    total_seconds: float
+    file_bytes: int
+    text_bytes: int
+    pages: int
+    chunks: int
+    tokens: int
+    stages: Optional[Json[Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,181 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.document import Document, IngestionRun
+
+# (document id, status, latest ingestion run id) for every document behind an answer
+Fingerprint = Tuple[Tuple[int, str, Optional[int]], ...]
+
+class CachedAnswer(NamedTuple):
+    model: str
+    intent: str
+    answer: str
+    sources: List[str]
+    params: Dict[str, Any] # METADATA answers are re-queried from these
+    book_ids: Tuple[int, ...]
+    document_ids: Tuple[int, ...]
+    fingerprint: Fingerprint
+    seconds: float # Time it took to produce the answer
+    created: float
+
+async def documents_fingerprint(db: AsyncSession, book_ids: Iterable[int], document_ids: Iterable[int]) -> Fingerprint:
+    """
+    State of the documents an answer was built from, including any other
+    document of the same books. Re-ingesting, adding or deleting one of them
+    (in any process) changes the fingerprint.
+    """
+    book_ids, document_ids = list(book_ids), list(document_ids)
+    if not book_ids and not document_ids:
+        return ()
+    stmt = (
+        select(Document.id, Document.status, func.max(IngestionRun.id))
+        .outerjoin(IngestionRun, IngestionRun.document_id == Document.id)
+        .where(or_(Document.book_id.in_(book_ids), Document.id.in_(document_ids)))
+        .group_by(Document.id, Document.status)
+        .order_by(Document.id)
+    )
+    result = await db.execute(stmt)
+    return tuple(tuple(row) for row in result.all())
+
+class SemanticAnswerCache:
+    """
+    In-process cache of chat answers, looked up by query embedding.
+
+    A question whose embedding has cosine similarity of at least
+    RAG_ANSWER_CACHE_SIMILARITY with a cached one reuses its answer, as long
+    as the documents it was built from are unchanged. Embeddings sit in one
+    float32 matrix of unit rows, so a lookup is a single matrix-vector
+    product. Holds RAG_ANSWER_CACHE_SIZE entries, least recently used evicted
+    first, each valid for RAG_ANSWER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, dim: int = 1536):
+        self.max_entries = max_entries if max_entries is not None else settings.RAG_ANSWER_CACHE_SIZE
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max(self.max_entries, 0), dim), dtype=np.float32)
+        self._entries: List[Optional[CachedAnswer]] = [None] * max(self.max_entries, 0)
+        self._last_used = np.zeros(max(self.max_entries, 0), dtype=np.float64)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.seconds_saved = 0.0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._entries if entry is not None)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stale": self.stale,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "size": len(self),
+        }
+
+    def _unit(self, vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _drop(self, slot: int):
+        self._entries[slot] = None
+        self._vectors[slot] = 0.0
+        self._last_used[slot] = 0.0
+
+    def _closest(self, query: np.ndarray, model: str) -> Optional[int]:
+        with self._lock:
+            now = time.monotonic()
+            similarities = self._vectors @ query
+            for slot in np.argsort(-similarities):
+                if similarities[slot] < settings.RAG_ANSWER_CACHE_SIMILARITY:
+                    return None
+                entry = self._entries[slot]
+                if entry is None or entry.model != model:
+                    continue
+                if now - entry.created >= settings.RAG_ANSWER_CACHE_TTL_SECONDS:
+                    self._drop(slot)
+                    continue
+                return int(slot)
+            return None
+
+    async def lookup(self, db: AsyncSession, vector, model: str) -> Optional[CachedAnswer]:
+        if not settings.RAG_ANSWER_CACHE_ENABLED or self.max_entries <= 0:
+            return None
+        query = self._unit(vector)
+        slot = self._closest(query, model) if query is not None else None
+        if slot is None:
+            self.misses += 1
+            return None
+        entry = self._entries[slot]
+        # Checked on every hit: the worker that re-ingests a book may be another process
+        if await documents_fingerprint(db, entry.book_ids, entry.document_ids) != entry.fingerprint:
+            with self._lock:
+                if self._entries[slot] is entry:
+                    self._drop(slot)
+            self.stale += 1
+            self.misses += 1
+            return None
+        with self._lock:
+            self._last_used[slot] = time.monotonic()
+        self.hits += 1
+        return entry
+
+    def record_saving(self, entry: CachedAnswer, seconds: float):
+        self.seconds_saved += max(entry.seconds - seconds, 0.0)
+
+    async def store(
+        self,
+        db: AsyncSession,
+        vector,
+        model: str,
+        intent: str,
+        answer: str,
+        sources: List[str],
+        seconds: float,
+        params: Optional[Dict[str, Any]] = None,
+        book_ids: Iterable[int] = (),
+        document_ids: Iterable[int] = (),
+    ):
+        if not settings.RAG_ANSWER_CACHE_ENABLED or self.max_entries <= 0:
+            return
+        unit = self._unit(vector)
+        if unit is None:
+            return
+        book_ids = tuple(sorted(set(book_ids)))
+        document_ids = tuple(sorted(set(document_ids)))
+        entry = CachedAnswer(
+            model=model, intent=intent, answer=answer, sources=list(sources), params=dict(params) if isinstance(params, dict) else {},
+            book_ids=book_ids, document_ids=document_ids,
+            fingerprint=await documents_fingerprint(db, book_ids, document_ids),
+            seconds=seconds, created=time.monotonic(),
+        )
+        with self._lock:
+            slot = int(np.argmin(self._last_used)) # Free slots are 0, so they are taken first
+            self._entries[slot] = entry
+            self._vectors[slot] = unit
+            self._last_used[slot] = time.monotonic()
+
+    def invalidate(self, book_ids: Iterable[int] = (), document_ids: Iterable[int] = ()) -> int:
+        """Drop answers built from these books or documents."""
+        book_ids, document_ids = set(book_ids), set(document_ids)
+        removed = 0
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and (book_ids & set(entry.book_ids) or document_ids & set(entry.document_ids)):
+                    self._drop(slot)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            for slot in range(len(self._entries)):
+                self._drop(slot)
+
+answer_cache = SemanticAnswerCache()
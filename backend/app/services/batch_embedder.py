@@ -0,0 +1,57 @@
+import asyncio
+import random
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+
+class BatchEmbedder:
+    """
+    Embeds one batch of chunks per upstream request.
+
+    A process-wide semaphore caps the number of batches in flight across all
+    running ingestions, and failed batches are retried with exponential
+    backoff and full jitter.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        self.max_in_flight = max_in_flight or settings.EMBEDDING_MAX_BATCHES_IN_FLIGHT
+        # One semaphore per event loop; asyncio primitives cannot be shared across loops
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            self._semaphores = {l: s for l, s in self._semaphores.items() if not l.is_closed()}
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return semaphore
+
+    def backoff_delay(self, attempt: int) -> float:
+        ceiling = min(settings.EMBEDDING_RETRY_MAX_DELAY, settings.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def embed(self, embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore():
+                    vectors = await embeddings.aembed_documents(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                self.batches += 1
+                return vectors
+            except Exception as e:
+                if attempt >= settings.EMBEDDING_MAX_RETRIES:
+                    self.failures += 1
+                    raise
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                self.retries += 1
+                print(f"Embedding batch failed ({e}), retry {attempt} in {delay:.2f}s")
+                # Sleep outside the semaphore so other batches can use the slot
+                await asyncio.sleep(delay)
+
+batch_embedder = BatchEmbedder()
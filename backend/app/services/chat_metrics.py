@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+SPECULATION_EVENTS = ("started", "used", "redone", "discarded", "failed", "skipped")
+
+class ChatMetrics:
+    """
+    Chat latency (time to first byte, first token and complete answer) by
+    intent and path, for this process. The path is the router that
+    produced the answer ("structured" or "sequential") or "cache" for
+    answer cache hits, so the routers can be compared side by side. Sums
+    and counts cover all answers; quantiles cover the last `window`
+    answers per label set.
+
+    Tokens of retrieved context and history sent in QA prompts, and those
+    saved by merging overlapping chunks and the token budgets, are summed.
+
+    Also counts what happened to speculative retrievals: started, used,
+    redone (a title filter left too few hits), discarded (the intent was
+    not CONTENT), failed, or skipped because too many were in flight.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._recent: Dict[Tuple[str, str], Dict[str, Deque[float]]] = {}
+        self.speculation = {event: 0 for event in SPECULATION_EVENTS}
+        self.speculation_inflight = 0
+        self.disconnects = 0
+        self.context_tokens = 0
+        self.context_tokens_saved = 0
+
+    def record(self, intent: str, path: str, first_byte_seconds: float, first_token_seconds: float, total_seconds: float):
+        key = (intent, path)
+        values = {"ttfb": first_byte_seconds, "ttft": first_token_seconds, "total": total_seconds}
+        with self._lock:
+            totals = self._totals.setdefault(key, {"count": 0, **{f"{name}_sum": 0.0 for name in values}})
+            totals["count"] += 1
+            recent = self._recent.setdefault(key, {name: deque(maxlen=self.window) for name in values})
+            for name, value in values.items():
+                totals[f"{name}_sum"] += value
+                recent[name].append(value)
+
+    def record_context(self, tokens: int, saved: int):
+        with self._lock:
+            self.context_tokens += tokens
+            self.context_tokens_saved += saved
+
+    def count_disconnect(self):
+        with self._lock:
+            self.disconnects += 1
+
+    def count_speculation(self, event: str):
+        with self._lock:
+            self.speculation[event] += 1
+
+    def stats(self) -> List[Dict[str, float]]:
+        rows = []
+        with self._lock:
+            for (intent, path), totals in sorted(self._totals.items()):
+                row = {"intent": intent, "path": path, **totals}
+                for name, values in self._recent[(intent, path)].items():
+                    p50, p95 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95])
+                    row[f"{name}_p50"] = round(float(p50), 4)
+                    row[f"{name}_p95"] = round(float(p95), 4)
+                rows.append(row)
+        return rows
+
+    def prometheus(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        """Metric tuples for render_prometheus."""
+        stats = self.stats()
+        metrics = []
+        for name, key, help_text in (
+            ("chat_time_to_first_byte_seconds", "ttfb", "Seconds from question to the first byte sent (sources when streaming)"),
+            ("chat_time_to_first_token_seconds", "ttft", "Seconds from question to the first answer token"),
+            ("chat_latency_seconds", "total", "Seconds from question to the complete answer"),
+        ):
+            quantiles = []
+            for row in stats:
+                labels = {"intent": row["intent"], "path": row["path"]}
+                quantiles += [
+                    ({**labels, "quantile": "0.5"}, row[f"{key}_p50"]),
+                    ({**labels, "quantile": "0.95"}, row[f"{key}_p95"]),
+                ]
+            metrics.append((name, "gauge", f"{help_text}, over recent answers.", quantiles))
+            metrics.append((f"{name}_total", "counter", f"{help_text}, summed over all answers.",
+                            [({"intent": r["intent"], "path": r["path"]}, round(r[f"{key}_sum"], 4)) for r in stats]))
+        metrics.append(("chat_answers_total", "counter", "Chat answers by intent and path.",
+                        [({"intent": r["intent"], "path": r["path"]}, r["count"]) for r in stats]))
+        metrics.append(("chat_context_tokens_total", "counter", "Context and history tokens sent in QA prompts.",
+                        [({}, self.context_tokens)]))
+        metrics.append(("chat_context_tokens_saved_total", "counter", "QA prompt tokens saved by chunk merging and budgets.",
+                        [({}, self.context_tokens_saved)]))
+        metrics.append(("chat_stream_disconnects_total", "counter", "Streamed answers abandoned by the client.",
+                        [({}, self.disconnects)]))
+        metrics.append(("chat_speculative_retrievals_total", "counter", "Speculative retrievals by outcome.",
+                        [({"event": event}, count) for event, count in self.speculation.items()]))
+        metrics.append(("chat_speculative_retrievals_inflight", "gauge", "Speculative retrievals running now.",
+                        [({}, self.speculation_inflight)]))
+        return metrics
+
+chat_metrics = ChatMetrics()
@@ -0,0 +1,276 @@
+import os
+import time
+import hashlib
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+from app.core.config import settings
+
+# Plain-text files are streamed in blocks of this many characters
+TEXT_BLOCK_SIZE = 64 * 1024
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class TextChunk(NamedTuple):
+    index: int
+    page_number: Optional[int]
+    content: str
+
+# The PdfReader of the file being read in this process, reused across its page windows
+# and released once its last page has been read
+_reader_cache: Tuple[Optional[Tuple[str, float]], Optional[PdfReader]] = (None, None)
+
+def _get_reader(file_path: str, keep: bool = True) -> PdfReader:
+    global _reader_cache
+    key = (file_path, os.path.getmtime(file_path))
+    if _reader_cache[0] == key:
+        return _reader_cache[1]
+    reader = PdfReader(file_path)
+    if keep:
+        _reader_cache = (key, reader)
+    return reader
+
+def _release_reader(file_path: str):
+    global _reader_cache
+    if _reader_cache[0] and _reader_cache[0][0] == file_path:
+        _reader_cache = (None, None)
+
+def read_pages(
+    file_path: str, filename: str, cursor: int = 0, max_pages: int = 1
+) -> Tuple[List[Tuple[Optional[int], str]], Optional[int]]:
+    """
+    Read up to `max_pages` pages starting at `cursor`.
+
+    The cursor is a page index for PDFs and a file position for text files.
+    Returns the pages and the cursor to resume from, or None at end of file.
+    """
+    pages = []
+    if filename.endswith('.pdf'):
+        reader = _get_reader(file_path)
+        stop = min(cursor + max_pages, len(reader.pages))
+        for index in range(cursor, stop):
+            pages.append((index + 1, (reader.pages[index].extract_text() or "") + "\n"))
+        if stop < len(reader.pages):
+            return pages, stop
+        _release_reader(file_path)
+        return pages, None
+
+    # Text files have no pages; stream them in fixed-size blocks
+    with open(file_path, 'r', encoding='utf-8') as f:
+        f.seek(cursor)
+        for _ in range(max_pages):
+            block = f.read(TEXT_BLOCK_SIZE)
+            if not block:
+                return pages, None
+            pages.append((None, block))
+        return pages, f.tell()
+
+def source_size(file_path: str, filename: str) -> int:
+    """Total cursor range of a file: page count for PDFs, bytes for text."""
+    if filename.endswith('.pdf'):
+        # Not kept: this may run in a different pool process than the page windows
+        return len(_get_reader(file_path, keep=False).pages)
+    return os.path.getsize(file_path)
+
+def iter_pages(file_path: str, filename: str) -> Iterator[Tuple[Optional[int], str]]:
+    """Yield (page_number, text) pairs one page at a time."""
+    cursor = 0
+    while cursor is not None:
+        pages, cursor = read_pages(file_path, filename, cursor, settings.INGESTION_PAGES_PER_TASK)
+        yield from pages
+
+# Preferred section boundaries, best first
+SECTION_SEPARATORS = ("\n\n", "\n", " ")
+
+class SectionBuilder:
+    """
+    Groups streamed text into sections for map-reduce summarization.
+
+    Sections are `section_chars` long, or longer if the file would need more
+    than `max_sections` of them, so long books cost a bounded number of
+    calls. The file's length is extrapolated from how far into it the text
+    so far came from (`progress`, 0-1). Only the section being filled is
+    buffered; finished sections wait in `ready` until taken.
+    """
+
+    def __init__(self, section_chars: Optional[int] = None, max_sections: Optional[int] = None):
+        self.section_chars = section_chars or settings.SUMMARY_SECTION_CHARS
+        self.max_sections = max_sections or settings.SUMMARY_MAX_SECTIONS
+        self.ready: List[str] = []
+        self._buffer = ""
+        self._seen = 0
+
+    def target(self, progress: float) -> int:
+        estimated = self._seen / progress if progress > 0 else self._seen
+        return max(self.section_chars, -(-int(estimated) // self.max_sections))
+
+    def _emit(self, text: str):
+        if text.strip():
+            self.ready.append(text)
+
+    def feed(self, text: str, progress: float):
+        self._buffer += text
+        self._seen += len(text)
+        size = self.target(progress)
+        while len(self._buffer) >= size:
+            cut = size
+            for separator in SECTION_SEPARATORS:
+                found = self._buffer.rfind(separator, size // 2, size)
+                if found != -1:
+                    cut = found
+                    break
+            self._emit(self._buffer[:cut])
+            self._buffer = self._buffer[cut:]
+
+    def flush(self):
+        self._emit(self._buffer)
+        self._buffer = ""
+
+    def take(self) -> List[str]:
+        sections, self.ready = self.ready, []
+        return sections
+
+class StreamingChunker:
+    """
+    Incremental wrapper around RecursiveCharacterTextSplitter.
+
+    Pages are appended to a small buffer which is split as it fills up. All
+    chunks but the last are emitted; the raw text of the last one is carried
+    over so the next split still produces the configured overlap across page
+    boundaries. The buffer never holds more than one page plus one chunk.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.INGESTION_CHUNK_SIZE
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else settings.INGESTION_CHUNK_OVERLAP
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+        )
+        self._buffer = ""
+        # (offset in buffer, page number) for every page that contributed to the buffer
+        self._segments: List[Tuple[int, Optional[int]]] = []
+        self._next_index = 0
+
+    def _page_at(self, offset: int) -> Optional[int]:
+        page_number = self._segments[0][1] if self._segments else None
+        for start, page in self._segments:
+            if start > offset:
+                break
+            page_number = page
+        return page_number
+
+    def _split(self, final: bool) -> List[TextChunk]:
+        pieces = self.splitter.split_text(self._buffer)
+        if not pieces:
+            if final:
+                self._buffer = ""
+                self._segments = []
+            return []
+
+        keep = pieces if final else pieces[:-1]
+        chunks = []
+        cursor = 0
+        for piece in keep:
+            offset = self._buffer.find(piece, cursor)
+            if offset == -1:
+                offset = cursor
+            # The next piece can only start inside this piece's overlap window, which
+            # keeps the search from matching an earlier copy of repetitive text
+            cursor = max(offset + 1, offset + len(piece) - self.chunk_overlap)
+            chunks.append(TextChunk(self._next_index, self._page_at(offset), piece))
+            self._next_index += 1
+
+        if final:
+            self._buffer = ""
+            self._segments = []
+        else:
+            # Carry the raw text of the last piece into the next split
+            tail_start = self._buffer.find(pieces[-1], cursor)
+            if tail_start == -1:
+                tail_start = max(len(self._buffer) - len(pieces[-1]), 0)
+            self._segments = [(0, self._page_at(tail_start))] + [
+                (start - tail_start, page)
+                for start, page in self._segments
+                if start > tail_start
+            ]
+            self._buffer = self._buffer[tail_start:]
+        return chunks
+
+    def feed(self, text: str, page_number: Optional[int] = None) -> List[TextChunk]:
+        """Add a page of text and return the chunks that are now complete."""
+        if not text:
+            return []
+        self._segments.append((len(self._buffer), page_number))
+        self._buffer += text
+        if len(self._buffer) <= self.chunk_size:
+            return []
+        return self._split(final=False)
+
+    def flush(self) -> List[TextChunk]:
+        """Emit whatever is left in the buffer."""
+        if not self._buffer:
+            return []
+        return self._split(final=True)
+
+def iter_chunks(
+    pages: Iterable[Tuple[Optional[int], str]],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> Iterator[TextChunk]:
+    chunker = StreamingChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page_number, text in pages:
+        yield from chunker.feed(text, page_number)
+    yield from chunker.flush()
+
+def iter_batches(chunks: Iterable[TextChunk], batch_size: Optional[int] = None) -> Iterator[List[TextChunk]]:
+    batch_size = batch_size or settings.INGESTION_BATCH_SIZE
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def chunk_window(
+    file_path: str,
+    filename: str,
+    cursor: int,
+    chunker: StreamingChunker,
+    max_pages: int,
+    sections: Optional[SectionBuilder] = None,
+    size: int = 0,
+) -> Tuple[List[TextChunk], Optional[int], StreamingChunker, Optional[SectionBuilder], Dict[str, float]]:
+    """
+    Parse and chunk one window of pages. Meant to run on the process pool:
+    the chunker (and the section builder, when the book is being summarized
+    from the same pass) is passed in and returned so its carry-over survives
+    the round trip between windows. `size` is the file's source_size. Also
+    returns the window's parse/chunk timings and page/byte counts, measured
+    in the worker process.
+    """
+    started = time.perf_counter()
+    pages, next_cursor = read_pages(file_path, filename, cursor, max_pages)
+    parsed = time.perf_counter()
+    chunks = []
+    end = 1.0 if next_cursor is None or not size else next_cursor / size
+    start = min(cursor / size, end) if size else 0.0
+    for i, (page_number, text) in enumerate(pages):
+        chunks.extend(chunker.feed(text, page_number))
+        if sections is not None:
+            sections.feed(text, start + (end - start) * (i + 1) / len(pages))
+    if next_cursor is None:
+        chunks.extend(chunker.flush())
+        if sections is not None:
+            sections.flush()
+    stats = {
+        "parse_seconds": parsed - started,
+        "chunk_seconds": time.perf_counter() - parsed,
+        # Plain-text blocks have no page number and are not counted as pages
+        "pages": sum(1 for page_number, _ in pages if page_number is not None),
+        "text_bytes": sum(len(text.encode("utf-8")) for _, text in pages),
+    }
+    return chunks, next_cursor, chunker, sections, stats
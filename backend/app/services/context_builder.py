@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from app.core.config import settings
+from app.services.ingestion_metrics import estimate_tokens, CHARS_PER_TOKEN
+
+# Shorter suffix/prefix matches between neighbouring chunks are taken as coincidence, not overlap
+MIN_OVERLAP_CHARS = 10
+
+@lru_cache(maxsize=None)
+def _encoding(name: str) -> Optional[Any]:
+    """The tiktoken encoding, loaded once per process; None falls back to estimates."""
+    if not name:
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"Tokenizer {name!r} unavailable, estimating tokens from length: {e}")
+        return None
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    # Cached: the same chunks come back for related questions
+    encoding = _encoding(settings.RAG_TOKENIZER)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(settings.RAG_TOKENIZER)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def overlap_length(previous: str, following: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `previous` that starts `following`, up to max_overlap."""
+    for length in range(min(len(previous), len(following), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:length]):
+            return length
+    return 0
+
+class Passage(NamedTuple):
+    text: str
+    chunks: List[Any] # The ChunkHits it was merged from, in document order
+    rank: int # Best retrieval rank among them
+
+class BuiltContext(NamedTuple):
+    context: str
+    history: str
+    chunks: List[Any] # Chunks that made it into the context, in retrieval order
+    tokens: int # Context and history tokens sent
+    tokens_saved: int # Compared with every chunk and the whole history, joined as-is
+
+class ContextBuilder:
+    """
+    Assembles the QA prompt's context and history within token budgets.
+
+    Retrieved chunks that are neighbours in the same document (consecutive
+    chunk_index) are merged into one passage, dropping the text the chunker
+    repeated between them (up to INGESTION_CHUNK_OVERLAP characters).
+    Passages are then added in retrieval order until RAG_CONTEXT_MAX_TOKENS
+    is reached, the last one truncated to fit. History keeps the most recent
+    turns that fit RAG_HISTORY_MAX_TOKENS.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, history_tokens: Optional[int] = None):
+        # None reads the setting on every build
+        self.max_tokens = max_tokens
+        self.history_tokens = history_tokens
+
+    def merge(self, chunks: Sequence[Any]) -> List[Passage]:
+        """Merge runs of consecutive chunks of a document; passages are ordered by their best rank."""
+        rank = {}
+        for i, chunk in enumerate(chunks):
+            rank.setdefault((chunk.document_id, chunk.chunk_index), (i, chunk))
+        ordered = sorted(rank.values(), key=lambda item: (item[1].document_id, item[1].chunk_index))
+
+        passages: List[Passage] = []
+        for i, chunk in ordered:
+            last = passages[-1] if passages else None
+            if last and last.chunks[-1].document_id == chunk.document_id and last.chunks[-1].chunk_index + 1 == chunk.chunk_index:
+                overlap = overlap_length(last.text, chunk.content, settings.INGESTION_CHUNK_OVERLAP)
+                text = last.text + (chunk.content[overlap:] if overlap else "\n" + chunk.content)
+                passages[-1] = Passage(text, last.chunks + [chunk], min(last.rank, i))
+            else:
+                passages.append(Passage(chunk.content, [chunk], i))
+        return sorted(passages, key=lambda passage: passage.rank)
+
+    def format_history(self, history: Sequence[Dict[str, Any]]) -> str:
+        budget = self.history_tokens if self.history_tokens is not None else settings.RAG_HISTORY_MAX_TOKENS
+        turns: List[str] = []
+        used = 0
+        for turn in reversed(history or []):
+            line = f"{turn.get('role', 'user')}: {turn.get('content', '')}"
+            tokens = count_tokens(line)
+            if used + tokens > budget:
+                break
+            turns.append(line)
+            used += tokens
+        return "\n".join(reversed(turns)) if turns else "None"
+
+    def build(self, chunks: Sequence[Any], history: Sequence[Dict[str, Any]] = ()) -> BuiltContext:
+        max_tokens = self.max_tokens if self.max_tokens is not None else settings.RAG_CONTEXT_MAX_TOKENS
+        parts: List[str] = []
+        included: List[Any] = []
+        used = 0
+        for passage in self.merge(chunks):
+            remaining = max_tokens - used
+            if remaining <= 0:
+                break
+            tokens = count_tokens(passage.text)
+            text = passage.text
+            if tokens > remaining:
+                text = truncate_tokens(text, remaining)
+                tokens = count_tokens(text)
+            if not text:
+                break
+            parts.append(text)
+            included += passage.chunks
+            used += tokens
+
+        history_text = self.format_history(history)
+        context = "\n\n".join(parts)
+        tokens = count_tokens(context) + count_tokens(history_text)
+        naive = count_tokens("\n\n".join(c.content for c in chunks)) + count_tokens(str(history))
+        order = {id(chunk): i for i, chunk in enumerate(chunks)}
+        included.sort(key=lambda chunk: order[id(chunk)])
+        return BuiltContext(context, history_text, included, tokens, max(naive - tokens, 0))
+
+context_builder = ContextBuilder()
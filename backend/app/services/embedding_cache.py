@@ -0,0 +1,140 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.models.embedding_cache import EmbeddingCacheEntry
+
+_whitespace = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    return _whitespace.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def model_name(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by (model, SHA-256 of the normalized text), shared by
+    every document, re-ingest and review. Entries expire after
+    EMBEDDING_CACHE_TTL_DAYS without use, and the least recently used ones
+    are evicted once the table grows past EMBEDDING_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        self._writes_since_eviction = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted,
+        }
+
+    def _expiry_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=settings.EMBEDDING_CACHE_TTL_DAYS)
+
+    async def get_many(self, db: AsyncSession, model: str, texts: Sequence[str]) -> List[Optional[Sequence[float]]]:
+        """Cached vector for each text, or None on a miss."""
+        if not settings.EMBEDDING_CACHE_ENABLED or not texts:
+            return [None] * len(texts)
+
+        hashes = [text_hash(t) for t in texts]
+        result = await db.execute(
+            select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).where(
+                EmbeddingCacheEntry.model == model,
+                EmbeddingCacheEntry.text_hash.in_(set(hashes)),
+                EmbeddingCacheEntry.last_used_at >= self._expiry_cutoff(),
+            )
+        )
+        # Kept as the float32 arrays the driver decodes; converting to lists costs a Python float per dimension
+        found = dict(result.all())
+        if found:
+            await db.execute(
+                update(EmbeddingCacheEntry)
+                .where(EmbeddingCacheEntry.model == model, EmbeddingCacheEntry.text_hash.in_(found.keys()))
+                .values(last_used_at=datetime.now(timezone.utc))
+            )
+
+        vectors = [found.get(h) for h in hashes]
+        hits = sum(1 for v in vectors if v is not None)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return vectors
+
+    async def put_many(self, db: AsyncSession, model: str, texts: Sequence[str], vectors: Sequence[List[float]]):
+        """Stage new entries in the caller's transaction; existing keys are left alone."""
+        if not settings.EMBEDDING_CACHE_ENABLED or not texts:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            key = text_hash(text)
+            rows[key] = {
+                "model": model,
+                "text_hash": key,
+                "embedding": vector,
+                "created_at": now,
+                "last_used_at": now,
+            }
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(EmbeddingCacheEntry).on_conflict_do_nothing()
+        await db.execute(stmt, list(rows.values()))
+
+        self.writes += len(rows)
+        self._writes_since_eviction += len(rows)
+        if self._writes_since_eviction >= settings.EMBEDDING_CACHE_EVICT_EVERY:
+            await self.evict(db)
+
+    async def evict(self, db: AsyncSession) -> int:
+        """Drop expired entries, then the least recently used ones above the size limit."""
+        self._writes_since_eviction = 0
+        result = await db.execute(
+            delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.last_used_at < self._expiry_cutoff())
+        )
+        removed = result.rowcount or 0
+
+        total = (await db.execute(select(func.count()).select_from(EmbeddingCacheEntry))).scalar()
+        excess = total - settings.EMBEDDING_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = (
+                select(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash)
+                .order_by(EmbeddingCacheEntry.last_used_at)
+                .limit(excess)
+            )
+            result = await db.execute(
+                delete(EmbeddingCacheEntry).where(
+                    tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash).in_(oldest)
+                )
+            )
+            removed += result.rowcount or 0
+
+        self.evicted += removed
+        return removed
+
+    async def embed_query(self, db: AsyncSession, embeddings: Embeddings, text: str) -> List[float]:
+        model = model_name(embeddings)
+        cached = (await self.get_many(db, model, [text]))[0]
+        if cached is not None:
+            return cached
+        vector = await embeddings.aembed_query(text)
+        await self.put_many(db, model, [text], [vector])
+        return vector
+
+embedding_cache = EmbeddingCache()
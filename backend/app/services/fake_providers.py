@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+from app.core.config import settings
+
+_word = re.compile(r"\w+")
+
+# (text the prompt contains, reply): enough for the routers to take the CONTENT path
+DEFAULT_SCRIPT: Tuple[Tuple[str, str], ...] = (
+    ("Reply with only a JSON object", '{"intent": "CONTENT", "title": null, "genre": null, "author": null, "limit": null}'),
+    ("Reply with only the category word", "CONTENT"),
+    ("Return JSON with", "{}"),
+    ("Extract the book title", "None"),
+)
+
+def prompt_text(input: Any) -> str:
+    """Text of a prompt given as a string, a prompt value or a list of messages."""
+    if isinstance(input, str):
+        return input
+    if hasattr(input, "to_string"):
+        return input.to_string()
+    if isinstance(input, (list, tuple)):
+        return "\n".join(str(getattr(m, "content", m)) for m in input)
+    return str(input)
+
+class FakeChatModel:
+    """
+    Offline chat model for tests and benchmarks. Replies from `script` (the
+    first entry whose text appears in the prompt), otherwise echoes the last
+    `response_tokens` words of the prompt. The first token arrives after
+    `latency` seconds and the rest at `tokens_per_second` (0: all at once),
+    so upstream timing can be simulated without the network.
+    """
+
+    temperature = 0.0
+
+    def __init__(
+        self,
+        script: Sequence[Tuple[str, str]] = DEFAULT_SCRIPT,
+        latency: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        response_tokens: Optional[int] = None,
+        model_name: str = "fake-chat",
+    ):
+        self.script = list(script)
+        self.latency = latency if latency is not None else settings.FAKE_LLM_LATENCY_SECONDS
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else settings.FAKE_LLM_TOKENS_PER_SECOND
+        self.response_tokens = response_tokens if response_tokens is not None else settings.FAKE_LLM_RESPONSE_TOKENS
+        self.model_name = model_name
+
+    def reply(self, prompt: str) -> List[str]:
+        """The reply as stream tokens: words with their trailing space."""
+        for needle, reply in self.script:
+            if needle in prompt:
+                return [reply]
+        words = prompt.split()[-self.response_tokens:] if self.response_tokens > 0 else []
+        return [f"{word} " for word in words]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def ainvoke(self, input: Any, **kwargs: Any) -> AIMessage:
+        tokens = self.reply(prompt_text(input))
+        await asyncio.sleep(self.latency + self._token_delay() * max(len(tokens) - 1, 0))
+        return AIMessage(content="".join(tokens).strip())
+
+    def invoke(self, input: Any, **kwargs: Any) -> AIMessage:
+        tokens = self.reply(prompt_text(input))
+        time.sleep(self.latency + self._token_delay() * max(len(tokens) - 1, 0))
+        return AIMessage(content="".join(tokens).strip())
+
+    async def astream(self, input: Any, **kwargs: Any) -> AsyncIterator[AIMessageChunk]:
+        tokens = self.reply(prompt_text(input))
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self._token_delay())
+            yield AIMessageChunk(content=token)
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline embeddings from the hashing trick: each word adds +-1 to a
+    dimension picked by its hash, and the sum is L2-normalized. Deterministic
+    across processes, and texts sharing words are closer, but there is no
+    real semantics. Each request waits `latency` seconds.
+    """
+
+    def __init__(self, dim: int = 1536, latency: Optional[float] = None):
+        self.dim = dim
+        self.latency = latency if latency is not None else settings.FAKE_EMBEDDING_LATENCY_SECONDS
+        self.model = f"fake-hashing-{dim}"
+
+    def vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _word.findall(text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[(digest >> 1) % self.dim] += 1.0 if digest & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if not norm:
+            # Cosine distance is undefined for a zero vector
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self.vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self.vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self.vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self.vector(text)
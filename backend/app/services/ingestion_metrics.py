@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Rough tokens-per-character ratio for English text with OpenAI tokenizers.
+# Good enough for throughput trends without loading a tokenizer per chunk.
+CHARS_PER_TOKEN = 4
+
+# Pipeline stages in the order they run
+STAGES = ("summary", "parse", "chunk", "cache_lookup", "embed", "db_write")
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class IngestionMetrics:
+    """
+    Per-stage timings and counts for one ingestion run.
+
+    Each stage accumulates busy seconds, calls and the items it processed
+    (pages, chunks, tokens). Embedding batches run concurrently, so the
+    embed stage's seconds are the sum of request latencies, not wall time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.totals = {"file_bytes": 0, "text_bytes": 0, "pages": 0, "chunks": 0, "tokens": 0}
+
+    def add(self, stage: str, seconds: float, calls: int = 1, **items: int):
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+        for name, value in items.items():
+            entry[name] = entry.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, stage: str, **items: int) -> Iterator[Dict[str, int]]:
+        """Time a block; counts can be passed up front or set on the yielded dict."""
+        counts = dict(items)
+        started = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.add(stage, time.perf_counter() - started, **counts)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        stages = {}
+        for name in sorted(self.stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            entry = dict(self.stages[name])
+            seconds = entry["seconds"]
+            entry["seconds"] = round(seconds, 4)
+            for item in ("pages", "chunks", "tokens"):
+                if item in entry and seconds > 0:
+                    entry[f"{item}_per_second"] = round(entry[item] / seconds, 1)
+            stages[name] = entry
+        return {
+            "total_seconds": round(elapsed, 4),
+            **self.totals,
+            "tokens_per_second": round(self.totals["tokens"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "stages": stages,
+        }
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels.keys(), escaped)) + "}"
+
+def render_prometheus(metrics: List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]) -> str:
+    """
+    Render (name, type, help, [(labels, value), ...]) tuples in the
+    Prometheus text exposition format.
+    """
+    lines = []
+    for name, kind, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,46 +1,300 @@
 import os
 import json
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.document import Document, DocumentChunk
+from sqlalchemy import select, update, delete, func
+from app.models.document import Document, DocumentChunk, IngestionJob, IngestionRun
 from app.models.book import Book
 from app.core.config import settings
-from app.services.llm_service import llm_service
-from pypdf import PdfReader
+from app.services.summarizer import SummaryRun, book_summarizer
+from app.services.answer_cache import answer_cache
+from app.services.vector_store import get_vector_store
+from app.core.executors import run_cpu
+from app.services.batch_embedder import batch_embedder
+from app.services.llm_gateway import llm_gateway
+from app.services.embedding_cache import embedding_cache, model_name
+from app.services.ingestion_metrics import IngestionMetrics, estimate_tokens
+from app.crud.crud_document import document_chunk as crud_document_chunk
+from app.services.chunking import SectionBuilder, StreamingChunker, TextChunk, chunk_hash, chunk_window, iter_pages, iter_chunks, source_size
 
-embedding_service = OpenAIEmbeddings(
-    openai_api_key=settings.OPENROUTER_API_KEY,
-    openai_api_base="https://openrouter.ai/api/v1",
-    model="openai/text-embedding-3-small",
-    tiktoken_model_name="text-embedding-3-small"
-)
+embedding_service = llm_gateway.embeddings
+
+def chunk_metadata(book: Optional[Book]) -> Dict[str, Any]:
+    """Book columns copied onto every chunk, so retrieval can filter without a join."""
+    if not book:
+        return {"metadata_json": json.dumps({}), "book_id": None, "genre": None, "author": None, "year_published": None}
+    return {
+        "metadata_json": json.dumps({
+            "book_id": book.id,
+            "title": book.title,
+            "author": book.author,
+            "genre": book.genre
+        }),
+        "book_id": book.id,
+        "genre": book.genre,
+        "author": book.author,
+        "year_published": book.year_published,
+    }
 
 class IngestionService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Read by the ingestion worker to report per-job progress
+        self.progress = {"chunks_done": 0, "chunks_total": None}
+        # Per-stage timings of the current run, stored as an IngestionRun when it ends
+        self.metrics = IngestionMetrics()
+        # Book summary fed with sections from the same pass that produces the chunks
+        self.summary: Optional[SummaryRun] = None
 
     def extract_text(self, file_path: str, filename: str) -> str:
-        if filename.endswith('.pdf'):
-            reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += (page.extract_text() or "") + "\n"
-            return text
-        else:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+        return "".join(text for _, text in iter_pages(file_path, filename))
 
     def get_chunks(self, text: str) -> List[str]:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+        return [c.content for c in iter_chunks([(None, text)])]
+
+    async def stream_batches(self, file_path: str, filename: str) -> AsyncIterator[List[TextChunk]]:
+        """
+        Yield batches of chunks while parsing and splitting run on the process
+        pool, one window of pages per task, so the event loop stays free.
+        Summary sections are cut from the same windows and handed to the
+        running summary, if any.
+        """
+        batch_size = settings.INGESTION_BATCH_SIZE
+        size = await run_cpu(source_size, file_path, filename)
+        chunker = StreamingChunker()
+        sections = SectionBuilder() if self.summary else None
+        cursor = 0
+        chunks_seen = 0
+        pending: List[TextChunk] = []
+        while cursor is not None:
+            chunks, cursor, chunker, sections, stats = await run_cpu(
+                chunk_window, file_path, filename, cursor, chunker, settings.INGESTION_PAGES_PER_TASK, sections, size
+            )
+            if sections is not None:
+                for section in sections.take():
+                    await self.summary.add(section)
+            self.metrics.add("parse", stats["parse_seconds"], pages=stats["pages"])
+            self.metrics.add("chunk", stats["chunk_seconds"], chunks=len(chunks))
+            self.metrics.totals["pages"] += stats["pages"]
+            self.metrics.totals["text_bytes"] += stats["text_bytes"]
+            chunks_seen += len(chunks)
+            # Extrapolate the chunk count from how far into the file we are
+            fraction = 1.0 if cursor is None else (cursor / size if size else 0.0)
+            if fraction > 0:
+                self.progress["chunks_total"] = max(round(chunks_seen / fraction), chunks_seen)
+            pending.extend(chunks)
+            while len(pending) >= batch_size:
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+        if pending:
+            yield pending
+
+    async def embed_batch(self, texts: List[str], cached: List[Optional[List[float]]]) -> Tuple[List[List[float]], List[int]]:
+        """Embed the cache misses of a batch; returns all vectors and the indexes that were computed."""
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        vectors = list(cached)
+        if missing:
+            to_embed = [texts[i] for i in missing]
+            with self.metrics.stage("embed", chunks=len(to_embed), tokens=sum(estimate_tokens(t) for t in to_embed)):
+                computed = await batch_embedder.embed(embedding_service, to_embed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors, missing
+
+    async def store_batch(
+        self,
+        doc: Document,
+        batch: List[TextChunk],
+        embeddings: List[List[float]],
+        metadata: Dict[str, Any],
+        computed: Optional[List[int]] = None,
+        commit: bool = True,
+    ):
+        rows = [
+            {
+                "document_id": doc.id,
+                "chunk_index": chunk.index,
+                "page_number": chunk.page_number,
+                "content": chunk.content,
+                "content_hash": chunk_hash(chunk.content),
+                **metadata,
+                "embedding": embedding,
+            }
+            for chunk, embedding in zip(batch, embeddings)
+        ]
+        with self.metrics.stage("db_write", chunks=len(rows)):
+            if computed:
+                await embedding_cache.put_many(
+                    self.db,
+                    model_name(embedding_service),
+                    [batch[i].content for i in computed],
+                    [embeddings[i] for i in computed],
+                )
+            # Commit per batch so a failed ingestion can resume after the last stored batch
+            await crud_document_chunk.bulk_create(self.db, rows=rows, commit=commit)
+        self.progress["chunks_done"] += len(rows)
+
+    async def lookup_cached(self, texts: List[str]) -> List[Optional[List[float]]]:
+        # Identical text embedded before, by any document or model run, is reused
+        with self.metrics.stage("cache_lookup", chunks=len(texts)):
+            return await embedding_cache.get_many(self.db, model_name(embedding_service), texts)
+
+    async def finish_summary(self) -> Optional[str]:
+        """Reduce the section summaries gathered during the pass to the book's summary."""
+        with self.metrics.stage("summary") as counts:
+            try:
+                return await self.summary.result()
+            finally:
+                counts.update(self.summary.stats)
+
+    async def get_resume_index(self, document_id: int) -> int:
+        """Index of the first chunk that has not been committed yet."""
+        result = await self.db.execute(
+            select(func.max(DocumentChunk.chunk_index)).where(DocumentChunk.document_id == document_id)
+        )
+        last_index = result.scalar()
+        return 0 if last_index is None else last_index + 1
+
+    async def interrupted(self, document_id: int) -> bool:
+        """
+        Whether the document's last full run did not finish: it was recorded
+        as failed, or its job is being retried because the worker running it
+        stopped (a later attempt of a job still marked running).
+        """
+        result = await self.db.execute(
+            select(IngestionRun.mode, IngestionRun.status)
+            .where(IngestionRun.document_id == document_id)
+            .order_by(IngestionRun.id.desc())
+            .limit(1)
+        )
+        last_run = result.first()
+        if last_run and last_run.mode == "full" and last_run.status == "failed":
+            return True
+        result = await self.db.execute(
+            select(IngestionJob.id).where(
+                IngestionJob.document_id == document_id,
+                IngestionJob.mode == "full",
+                IngestionJob.status == "running",
+                IngestionJob.attempts > 1,
+            ).limit(1)
+        )
+        return result.first() is not None
+
+    async def prepare_full_run(self, doc: Document) -> int:
+        """
+        Chunk index a full run starts at. An interrupted run resumes after
+        its last committed batch; otherwise the document's chunks are
+        deleted and it is rebuilt from scratch.
+        """
+        if await self.interrupted(doc.id):
+            return await self.get_resume_index(doc.id)
+        await self.db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == doc.id))
+        await self.db.commit()
+        await get_vector_store().delete_document(self.db, doc.id)
+        return 0
+
+    async def embed_and_store(self, doc: Document, metadata: Dict[str, Any], resume_from: int = 0) -> Dict[str, int]:
+        """
+        Embed batches concurrently, up to EMBEDDING_MAX_BATCHES_IN_FLIGHT per
+        ingestion (and globally via batch_embedder), while storing them in order.
+        """
+        report = {"chunks": resume_from, "reused": resume_from, "recomputed": 0}
+        self.progress["chunks_done"] = resume_from
+        in_flight = deque()
+        try:
+            async for batch in self.stream_batches(doc.file_path, doc.filename):
+                batch = [c for c in batch if c.index >= resume_from]
+                if not batch:
+                    continue
+                report["chunks"] += len(batch)
+                texts = [c.content for c in batch]
+                self.metrics.totals["tokens"] += sum(estimate_tokens(t) for t in texts)
+                cached = await self.lookup_cached(texts)
+                task = asyncio.create_task(self.embed_batch(texts, cached))
+                in_flight.append((batch, task))
+                if len(in_flight) >= settings.EMBEDDING_MAX_BATCHES_IN_FLIGHT:
+                    batch, task = in_flight.popleft()
+                    vectors, computed = await task
+                    report["recomputed"] += len(computed)
+                    await self.store_batch(doc, batch, vectors, metadata, computed)
+            while in_flight:
+                batch, task = in_flight.popleft()
+                vectors, computed = await task
+                report["recomputed"] += len(computed)
+                await self.store_batch(doc, batch, vectors, metadata, computed)
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+        return report
+
+    async def reingest_chunks(self, doc: Document, metadata: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Incremental re-ingest: re-chunk the file and diff it against the stored
+        rows by content hash. Unchanged chunks keep their row and embedding
+        (and are re-indexed if they moved), new chunks are embedded and
+        inserted, and chunks that disappeared are deleted, all in one
+        transaction.
+        """
+        result = await self.db.execute(
+            select(DocumentChunk.id, DocumentChunk.chunk_index, DocumentChunk.page_number, DocumentChunk.content_hash)
+            .where(DocumentChunk.document_id == doc.id)
+            .order_by(DocumentChunk.chunk_index)
         )
-        return text_splitter.split_text(text)
+        stored = defaultdict(deque)
+        for row_id, index, page_number, content_hash in result.all():
+            stored[content_hash].append((row_id, index, page_number))
+
+        report = {"chunks": 0, "reused": 0, "recomputed": 0, "inserted": 0, "reindexed": 0, "deleted": 0}
+        moved = []
+        async for batch in self.stream_batches(doc.file_path, doc.filename):
+            report["chunks"] += len(batch)
+            self.metrics.totals["tokens"] += sum(estimate_tokens(c.content) for c in batch)
+            changed = []
+            for chunk in batch:
+                matches = stored.get(chunk_hash(chunk.content))
+                if not matches:
+                    changed.append(chunk)
+                    continue
+                row_id, index, page_number = matches.popleft()
+                report["reused"] += 1
+                self.progress["chunks_done"] += 1
+                if index != chunk.index or page_number != chunk.page_number:
+                    moved.append({"id": row_id, "chunk_index": chunk.index, "page_number": chunk.page_number})
+
+            if changed:
+                texts = [c.content for c in changed]
+                cached = await self.lookup_cached(texts)
+                vectors, computed = await self.embed_batch(texts, cached)
+                report["recomputed"] += len(computed)
+                report["inserted"] += len(changed)
+                await self.store_batch(doc, changed, vectors, metadata, computed, commit=False)
+
+        stale = [row_id for rows in stored.values() for row_id, _, _ in rows]
+        with self.metrics.stage("db_write", chunks=len(stale) + len(moved)):
+            for start in range(0, len(stale), 1000):
+                await self.db.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(stale[start:start + 1000])))
+
+            if moved:
+                # Bulk UPDATE by primary key
+                await self.db.execute(update(DocumentChunk), moved)
+
+            # Book details may have changed since the rows were written
+            await self.db.execute(
+                update(DocumentChunk).where(DocumentChunk.document_id == doc.id).values(**metadata)
+            )
+            await self.db.commit()
+        report["deleted"] = len(stale)
+        report["reindexed"] = len(moved)
+        return report
 
-    async def ingest_document(self, document_id: int):
+    async def ingest_document(self, document_id: int, mode: str = "full") -> Dict[str, int]:
+        """
+        Ingest a document. "full" rebuilds every chunk (or resumes after the
+        last committed batch of an interrupted run); "incremental" re-chunks the
+        file and only recomputes chunks whose content changed.
+        """
         # Fetch document with its linked book
         result = await self.db.execute(
             select(Document).where(Document.id == document_id)
@@ -48,51 +302,74 @@ class IngestionService:
         doc = result.scalars().first()
         if not doc:
             raise ValueError("Document not found")
-        
+
         # doc.status = "processing" # Handled in API endpoint
         # await self.db.commit()
 
+        book = None
+        self.summary = None
+        self.metrics = IngestionMetrics()
         try:
-            text = self.extract_text(doc.file_path, doc.filename)
-            
-            # 1. Update Book Summary if linked
+            self.metrics.totals["file_bytes"] = await run_cpu(os.path.getsize, doc.file_path)
+            resume_from = await self.prepare_full_run(doc) if mode == "full" else 0
+
+            # 1. Summarize the whole book if linked, from the sections of the embedding pass
             if doc.book_id:
                 book_result = await self.db.execute(select(Book).where(Book.id == doc.book_id))
                 book = book_result.scalars().first()
-                if book:
-                    # Generate a high-quality summary from the full text (or a large sample)
-                    summary = await llm_service.generate_summary(text[:10000]) # Sample first 10k chars for summary
+                if book and not (resume_from and book.summary):
+                    self.summary = book_summarizer.start(self.db.bind)
+
+            metadata = chunk_metadata(book if doc.book_id else None)
+
+            # 2. Stream pages -> chunks -> embeddings -> rows, one batch at a time
+            if mode == "incremental":
+                report = await self.reingest_chunks(doc, metadata)
+            else:
+                report = await self.embed_and_store(doc, metadata, resume_from=resume_from)
+            if self.summary:
+                summary = await self.finish_summary()
+                if summary:
                     book.summary = summary
-                    await self.db.commit()
-
-            # 2. Process Chunks
-            chunks = self.get_chunks(text)
-            embeddings = await embedding_service.aembed_documents(chunks)
-            
-            # Prepare metadata
-            metadata = {}
-            if doc.book_id and book:
-                metadata = {
-                    "book_id": book.id,
-                    "title": book.title,
-                    "author": book.author,
-                    "genre": book.genre
-                }
-
-            for i, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-                db_chunk = DocumentChunk(
-                    document_id=doc.id,
-                    chunk_index=i,
-                    content=chunk_text,
-                    metadata_json=json.dumps(metadata),
-                    embedding=embedding
-                )
-                self.db.add(db_chunk)
-            
+            report["mode"] = mode
+            report["seconds"] = round(self.metrics.elapsed, 3)
+
             doc.status = "ready"
+            doc.ingest_report = json.dumps(report)
+            self.db.add(self.build_run(document_id, mode, "succeeded", chunks=report["chunks"]))
             await self.db.commit()
+            # Other processes notice the new ingestion run when they next use a cached answer
+            answer_cache.invalidate(book_ids=[doc.book_id] if doc.book_id else [], document_ids=[doc.id])
+            return report
         except Exception as e:
-            doc.status = "failed"
+            if self.summary:
+                self.summary.cancel()
+            # Only the uncommitted batch is discarded; earlier batches are kept for resuming
+            await self.db.rollback()
+            await self.db.execute(
+                update(Document).where(Document.id == document_id).values(status="failed")
+            )
+            self.db.add(self.build_run(
+                document_id, mode, "failed", chunks=self.progress["chunks_done"], error=f"{type(e).__name__}: {e}"
+            ))
             await self.db.commit()
             print(f"Error ingesting document: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def build_run(self, document_id: int, mode: str, status: str, chunks: int, error: Optional[str] = None) -> IngestionRun:
+        """Snapshot the run's metrics as an ingestion_runs row."""
+        self.metrics.totals["chunks"] = chunks
+        metrics = self.metrics.as_dict()
+        return IngestionRun(
+            document_id=document_id,
+            mode=mode,
+            status=status,
+            total_seconds=metrics["total_seconds"],
+            file_bytes=metrics["file_bytes"],
+            text_bytes=metrics["text_bytes"],
+            pages=metrics["pages"],
+            chunks=chunks,
+            tokens=metrics["tokens"],
+            stages=json.dumps(metrics["stages"]),
+            error=error[:2000] if error else None,
+        )
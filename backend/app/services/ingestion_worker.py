@@ -0,0 +1,118 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Optional
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.crud.crud_ingestion_job import ingestion_job as crud_ingestion_job
+from app.models.document import IngestionJob
+from app.services.ingestion_service import IngestionService
+from app.services.storage import storage
+
+class IngestionWorker:
+    """
+    Runs queued ingestion jobs with up to `slots` jobs at a time.
+
+    Jobs are leased from the ingestion_jobs table; while a job runs, a
+    heartbeat extends its lease and records progress. Jobs whose lease
+    expires (the worker crashed or hung) are requeued by whichever worker
+    notices first. Every STORAGE_SWEEP_SECONDS the worker also deletes
+    uploaded files that no document references any more.
+    """
+
+    def __init__(self, session_factory: sessionmaker, slots: Optional[int] = None, worker_id: Optional[str] = None):
+        self.session_factory = session_factory
+        self.slots = slots or settings.INGESTION_WORKER_SLOTS
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.running: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._last_sweep: Optional[float] = None
+
+    async def run_job(self, job: IngestionJob):
+        async with self.session_factory() as session:
+            service = IngestionService(session)
+            ingest = asyncio.create_task(service.ingest_document(job.document_id, mode=job.mode))
+            error = None
+            try:
+                while True:
+                    done, _ = await asyncio.wait({ingest}, timeout=settings.INGESTION_JOB_HEARTBEAT_SECONDS)
+                    if done:
+                        ingest.result()
+                        break
+                    async with self.session_factory() as hb_session:
+                        still_ours = await crud_ingestion_job.heartbeat(
+                            hb_session,
+                            job_id=job.id,
+                            worker_id=self.worker_id,
+                            chunks_done=service.progress["chunks_done"],
+                            chunks_total=service.progress["chunks_total"],
+                        )
+                    if not still_ours:
+                        # Another worker recovered this job; stop competing with it
+                        print(f"Lost lease on ingestion job {job.id}, cancelling")
+                        return
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                if not ingest.done():
+                    ingest.cancel()
+                # Let the ingestion unwind before its session is closed
+                await asyncio.gather(ingest, return_exceptions=True)
+
+        total = service.progress["chunks_done"] if error is None else service.progress["chunks_total"]
+        async with self.session_factory() as session:
+            await crud_ingestion_job.finish(
+                session,
+                job_id=job.id,
+                worker_id=self.worker_id,
+                chunks_done=service.progress["chunks_done"],
+                chunks_total=total,
+                error=error,
+            )
+
+    async def poll_once(self) -> int:
+        """Recover stalled jobs and start as many queued jobs as there are free slots."""
+        async with self.session_factory() as session:
+            await crud_ingestion_job.recover_stalled(session)
+            free = self.slots - len(self.running)
+            jobs = await crud_ingestion_job.lease(session, worker_id=self.worker_id, limit=free) if free > 0 else []
+        for job in jobs:
+            task = asyncio.create_task(self.run_job(job))
+            self.running[job.id] = task
+            task.add_done_callback(lambda _, job_id=job.id: self.running.pop(job_id, None))
+        return len(jobs)
+
+    async def sweep_storage(self) -> int:
+        """Delete unreferenced upload files, at most once per STORAGE_SWEEP_SECONDS."""
+        if settings.STORAGE_SWEEP_SECONDS <= 0:
+            return 0
+        if self._last_sweep is not None and time.monotonic() - self._last_sweep < settings.STORAGE_SWEEP_SECONDS:
+            return 0
+        self._last_sweep = time.monotonic()
+        async with self.session_factory() as session:
+            removed = await storage.sweep(session)
+        if removed:
+            print(f"Removed {removed} unreferenced upload files")
+        return removed
+
+    async def run(self):
+        print(f"Ingestion worker {self.worker_id} started with {self.slots} slots")
+        while not self._stopping.is_set():
+            try:
+                await self.poll_once()
+                await self.sweep_storage()
+            except Exception as e:
+                print(f"Ingestion worker poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.INGESTION_WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        # Let running jobs finish; anything interrupted is recovered through its lease
+        if self.running:
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+        print(f"Ingestion worker {self.worker_id} stopped")
+
+    def stop(self):
+        self._stopping.set()
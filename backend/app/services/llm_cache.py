@@ -0,0 +1,149 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.core.config import settings
+from app.models.llm_response_cache import LLMResponseCacheEntry
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Responses of deterministic LLM tasks (summaries, routing), keyed by
+    (model, task, template version, SHA-256 of the rendered prompt) and kept
+    in the database, so every process and restart shares them. Changing a
+    task's prompt means bumping its template version, which orphans the old
+    entries. Entries expire after LLM_CACHE_TTL_DAYS without use, and the
+    least recently used ones are evicted once the table grows past
+    LLM_CACHE_MAX_ENTRIES.
+
+    The cache opens its own sessions, like the summarizer, so callers can
+    use it while their session is busy.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        self._writes_since_eviction = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted,
+        }
+
+    def _expiry_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=settings.LLM_CACHE_TTL_DAYS)
+
+    def _key(self, model: str, task: str, version: int, prompt: str):
+        return (
+            LLMResponseCacheEntry.model == model,
+            LLMResponseCacheEntry.task == task,
+            LLMResponseCacheEntry.template_version == version,
+            LLMResponseCacheEntry.input_hash == prompt_hash(prompt),
+        )
+
+    async def get(self, engine: AsyncEngine, model: str, task: str, version: int, prompt: str) -> Optional[str]:
+        async with AsyncSession(engine) as session:
+            key = self._key(model, task, version, prompt)
+            result = await session.execute(
+                select(LLMResponseCacheEntry.response).where(*key, LLMResponseCacheEntry.last_used_at >= self._expiry_cutoff())
+            )
+            response = result.scalar()
+            if response is None:
+                self.misses += 1
+                return None
+            await session.execute(
+                update(LLMResponseCacheEntry).where(*key).values(last_used_at=datetime.now(timezone.utc))
+            )
+            await session.commit()
+        self.hits += 1
+        return response
+
+    async def put(self, engine: AsyncEngine, model: str, task: str, version: int, prompt: str, response: str):
+        now = datetime.now(timezone.utc)
+        row = {
+            "model": model,
+            "task": task,
+            "template_version": version,
+            "input_hash": prompt_hash(prompt),
+            "response": response,
+            "created_at": now,
+            "last_used_at": now,
+        }
+        dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+        # An expired entry for the same key is refreshed rather than kept
+        stmt = dialect.insert(LLMResponseCacheEntry).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["model", "task", "template_version", "input_hash"],
+            set_={"response": stmt.excluded.response, "created_at": now, "last_used_at": now},
+        )
+        async with AsyncSession(engine) as session:
+            await session.execute(stmt)
+            self.writes += 1
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= settings.LLM_CACHE_EVICT_EVERY:
+                await self.evict(session)
+            await session.commit()
+
+    async def evict(self, db: AsyncSession) -> int:
+        """Drop expired entries, then the least recently used ones above the size limit."""
+        self._writes_since_eviction = 0
+        result = await db.execute(
+            delete(LLMResponseCacheEntry).where(LLMResponseCacheEntry.last_used_at < self._expiry_cutoff())
+        )
+        removed = result.rowcount or 0
+
+        total = (await db.execute(select(func.count()).select_from(LLMResponseCacheEntry))).scalar()
+        excess = total - settings.LLM_CACHE_MAX_ENTRIES
+        if excess > 0:
+            columns = (
+                LLMResponseCacheEntry.model, LLMResponseCacheEntry.task,
+                LLMResponseCacheEntry.template_version, LLMResponseCacheEntry.input_hash,
+            )
+            oldest = select(*columns).order_by(LLMResponseCacheEntry.last_used_at).limit(excess)
+            result = await db.execute(delete(LLMResponseCacheEntry).where(tuple_(*columns).in_(oldest)))
+            removed += result.rowcount or 0
+
+        self.evicted += removed
+        return removed
+
+    async def cached_call(
+        self,
+        engine: Optional[AsyncEngine],
+        model: str,
+        task: str,
+        version: int,
+        prompt: str,
+        call: Callable[[], Awaitable[str]],
+        cache: bool = True,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """
+        Cached response to `prompt`, or the result of `call`, stored for next
+        time. cache=False always calls. `stats`, if given, counts "cached"
+        responses and "llm_calls".
+        """
+        stats = stats if stats is not None else {}
+        if engine is None or not cache or not settings.LLM_CACHE_ENABLED:
+            stats["llm_calls"] = stats.get("llm_calls", 0) + 1
+            return await call()
+        cached = await self.get(engine, model, task, version, prompt)
+        if cached is not None:
+            stats["cached"] = stats.get("cached", 0) + 1
+            return cached
+        stats["llm_calls"] = stats.get("llm_calls", 0) + 1
+        response = await call()
+        await self.put(engine, model, task, version, prompt, response)
+        return response
+
+llm_response_cache = LLMResponseCache()
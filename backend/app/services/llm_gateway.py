@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+import httpx
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from app.core.config import settings
+from app.services.fake_providers import FakeChatModel, HashingEmbeddings
+
+T = TypeVar("T")
+
+def request_key(*parts: Any) -> str:
+    return hashlib.sha256("\x00".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+class ModelStats:
+    def __init__(self):
+        self.requests = 0 # Sent upstream
+        self.coalesced = 0 # Served by an identical request already in flight
+        self.errors = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.queue_seconds = 0.0 # Waiting for a concurrency slot
+        self.upstream_seconds = 0.0 # Holding a slot, i.e. waiting on the provider
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(vars(self))
+
+class LLMGateway:
+    """
+    The one path to the model provider for every service.
+
+    - A single pooled keep-alive HTTP client is shared by the chat and
+      embedding models (sync and async).
+    - Each model has its own concurrency limit (LLM_MODEL_CONCURRENCY, else
+      LLM_MAX_CONCURRENCY); callers beyond it queue.
+    - Identical requests already in flight are coalesced: followers await
+      the leader's result instead of sending their own (single-flight).
+      Streams are never coalesced.
+    - Time spent queued for a slot and time spent upstream are recorded
+      separately per model.
+
+    LLM_PROVIDER and EMBEDDING_PROVIDER=fake swap in the offline models of
+    app.services.fake_providers behind the same limits.
+    """
+
+    def __init__(self):
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS,
+        )
+        timeout = httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=10.0)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self._openai_clients: Optional[Tuple[openai.OpenAI, openai.AsyncOpenAI]] = None
+
+        self.stats: Dict[str, ModelStats] = {}
+        # Keyed by event loop: asyncio primitives cannot be shared across loops
+        self._semaphores: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Semaphore] = {}
+        self._in_flight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Future[Any]"] = {}
+
+        self.chat = GatedChatModel(self, self._chat_model())
+        self.embeddings = GatedEmbeddings(self, self._embedding_model())
+
+    def openai_clients(self) -> Tuple[openai.OpenAI, openai.AsyncOpenAI]:
+        """Provider clients on the shared HTTP pool, created on first use."""
+        if self._openai_clients is None:
+            client_params = {"api_key": settings.OPENROUTER_API_KEY, "base_url": settings.LLM_BASE_URL}
+            self._openai_clients = (
+                openai.OpenAI(http_client=self.http_client, **client_params),
+                openai.AsyncOpenAI(http_client=self.http_async_client, **client_params),
+            )
+        return self._openai_clients
+
+    def _chat_model(self) -> Any:
+        if settings.LLM_PROVIDER == "fake":
+            return FakeChatModel()
+        if settings.LLM_PROVIDER != "openrouter":
+            raise ValueError(f"Unknown LLM_PROVIDER {settings.LLM_PROVIDER!r}, expected openrouter or fake")
+        sync_client, async_client = self.openai_clients()
+        return ChatOpenAI(
+            client=sync_client.chat.completions,
+            async_client=async_client.chat.completions,
+            openai_api_key=settings.OPENROUTER_API_KEY,
+            base_url=settings.LLM_BASE_URL,
+            model=settings.LLM_MODEL,
+            temperature=0.7,
+        )
+
+    def _embedding_model(self) -> Embeddings:
+        if settings.EMBEDDING_PROVIDER == "fake":
+            return HashingEmbeddings()
+        if settings.EMBEDDING_PROVIDER != "openrouter":
+            raise ValueError(f"Unknown EMBEDDING_PROVIDER {settings.EMBEDDING_PROVIDER!r}, expected openrouter or fake")
+        sync_client, async_client = self.openai_clients()
+        return OpenAIEmbeddings(
+            client=sync_client.embeddings,
+            async_client=async_client.embeddings,
+            openai_api_key=settings.OPENROUTER_API_KEY,
+            openai_api_base=settings.LLM_BASE_URL,
+            model=settings.EMBEDDING_MODEL,
+            tiktoken_model_name=settings.EMBEDDING_MODEL.split("/")[-1],
+        )
+
+    def model_stats(self, model: str) -> ModelStats:
+        return self.stats.setdefault(model, ModelStats())
+
+    def limit_for(self, model: str) -> int:
+        return settings.LLM_MODEL_CONCURRENCY.get(model, settings.LLM_MAX_CONCURRENCY)
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get((loop, model))
+        if semaphore is None:
+            self._semaphores = {k: s for k, s in self._semaphores.items() if not k[0].is_closed()}
+            semaphore = self._semaphores[(loop, model)] = asyncio.Semaphore(self.limit_for(model))
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[None]:
+        """Hold one of the model's concurrency slots, timing the wait and the call."""
+        stats = self.model_stats(model)
+        stats.waiting += 1
+        queued = time.perf_counter()
+        try:
+            await self._semaphore(model).acquire()
+        finally:
+            stats.waiting -= 1
+        started = time.perf_counter()
+        stats.queue_seconds += started - queued
+        stats.requests += 1
+        stats.in_flight += 1
+        try:
+            yield
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.upstream_seconds += time.perf_counter() - started
+            self._semaphore(model).release()
+
+    async def call(self, model: str, key: Optional[Hashable], request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `request` in a slot of `model`. Concurrent calls with the same key
+        share one upstream request; key=None opts out of coalescing.
+        """
+        if key is None:
+            async with self.slot(model):
+                return await request()
+
+        loop = asyncio.get_running_loop()
+        shared = self._in_flight.get((loop, key))
+        if shared is not None:
+            self.model_stats(model).coalesced += 1
+            # Shielded: a cancelled follower must not cancel the shared request
+            return await asyncio.shield(shared)
+
+        async def lead() -> T:
+            try:
+                async with self.slot(model):
+                    return await request()
+            finally:
+                self._in_flight.pop((loop, key), None)
+
+        shared = self._in_flight[(loop, key)] = asyncio.ensure_future(lead())
+        return await asyncio.shield(shared)
+
+    async def aclose(self):
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+class GatedChatModel:
+    """
+    Chat model whose calls go through the gateway. Offers the parts of the
+    LangChain chat model interface the services use: ainvoke, astream and
+    model_name.
+    """
+
+    def __init__(self, gateway: LLMGateway, model: Any):
+        self.gateway = gateway
+        self.model = model
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    async def ainvoke(self, input: Any, **kwargs: Any) -> Any:
+        key = request_key("chat", self.model_name, self.model.temperature, input, sorted(kwargs.items()))
+        return await self.gateway.call(self.model_name, key, lambda: self.model.ainvoke(input, **kwargs))
+
+    async def astream(self, input: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        async with self.gateway.slot(self.model_name):
+            chunks = self.model.astream(input, **kwargs)
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+class GatedEmbeddings(Embeddings):
+    """Embeddings whose async calls go through the gateway; `model` names the wrapped model."""
+
+    def __init__(self, gateway: LLMGateway, embeddings: Embeddings):
+        self.gateway = gateway
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        key = request_key("embed_documents", self.model, *texts)
+        return await self.gateway.call(self.model, key, lambda: self.embeddings.aembed_documents(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = request_key("embed_query", self.model, text)
+        return await self.gateway.call(self.model, key, lambda: self.embeddings.aembed_query(text))
+
+llm_gateway = LLMGateway()
@@ -1,34 +1,175 @@
-from typing import Optional
-from langchain_openai import ChatOpenAI
+import re
+from typing import AsyncIterator, Dict, List, Optional
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncEngine
 from langchain.prompts import PromptTemplate
 from app.core.config import settings
+from app.schemas.document import QueryRoute
+from app.services.llm_cache import llm_response_cache
+from app.services.llm_gateway import llm_gateway
+
+ROUTE_PROMPT = """Analyze the user query about our book library and extract its intent and search criteria.
+
+Query: {query}
+History: {history}
+
+Intent rules:
+1. "NON_BOOK": a general question not about books.
+2. "METADATA": asks to list, count, or find books by metadata (genre, author, year).
+3. "CONTENT": asks about the content/details of a specific book or books in general.
+4. If it's a follow-up question, use history to decide.
+
+Reply with only a JSON object, no other text:
+{{"intent": "NON_BOOK" | "METADATA" | "CONTENT", "title": book title mentioned or null, "genre": genre or null, "author": author or null, "limit": number of books asked for or null}}"""
+
+# Cached responses are keyed by these: bump a task's version whenever its prompt changes
+TEMPLATE_VERSIONS = {
+    "route": 1,
+    "route_intent": 1,
+    "route_criteria": 1,
+    "route_title": 1,
+    "summary": 1,
+    "excerpt_summary": 1,
+    "section_summary": 1,
+    "merge_summaries": 1,
+    "review_summary": 1,
+    "review_summary_update": 1,
+}
+
+_json_object = re.compile(r"\{.*\}", re.DOTALL)
+_intent_word = re.compile(r"NON_BOOK|METADATA|CONTENT")
+
+def parse_route(text: str) -> QueryRoute:
+    """
+    Validate the router's JSON reply. Models sometimes wrap it in prose or
+    code fences, so the outermost object is extracted first; if that still
+    fails, fall back to the first intent word with no criteria.
+    """
+    match = _json_object.search(text)
+    if match:
+        try:
+            return QueryRoute.model_validate_json(match.group(0))
+        except ValidationError as e:
+            print(f"Router reply failed validation, falling back: {e.errors()[:1]}")
+    intent = _intent_word.search(text.upper())
+    return QueryRoute(intent=intent.group(0) if intent else "CONTENT")
 
 class LLMService:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            openai_api_key=settings.OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1",
-            model="meta-llama/llama-3.3-70b-instruct:free",
-            temperature=0.7
+        # Pooled, rate-limited and coalesced through the shared gateway
+        self.llm = llm_gateway.chat
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.llm, "model_name", None) or type(self.llm).__name__
+
+    async def complete(
+        self,
+        task: str,
+        prompt: str,
+        engine: Optional[AsyncEngine] = None,
+        cache: bool = True,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """
+        Response text for a deterministic task, generated at
+        LLM_CACHED_TEMPERATURE. Given an engine, the response is read from and
+        stored in the persistent response cache unless cache=False; `stats`
+        counts cache hits and model calls.
+        """
+        async def call() -> str:
+            response = await self.llm.ainvoke(prompt, temperature=settings.LLM_CACHED_TEMPERATURE)
+            return response.content
+
+        return await llm_response_cache.cached_call(
+            engine, self.model_name, task, TEMPLATE_VERSIONS[task], prompt, call, cache=cache, stats=stats
         )
 
-    async def generate_summary(self, text: str) -> str:
+    async def route_query(
+        self, query: str, history: Optional[List[dict]] = None, engine: Optional[AsyncEngine] = None, cache: bool = True
+    ) -> QueryRoute:
+        """Intent, book title and listing criteria of a chat question, in one call."""
+        prompt = ROUTE_PROMPT.format(query=query, history=history[-2:] if history else "None")
+        return parse_route(await self.complete("route", prompt, engine, cache))
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Response text as it is generated. Closing the generator ends the upstream request."""
+        chunks = self.llm.astream(prompt)
+        try:
+            async for chunk in chunks:
+                if chunk.content:
+                    yield chunk.content
+        finally:
+            await chunks.aclose()
+
+    async def generate_summary(
+        self, text: str, engine: Optional[AsyncEngine] = None, cache: bool = True, stats: Optional[Dict[str, int]] = None
+    ) -> str:
         prompt_template = PromptTemplate(
             input_variables=["text"],
             template="Please provide a concise summary of the following book content:\n\n{text}"
         )
-        chain = prompt_template | self.llm
-        response = await chain.ainvoke({"text": text})
-        return response.content
+        return await self.complete("summary", prompt_template.format(text=text), engine, cache, stats)
 
-    async def generate_review_summary(self, reviews: list[str]) -> str:
+    async def summarize_excerpts(self, excerpts: List[str], engine: Optional[AsyncEngine] = None, cache: bool = True) -> str:
+        prompt_template = PromptTemplate(
+            input_variables=["context"],
+            template="Based on the following excerpts from the book, provide a concise summary:\n\n{context}"
+        )
+        return await self.complete("excerpt_summary", prompt_template.format(context="\n\n".join(excerpts)), engine, cache)
+
+    async def summarize_section(
+        self, text: str, engine: Optional[AsyncEngine] = None, cache: bool = True, stats: Optional[Dict[str, int]] = None
+    ) -> str:
+        prompt_template = PromptTemplate(
+            input_variables=["text"],
+            template=(
+                "Summarize this section of a book in one short paragraph. Keep the key events, "
+                "characters and ideas:\n\n{text}"
+            )
+        )
+        return await self.complete("section_summary", prompt_template.format(text=text), engine, cache, stats)
+
+    async def combine_summaries(
+        self,
+        summaries: list[str],
+        final: bool = False,
+        engine: Optional[AsyncEngine] = None,
+        cache: bool = True,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> str:
+        sections_text = "\n\n".join(summaries)
+        if final:
+            template = "The following are summaries of consecutive parts of a book. Write a concise summary of the whole book:\n\n{sections}"
+        else:
+            template = "The following are summaries of consecutive sections of a book. Merge them into one short paragraph, in order:\n\n{sections}"
+        prompt_template = PromptTemplate(input_variables=["sections"], template=template)
+        return await self.complete("merge_summaries", prompt_template.format(sections=sections_text), engine, cache, stats)
+
+    async def generate_review_summary(
+        self, reviews: list[str], engine: Optional[AsyncEngine] = None, cache: bool = True
+    ) -> str:
         reviews_text = "\n".join([f"- {r}" for r in reviews])
         prompt_template = PromptTemplate(
             input_variables=["reviews"],
             template="Summarize the general sentiment and key points from the following book reviews:\n\n{reviews}"
         )
-        chain = prompt_template | self.llm
-        response = await chain.ainvoke({"reviews": reviews_text})
-        return response.content
+        return await self.complete("review_summary", prompt_template.format(reviews=reviews_text), engine, cache)
+
+    async def update_review_summary(
+        self, summary: str, new_reviews: list[str], engine: Optional[AsyncEngine] = None, cache: bool = True
+    ) -> str:
+        """Fold new reviews into an existing review summary, without resending the older reviews."""
+        reviews_text = "\n".join([f"- {r}" for r in new_reviews])
+        prompt_template = PromptTemplate(
+            input_variables=["summary", "reviews"],
+            template=(
+                "Here is a summary of the general sentiment and key points of a book's reviews:\n\n{summary}\n\n"
+                "Update it to also reflect the following new reviews. Keep its style and length, "
+                "and reply with only the updated summary:\n\n{reviews}"
+            )
+        )
+        prompt = prompt_template.format(summary=summary, reviews=reviews_text)
+        return await self.complete("review_summary_update", prompt, engine, cache)
 
 llm_service = LLMService()
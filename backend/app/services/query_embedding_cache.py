@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.services.embedding_cache import model_name, normalize_text
+
+def query_key(text: str) -> str:
+    # Queries differing only in case or spacing are the same question
+    return normalize_text(text).casefold()
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of query embeddings for the chat and summary paths,
+    keyed by (model, normalized query). Holds at most
+    QUERY_EMBEDDING_CACHE_SIZE float32 vectors (6 KB each at 1536 dimensions)
+    and treats entries older than QUERY_EMBEDDING_CACHE_TTL_SECONDS as misses.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.QUERY_EMBEDDING_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evicted": self.evicted,
+            "size": len(self._entries),
+        }
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        key = (model, query_key(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        # Shared between callers, so make it read-only
+        vector.setflags(write=False)
+        if self.max_entries <= 0:
+            return vector
+        key = (model, query_key(text))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    async def embed_query(self, embeddings: Embeddings, text: str) -> np.ndarray:
+        model = model_name(embeddings)
+        vector = self.get(model, text)
+        if vector is None:
+            vector = self.put(model, text, await embeddings.aembed_query(text))
+        return vector
+
+query_embedding_cache = QueryEmbeddingCache()
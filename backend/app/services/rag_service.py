@@ -1,15 +1,70 @@
+import re
 import json
-from typing import List, Tuple, Optional
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Tuple, Optional, TypeVar
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, literal_column, or_, case, cast
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from app.core.config import settings
 from app.models.document import DocumentChunk
 from app.models.book import Book
+from app.schemas.document import ChunkFilter, QueryRoute
+from app.services.vector_store import apply_chunk_filters, get_vector_store
 from app.services.ingestion_service import embedding_service
 from app.services.llm_service import llm_service
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.chat_metrics import chat_metrics
+from app.services.context_builder import context_builder
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+# Must match the configuration of the generated document_chunks.content_tsv column
+TEXT_SEARCH_CONFIG = "english"
+
+T = TypeVar("T")
+
+class ChunkHit(NamedTuple):
+    """A retrieved chunk: only the columns answers and sources use, never the embedding."""
+    id: int
+    document_id: int
+    book_id: Optional[int]
+    chunk_index: int
+    content: str
+    metadata_json: Optional[str]
+    distance: Optional[float] = None # Vector distance; None for lexical-only hits
+
+HIT_COLUMNS = (
+    DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.book_id,
+    DocumentChunk.chunk_index, DocumentChunk.content, DocumentChunk.metadata_json,
+)
+
+def reciprocal_rank_fusion(
+    rankings: List[List[T]], key: Callable[[T], Hashable], limit: int, k: Optional[int] = None
+) -> List[T]:
+    """
+    Merge ranked lists: each item scores sum(1 / (k + rank)) over the lists
+    it appears in. Only ranks matter, so scores on different scales (ts_rank
+    and vector distance) need no normalization.
+    """
+    k = k if k is not None else settings.RAG_RRF_K
+    scores: Dict[Hashable, float] = {}
+    items: Dict[Hashable, T] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+            items.setdefault(item_key, item)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [items[item_key] for item_key in ordered[:limit]]
 
 class RAGService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Mode and per-leg timings (seconds) of the last search_similar_chunks call
+        self.last_retrieval: Dict[str, Any] = {}
+        # Intent, extracted params and source documents of the last answer, for the answer cache
+        self.last_answer: Dict[str, Any] = {}
 
     async def get_book_metadata(self, query_params: dict) -> str:
         """Tool to fetch book metadata from the SQL database."""
@@ -30,25 +85,187 @@ class RAGService:
         
         return "\n".join([f"- {b.title} by {b.author} (Genre: {b.genre}, Year: {b.year_published})" for b in books])
 
-    async def search_similar_chunks(self, query: str, book_title: Optional[str] = None, limit: int = 3) -> List[DocumentChunk]:
-        """Tool to perform semantic search in the vector database."""
-        query_embedding = await embedding_service.aembed_query(query)
-        
-        stmt = select(DocumentChunk)
-        
-        # If a specific book title is mentioned, filter chunks by metadata
-        if book_title:
-            stmt = stmt.where(DocumentChunk.metadata_json.ilike(f"%{book_title}%"))
-            
-        stmt = stmt.order_by(
-            DocumentChunk.embedding.l2_distance(query_embedding)
-        ).limit(limit)
-        
-        result = await self.db.execute(stmt)
+    async def find_book_ids(self, title: str) -> List[int]:
+        # The title comes from an LLM extraction and may be quoted
+        title = title.strip().strip("'\"")
+        result = await self.db.execute(select(Book.id).where(Book.title.ilike(f"%{title}%")))
         return result.scalars().all()
 
+    def apply_filters(self, stmt, filters: ChunkFilter):
+        return apply_chunk_filters(stmt, filters)
+
+    async def vector_search(self, db: AsyncSession, query: str, filters: ChunkFilter, limit: int) -> List[ChunkHit]:
+        query_embedding = await query_embedding_cache.embed_query(embedding_service, query)
+        hits = await get_vector_store().search(db, query_embedding, limit, filters)
+        if not hits:
+            return []
+
+        result = await db.execute(select(*HIT_COLUMNS).where(DocumentChunk.id.in_([h.chunk_id for h in hits])))
+        rows = {row.id: row for row in result.all()}
+        # Keep the store's ranking; chunks deleted since its last sync are skipped
+        return [ChunkHit(*rows[h.chunk_id], distance=h.distance) for h in hits if h.chunk_id in rows]
+
+    async def lexical_search(self, db: AsyncSession, query: str, filters: ChunkFilter, limit: int) -> List[ChunkHit]:
+        """Full-text search over the GIN-indexed content_tsv column, best ts_rank_cd first."""
+        stmt = self.apply_filters(select(*HIT_COLUMNS), filters)
+        if db.bind.dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(TEXT_SEARCH_CONFIG, REGCONFIG), query)
+            content_tsv = literal_column("document_chunks.content_tsv")
+            stmt = stmt.where(content_tsv.op("@@")(tsquery)).order_by(func.ts_rank_cd(content_tsv, tsquery).desc())
+        else:
+            # No text search outside Postgres: rank by the number of query words present
+            words = set(re.findall(r"\w{3,}", query.lower()))
+            if not words:
+                return []
+            matches = [DocumentChunk.content.ilike(f"%{word}%") for word in words]
+            stmt = stmt.where(or_(*matches)).order_by(
+                sum(case((match, 1), else_=0) for match in matches).desc(), DocumentChunk.id
+            )
+        result = await db.execute(stmt.limit(limit))
+        return [ChunkHit(*row) for row in result.all()]
+
+    async def _timed_leg(self, name: str, search: Callable[..., Awaitable[List[ChunkHit]]], *args) -> List[ChunkHit]:
+        # Each leg gets its own session: one AsyncSession cannot run two queries at once
+        started = time.perf_counter()
+        async with AsyncSession(self.db.bind) as session:
+            chunks = await search(session, *args)
+        self.last_retrieval["timings"][name] = round(time.perf_counter() - started, 4)
+        return chunks
+
+    async def search_similar_chunks(
+        self,
+        query: str,
+        book_title: Optional[str] = None,
+        limit: int = 3,
+        filters: Optional[ChunkFilter] = None,
+        mode: Optional[str] = None,
+    ) -> List[ChunkHit]:
+        """
+        Tool to search the library. mode is "vector" (embedding similarity),
+        "lexical" (full-text) or "hybrid": both legs run concurrently and are
+        merged with reciprocal-rank fusion.
+        """
+        mode = mode or settings.RAG_RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {RETRIEVAL_MODES}")
+        self.last_retrieval = {"mode": mode, "timings": {}}
+        filters = filters.model_copy() if filters else ChunkFilter()
+        # If a specific book title is mentioned, search only that book's chunks
+        if book_title:
+            filters.book_ids = await self.find_book_ids(book_title)
+            if not filters.book_ids:
+                return []
+
+        if mode == "vector":
+            return await self._timed_leg("vector", self.vector_search, query, filters, limit)
+        if mode == "lexical":
+            return await self._timed_leg("lexical", self.lexical_search, query, filters, limit)
+
+        candidates = max(limit, settings.RAG_HYBRID_CANDIDATES)
+        lexical, vector = await asyncio.gather(
+            self._timed_leg("lexical", self.lexical_search, query, filters, candidates),
+            self._timed_leg("vector", self.vector_search, query, filters, candidates),
+        )
+        started = time.perf_counter()
+        # Vector hits first, so chunks found by both legs keep their distance
+        chunks = reciprocal_rank_fusion([vector, lexical], key=lambda c: c.id, limit=limit)
+        self.last_retrieval["timings"]["fusion"] = round(time.perf_counter() - started, 4)
+        return chunks
+
+    @property
+    def llm_model(self) -> str:
+        return getattr(llm_service.llm, "model_name", None) or type(llm_service.llm).__name__
+
     async def answer_question(self, query: str, history: List[dict] = []) -> Tuple[str, List[str]]:
-        # 1. Routing & Intent Detection (The "Router Agent" logic)
+        parts, sources = [], []
+        async for event, data in self.stream_answer(query, history, streamed=False):
+            if event == "sources":
+                sources = data
+            elif event == "token":
+                parts.append(data)
+        return "".join(parts), sources
+
+    async def stream_answer(
+        self, query: str, history: List[dict] = [], streamed: bool = True
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Answer a chat question as ("sources", [...]) followed by ("token", text)
+        events. Questions without history are first looked up in the semantic
+        answer cache; a completed miss is cached. Time to first byte, first
+        token and total latency are recorded per intent. Closing the generator
+        early stops the LLM generation and skips caching.
+        """
+        started = time.perf_counter()
+        if history or not settings.RAG_ANSWER_CACHE_ENABLED:
+            events = self.agent_events(query, history)
+            try:
+                async for event in events:
+                    yield event
+            finally:
+                await events.aclose()
+            self.record_latency(started, settings.RAG_ROUTER, streamed)
+            return
+
+        query_vector = await query_embedding_cache.embed_query(embedding_service, query)
+        cached = await answer_cache.lookup(self.db, query_vector, self.llm_model)
+        if cached:
+            self.last_answer = {"intent": cached.intent, "cached": True}
+            if cached.intent == "METADATA":
+                # Cheap to re-run, and new books must show up
+                answer = f"Here are the books I found:\n{await self.get_book_metadata(cached.params)}"
+            else:
+                answer = cached.answer
+            self.last_answer["first_byte_at"] = time.perf_counter()
+            yield "sources", list(cached.sources)
+            yield "token", answer
+            answer_cache.record_saving(cached, time.perf_counter() - started)
+            self.record_latency(started, "cache", streamed)
+            return
+
+        parts, sources = [], []
+        events = self.agent_events(query, history)
+        try:
+            async for event, data in events:
+                if event == "sources":
+                    sources = data
+                elif event == "token":
+                    parts.append(data)
+                yield event, data
+        finally:
+            # Closing the chain promptly closes the upstream LLM response
+            await events.aclose()
+        info = self.last_answer
+        # Answers with no retrieved context would go stale once books are ingested
+        if info.get("intent") != "CONTENT" or info.get("document_ids"):
+            await answer_cache.store(
+                self.db, query_vector, self.llm_model, info["intent"], "".join(parts), sources,
+                seconds=time.perf_counter() - started,
+                params=info.get("params"),
+                book_ids=info.get("book_ids", ()),
+                document_ids=info.get("document_ids", ()),
+            )
+        self.record_latency(started, settings.RAG_ROUTER, streamed)
+
+    def record_latency(self, started: float, path: str, streamed: bool = False):
+        finished = time.perf_counter()
+        # Answers that are not streamed arrive all at once
+        first_token = self.last_answer.get("first_token_at", finished)
+        first_byte = self.last_answer.get("first_byte_at", finished) if streamed else finished
+        self.last_answer["ttfb"] = round(first_byte - started, 4)
+        self.last_answer["ttft"] = round(first_token - started, 4)
+        self.last_answer["seconds"] = round(finished - started, 4)
+        chat_metrics.record(
+            self.last_answer.get("intent", "UNKNOWN"), path,
+            first_byte - started, first_token - started, finished - started,
+        )
+
+    async def route(self, query: str, history: List[dict] = []) -> QueryRoute:
+        """Intent and search criteria: one structured LLM call, or the older sequential calls."""
+        if settings.RAG_ROUTER == "structured":
+            return await llm_service.route_query(query, history, engine=self.db.bind)
+        if settings.RAG_ROUTER != "sequential":
+            raise ValueError(f"Unknown RAG_ROUTER {settings.RAG_ROUTER!r}, expected structured or sequential")
+
         routing_prompt = f"""Analyze the user query and decide the intent. 
         
         Query: {query}
@@ -62,49 +279,137 @@ class RAGService:
 
         Reply with only the category word.
         """
-        
-        intent = await llm_service.llm.ainvoke(routing_prompt)
-        intent = intent.content.strip().upper()
+        intent = await llm_service.complete("route_intent", routing_prompt, self.db.bind)
+        intent = intent.strip().upper()
 
-        sources = []
-        
         if "NON_BOOK" in intent:
-            answer = "I am a specialized Book Assistant. I can only help you with queries related to books in our library, such as listing books by genre, summarizing content, or answering specific questions about their text. Try asking 'List some fantasy books' or 'Tell me about the main character in [Book Title]'."
-            return answer, []
-
-        elif "METADATA" in intent:
-            # Extract basic params (in a real app, use a proper NER or LLM call to extract json)
-            # Simulating extraction for now
+            return QueryRoute(intent="NON_BOOK")
+        if "METADATA" in intent:
             extraction_prompt = f"Extract search criteria from this query: '{query}'. Return JSON with 'genre', 'author', or 'limit'. Return empty JSON if none found."
-            params_raw = await llm_service.llm.ainvoke(extraction_prompt)
+            params_raw = await llm_service.complete("route_criteria", extraction_prompt, self.db.bind)
             try:
-                params = json.loads(params_raw.content)
-            except:
-                params = {}
-            
+                return QueryRoute(intent="METADATA", **json.loads(params_raw))
+            except Exception:
+                return QueryRoute(intent="METADATA")
+
+        title_prompt = f"Extract the book title from this query if present: '{query}'. If not, reply 'None'."
+        title_res = await llm_service.complete("route_title", title_prompt, self.db.bind)
+        title = title_res.strip() if "None" not in title_res else None
+        return QueryRoute(intent="CONTENT", title=title)
+
+    def start_speculation(self, query: str) -> Optional["asyncio.Task[List[ChunkHit]]"]:
+        """
+        Start an unfiltered search for the question before its intent is
+        known. At most RAG_SPECULATIVE_MAX_INFLIGHT run at once per process.
+        """
+        if not settings.RAG_SPECULATIVE_RETRIEVAL:
+            return None
+        if chat_metrics.speculation_inflight >= settings.RAG_SPECULATIVE_MAX_INFLIGHT:
+            chat_metrics.count_speculation("skipped")
+            return None
+        chat_metrics.speculation_inflight += 1
+        chat_metrics.count_speculation("started")
+        task = asyncio.create_task(
+            self.search_similar_chunks(query, limit=max(settings.RAG_SPECULATIVE_CANDIDATES, 3))
+        )
+
+        def finished(_):
+            chat_metrics.speculation_inflight -= 1
+        # Runs even if the task is cancelled before it starts
+        task.add_done_callback(finished)
+        return task
+
+    async def discard_speculation(self, task: "asyncio.Task[List[ChunkHit]]"):
+        task.cancel()
+        # Wait for the search to unwind so its session is closed
+        await asyncio.gather(task, return_exceptions=True)
+        chat_metrics.count_speculation("discarded")
+
+    async def use_speculation(
+        self, task: "asyncio.Task[List[ChunkHit]]", route: QueryRoute, limit: int = 3
+    ) -> Optional[List[ChunkHit]]:
+        """Speculative hits for a CONTENT question, or None if the search must be redone."""
+        try:
+            chunks = await task
+        except Exception as e:
+            print(f"Speculative retrieval failed: {e}")
+            chat_metrics.count_speculation("failed")
+            return None
+        if route.title:
+            book_ids = set(await self.find_book_ids(route.title))
+            chunks = [c for c in chunks if c.book_id in book_ids]
+            # Too few hits left: the book's own chunks need a filtered search
+            if book_ids and len(chunks) < limit:
+                chat_metrics.count_speculation("redone")
+                return None
+        chat_metrics.count_speculation("used")
+        return chunks[:limit]
+
+    async def agent_events(self, query: str, history: List[dict] = []) -> AsyncIterator[Tuple[str, Any]]:
+        # Most questions are CONTENT, so retrieval starts alongside the router
+        speculative = self.start_speculation(query)
+        # 1. Routing, intent detection and criteria extraction (the "Router Agent")
+        try:
+            route = await self.route(query, history)
+        except BaseException:
+            if speculative:
+                await self.discard_speculation(speculative)
+            raise
+        if speculative and route.intent != "CONTENT":
+            await self.discard_speculation(speculative)
+
+        if route.intent == "NON_BOOK":
+            self.last_answer = {"intent": "NON_BOOK", "first_byte_at": time.perf_counter()}
+            yield "sources", []
+            yield "token", "I am a specialized Book Assistant. I can only help you with queries related to books in our library, such as listing books by genre, summarizing content, or answering specific questions about their text. Try asking 'List some fantasy books' or 'Tell me about the main character in [Book Title]'."
+            return
+
+        if route.intent == "METADATA":
+            params = route.metadata_params()
+            self.last_answer = {"intent": "METADATA", "params": params}
             answer = await self.get_book_metadata(params)
-            return f"Here are the books I found:\n{answer}", ["Database Query"]
-
-        else: # CONTENT
-            # Detect if a book title is mentioned
-            title_prompt = f"Extract the book title from this query if present: '{query}'. If not, reply 'None'."
-            title_res = await llm_service.llm.ainvoke(title_prompt)
-            title = title_res.content.strip() if "None" not in title_res.content else None
-            
-            chunks = await self.search_similar_chunks(query, book_title=title)
-            context = "\n\n".join([c.content for c in chunks])
-            sources = [f"Found in {json.loads(c.metadata_json).get('title', 'Unknown Book')}" for c in chunks]
-
-            qa_prompt = f"""You are a helpful book assistant. Use the context below to answer the user's question.
-            If the context is empty, say you don't have information about that specific book yet.
-            
-            Context: {context}
-            Question: {query}
-            History: {history}
-            
-            Answer:"""
-            
-            response = await llm_service.llm.ainvoke(qa_prompt)
-            return response.content, list(set(sources))
+            self.last_answer["first_byte_at"] = time.perf_counter()
+            yield "sources", ["Database Query"]
+            yield "token", f"Here are the books I found:\n{answer}"
+            return
+
+        # CONTENT
+        chunks = await self.use_speculation(speculative, route) if speculative else None
+        if chunks is None:
+            chunks = await self.search_similar_chunks(query, book_title=route.title)
+        built = context_builder.build(chunks, history)
+        chat_metrics.record_context(built.tokens, built.tokens_saved)
+        chunks = built.chunks
+        sources = [f"Found in {json.loads(c.metadata_json).get('title', 'Unknown Book')}" for c in chunks]
+        self.last_answer = {
+            "intent": "CONTENT",
+            "book_ids": [c.book_id for c in chunks if c.book_id is not None],
+            "document_ids": [c.document_id for c in chunks],
+            "context_tokens": built.tokens,
+            "context_tokens_saved": built.tokens_saved,
+            "first_byte_at": time.perf_counter(),
+        }
+        # Sources go out before generation starts
+        yield "sources", list(dict.fromkeys(sources))
+
+        qa_prompt = f"""You are a helpful book assistant. Use the context below to answer the user's question.
+        If the context is empty, say you don't have information about that specific book yet.
+        
+        Context: {built.context}
+        Question: {query}
+        History: {built.history}
+        
+        Answer:"""
+
+        first = True
+        tokens = llm_service.stream(qa_prompt)
+        try:
+            async for text in tokens:
+                if first:
+                    self.last_answer["first_token_at"] = time.perf_counter()
+                    first = False
+                yield "token", text
+        finally:
+            await tokens.aclose()
 
 rag_service = RAGService
@@ -1,10 +1,11 @@
 from typing import List
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, not_, desc
 from app.models.book import Book
 from app.models.review import Review
-from app.models.document import DocumentChunk
-from app.services.ingestion_service import embedding_service
+from app.schemas.document import ChunkFilter
+from app.services.vector_store import get_vector_store
 
 class RecommendationService:
     def __init__(self, db: AsyncSession):
@@ -12,21 +13,22 @@ class RecommendationService:
 
     async def get_recommendations(self, user_id: int, limit: int = 5) -> List[Book]:
         # 1. Get user's recent high-rated reviews with embeddings
-        stmt = select(Review).where(
+        # Only the vectors are needed; asyncpg's binary codec decodes them straight into float32 arrays
+        stmt = select(Review.embedding).where(
             Review.user_id == user_id,
             Review.embedding.isnot(None),
             Review.rating >= 4
         ).order_by(Review.id.desc()).limit(10)
         
         result = await self.db.execute(stmt)
-        user_reviews = result.scalars().all()
+        review_vectors = result.scalars().all()
 
         # Get IDs of books already reviewed
         reviewed_stmt = select(Review.book_id).where(Review.user_id == user_id)
         reviewed_ids_res = await self.db.execute(reviewed_stmt)
         reviewed_ids = reviewed_ids_res.scalars().all()
 
-        if not user_reviews:
+        if not review_vectors:
             # IMPROVED FALLBACK: Suggest top-rated books the user hasn't seen
             # Subquery to get average ratings
             avg_rating_stmt = (
@@ -46,30 +48,19 @@ class RecommendationService:
             return result.scalars().all()
 
         # 2. Compute a "User Taste" vector (Semantic Logic)
-        import numpy as np
-        embeddings = [np.array(r.embedding) for r in user_reviews]
-        user_taste_vector = np.mean(embeddings, axis=0).tolist()
+        user_taste_vector = np.stack([np.asarray(v, dtype=np.float32) for v in review_vectors]).mean(axis=0)
 
-        # 3. Use pgvector for semantic matching
-        from app.models.document import Document
-        
-        stmt = (
-            select(Book)
-            .join(Document, Document.book_id == Book.id)
-            .join(DocumentChunk, DocumentChunk.document_id == Document.id)
-            .where(not_(Book.id.in_(reviewed_ids)))
-            .order_by(DocumentChunk.embedding.l2_distance(user_taste_vector))
-            .limit(limit * 3)
+        # 3. Use the vector store for semantic matching
+        hits = await get_vector_store().search(
+            self.db, user_taste_vector, limit * 3, ChunkFilter(exclude_book_ids=list(reviewed_ids))
         )
-        
-        result = await self.db.execute(stmt)
-        books = []
-        seen_ids = set()
-        for b in result.scalars().all():
-            if b.id not in seen_ids:
-                books.append(b)
-                seen_ids.add(b.id)
-            if len(books) >= limit:
+        book_ids = []
+        for hit in hits:
+            if hit.book_id not in book_ids:
+                book_ids.append(hit.book_id)
+            if len(book_ids) >= limit:
                 break
-                
-        return books
+
+        result = await self.db.execute(select(Book).where(Book.id.in_(book_ids)))
+        by_id = {b.id: b for b in result.scalars().all()}
+        return [by_id[book_id] for book_id in book_ids if book_id in by_id]
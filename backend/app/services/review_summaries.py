@@ -0,0 +1,112 @@
+import asyncio
+import os
+import socket
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.crud.crud_book import book as crud_book
+from app.models.book import Book
+from app.models.review import Review
+from app.services.llm_service import llm_service
+
+async def refresh_review_summary(db: AsyncSession, book: Book, full: bool = False) -> Optional[str]:
+    """
+    Bring the book's AI review summary up to date. Reviews added since the
+    last refresh are folded into the existing summary; the summary is
+    rebuilt from every review when asked to (`full`), when there is none
+    yet, and after REVIEW_SUMMARY_FULL_REBUILD_EVERY incremental updates,
+    so drift from repeated folding does not accumulate.
+    """
+    result = await db.execute(
+        select(Review.id, Review.review_text).where(Review.book_id == book.id).order_by(Review.id)
+    )
+    reviews = [(review_id, text) for review_id, text in result.all() if text]
+    if not reviews:
+        book.ai_review_summary = None
+        book.review_summary_review_id = None
+        book.review_summary_updates = 0
+        await db.commit()
+        return None
+
+    full = (
+        full
+        or not book.ai_review_summary
+        or book.review_summary_review_id is None
+        or book.review_summary_updates >= settings.REVIEW_SUMMARY_FULL_REBUILD_EVERY
+    )
+    if full:
+        book.ai_review_summary = await llm_service.generate_review_summary([text for _, text in reviews], db.bind)
+        book.review_summary_updates = 0
+    else:
+        new_reviews = [text for review_id, text in reviews if review_id > book.review_summary_review_id]
+        if new_reviews:
+            book.ai_review_summary = await llm_service.update_review_summary(book.ai_review_summary, new_reviews, db.bind)
+            book.review_summary_updates += 1
+    book.review_summary_review_id = reviews[-1][0]
+    await db.commit()
+    return book.ai_review_summary
+
+class ReviewSummaryRefresher:
+    """
+    Refreshes stale AI review summaries in the background.
+
+    Review writes only mark the book (crud_book.mark_review_summary_stale).
+    Once REVIEW_SUMMARY_DEBOUNCE_SECONDS have passed since the first
+    unsummarized write, a refresher claims the book and updates its summary,
+    so a burst of reviews costs one LLM call. Claims are conditional
+    updates, so any number of refreshers (worker processes, or the API with
+    REVIEW_SUMMARY_EMBEDDED_REFRESHER) can run side by side. Reads keep
+    serving the previous summary meanwhile.
+    """
+
+    def __init__(self, session_factory: sessionmaker, refresher_id: Optional[str] = None):
+        self.session_factory = session_factory
+        self.refresher_id = refresher_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.refreshed = 0
+        self.failures = 0
+        self._stopping = asyncio.Event()
+
+    async def refresh_book(self, book_id: int, dirty_at, rebuild: bool) -> bool:
+        async with self.session_factory() as session:
+            if not await crud_book.claim_review_summary(session, book_id=book_id, dirty_at=dirty_at, rebuild=rebuild):
+                return False
+            try:
+                book = await session.get(Book, book_id)
+                if book is not None:
+                    await refresh_review_summary(session, book, full=rebuild)
+            except Exception as e:
+                self.failures += 1
+                print(f"Review summary refresh for book {book_id} failed: {e}")
+                await session.rollback()
+                await crud_book.release_review_summary(session, book_id=book_id, dirty_at=dirty_at, rebuild=rebuild)
+                return False
+        self.refreshed += 1
+        return True
+
+    async def poll_once(self) -> int:
+        """Refresh the summaries that are due; returns how many were refreshed here."""
+        async with self.session_factory() as session:
+            due = await crud_book.due_review_summaries(session, limit=settings.REVIEW_SUMMARY_BATCH_SIZE)
+        refreshed = 0
+        for book_id, dirty_at, rebuild in due:
+            if await self.refresh_book(book_id, dirty_at, rebuild):
+                refreshed += 1
+        return refreshed
+
+    async def run(self):
+        print(f"Review summary refresher {self.refresher_id} started")
+        while not self._stopping.is_set():
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"Review summary refresher poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.REVIEW_SUMMARY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        print(f"Review summary refresher {self.refresher_id} stopped")
+
+    def stop(self):
+        self._stopping.set()
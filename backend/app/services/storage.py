@@ -0,0 +1,137 @@
+import hashlib
+import os
+import time
+import uuid
+from typing import List, NamedTuple, Optional
+from fastapi import UploadFile
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.executors import run_io
+from app.models.document import Document
+
+class UploadTooLarge(Exception):
+    pass
+
+class StoredFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+def _open_temp(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+def _commit_temp(temp_path: str, final_path: str) -> bool:
+    """Move a finished upload into place. Returns False if the content was already stored."""
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        # Refresh the mtime so a concurrent release() treats the file as in use
+        os.utime(final_path)
+        return False
+    os.replace(temp_path, final_path)
+    return True
+
+def _remove_if_idle(path: str, grace_seconds: float) -> bool:
+    try:
+        if time.time() - os.path.getmtime(path) < grace_seconds:
+            return False
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _idle_files(root: str, grace_seconds: float) -> List[str]:
+    """Stored files not modified within the grace period; in-progress uploads under tmp/ are left alone."""
+    now = time.time()
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == root and "tmp" in dirnames:
+            dirnames.remove("tmp")
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                if now - os.path.getmtime(path) >= grace_seconds:
+                    paths.append(path)
+            except FileNotFoundError:
+                pass
+    return paths
+
+class LocalFileStorage:
+    """
+    Content-addressed file storage on the local filesystem.
+
+    Uploads are streamed to a temporary file in UPLOAD_CHUNK_BYTES pieces
+    (the blocking writes run on the I/O thread pool) while their SHA-256 is
+    computed, then moved to `<root>/<aa>/<bb>/<sha256>`. Identical uploads
+    share one file; a file is deleted once no document references it.
+    Files that were still within the grace period when released are
+    removed later by sweep().
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.UPLOAD_DIR
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    async def save(self, upload: UploadFile, max_bytes: Optional[int] = None) -> StoredFile:
+        max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+        temp_path = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        size = 0
+        out = await run_io(_open_temp, temp_path)
+        try:
+            while True:
+                block = await upload.read(settings.UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+                digest.update(block)
+                await run_io(out.write, block)
+        except BaseException:
+            await run_io(out.close)
+            await run_io(_remove_if_idle, temp_path, 0)
+            raise
+        await run_io(out.close)
+
+        sha256 = digest.hexdigest()
+        final_path = self.path_for(sha256)
+        created = await run_io(_commit_temp, temp_path, final_path)
+        return StoredFile(path=final_path, sha256=sha256, size=size, deduplicated=not created)
+
+    async def reference_count(self, db: AsyncSession, path: str) -> int:
+        result = await db.execute(select(func.count(Document.id)).where(Document.file_path == path))
+        return result.scalar()
+
+    async def release(self, db: AsyncSession, path: str) -> bool:
+        """
+        Delete a file once no document references it. Call after the
+        referencing document has been deleted and committed. Files written
+        or re-uploaded within STORAGE_DELETE_GRACE_SECONDS are kept, since an
+        upload of the same content may not have committed its document yet.
+        """
+        if await self.reference_count(db, path):
+            return False
+        return await run_io(_remove_if_idle, path, settings.STORAGE_DELETE_GRACE_SECONDS)
+
+    async def sweep(self, db: AsyncSession, batch_size: int = 500) -> int:
+        """Delete stored files that no document references; returns how many were removed."""
+        grace = settings.STORAGE_DELETE_GRACE_SECONDS
+        candidates = await run_io(_idle_files, self.root, grace)
+        removed = 0
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            result = await db.execute(select(Document.file_path).where(Document.file_path.in_(batch)))
+            referenced = set(result.scalars().all())
+            for path in batch:
+                # Rechecks the mtime: a duplicate upload may have claimed the file since
+                if path not in referenced and await run_io(_remove_if_idle, path, grace):
+                    removed += 1
+        return removed
+
+storage = LocalFileStorage()
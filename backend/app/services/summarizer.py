@@ -0,0 +1,111 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import settings
+from app.services.llm_service import llm_service
+
+class BookSummarizer:
+    """
+    Map-reduce book summaries.
+
+    The book's sections are summarized in parallel as ingestion streams
+    them (map, see SummaryRun), then groups of SUMMARY_REDUCE_FANOUT
+    summaries are merged level by level until one remains (reduce). Every
+    call goes through the LLM response cache, keyed by its prompt, so
+    re-ingesting the same file cuts the same sections and reuses every
+    summary. Any other file starts from scratch: stored files are never
+    edited in place, and section boundaries shift after an insertion.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.SUMMARY_MAX_CONCURRENCY
+        # One semaphore per event loop, as in BatchEmbedder
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            self._semaphores = {l: s for l, s in self._semaphores.items() if not l.is_closed()}
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run_level(self, inputs: List[List[str]], call: Callable[[List[str]], Awaitable[str]]) -> List[str]:
+        """Run one map or reduce level, up to max_concurrency calls at a time."""
+        async def run(texts: List[str]) -> str:
+            async with self._semaphore():
+                return await call(texts)
+
+        return list(await asyncio.gather(*(run(texts) for texts in inputs)))
+
+    async def reduce(self, engine: AsyncEngine, summaries: List[str], stats: Dict[str, int]) -> str:
+        """Merge groups of section summaries until few enough remain for the final call."""
+        fanout = max(settings.SUMMARY_REDUCE_FANOUT, 2)
+        while len(summaries) > fanout:
+            groups = [summaries[i:i + fanout] for i in range(0, len(summaries), fanout)]
+            summaries = await self._run_level(
+                groups, lambda texts: llm_service.combine_summaries(texts, engine=engine, stats=stats)
+            )
+        final = await self._run_level(
+            [summaries], lambda texts: llm_service.combine_summaries(texts, final=True, engine=engine, stats=stats)
+        )
+        return final[0]
+
+    def start(self, engine: AsyncEngine) -> "SummaryRun":
+        return SummaryRun(self, engine)
+
+class SummaryRun:
+    """
+    One book's summary, built from the sections of the ingestion pass as
+    they are parsed (see SectionBuilder), so the file is read only once.
+    Each section is summarized (map) as soon as it arrives; add() waits
+    while max_concurrency sections are still being summarized, so only a
+    few are held at a time. The first section is kept back until a second
+    one arrives, since a one-section book is summarized directly. `stats`
+    collects LLM call and cache hit counts.
+    """
+
+    def __init__(self, summarizer: BookSummarizer, engine: AsyncEngine):
+        self.summarizer = summarizer
+        self.engine = engine
+        self.stats: Dict[str, int] = {}
+        self._held = asyncio.Semaphore(summarizer.max_concurrency)
+        self._first: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def _map(self, section: str) -> str:
+        try:
+            summaries = await self.summarizer._run_level(
+                [[section]], lambda texts: llm_service.summarize_section(texts[0], self.engine, stats=self.stats)
+            )
+            return summaries[0]
+        finally:
+            self._held.release()
+
+    async def add(self, section: str):
+        if self._first is None and not self._tasks:
+            self._first = section
+            return
+        pending = [self._first, section] if self._first is not None else [section]
+        self._first = None
+        for text in pending:
+            await self._held.acquire()
+            self._tasks.append(asyncio.create_task(self._map(text)))
+
+    async def result(self) -> Optional[str]:
+        """Wait for the section summaries and reduce them to the book's summary."""
+        if self._first is not None:
+            short = await self.summarizer._run_level(
+                [[self._first]], lambda texts: llm_service.generate_summary(texts[0], self.engine, stats=self.stats)
+            )
+            return short[0]
+        if not self._tasks:
+            return None
+        summaries = await asyncio.gather(*self._tasks)
+        return await self.summarizer.reduce(self.engine, list(summaries), self.stats)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+book_summarizer = BookSummarizer()
@@ -0,0 +1,371 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.executors import run_io
+from app.db.vector_index import apply_search_settings, distance
+from app.models.document import DocumentChunk
+from app.schemas.document import ChunkFilter
+
+class VectorRecord(NamedTuple):
+    chunk_id: int
+    document_id: int
+    embedding: Sequence[float]
+    book_id: Optional[int] = None
+    genre: Optional[str] = None
+    author: Optional[str] = None
+    year_published: Optional[int] = None
+
+class VectorHit(NamedTuple):
+    chunk_id: int
+    document_id: int
+    book_id: Optional[int]
+    distance: float
+
+def apply_chunk_filters(stmt, filters: ChunkFilter):
+    """Restrict a chunk query to the filters, using the indexed book columns."""
+    if filters.book_ids is not None:
+        stmt = stmt.where(DocumentChunk.book_id.in_(filters.book_ids))
+    if filters.exclude_book_ids is not None:
+        stmt = stmt.where(DocumentChunk.book_id.is_not(None), DocumentChunk.book_id.not_in(filters.exclude_book_ids))
+    if filters.genre:
+        stmt = stmt.where(func.lower(DocumentChunk.genre) == filters.genre.lower())
+    if filters.author:
+        stmt = stmt.where(func.lower(DocumentChunk.author) == filters.author.lower())
+    if filters.year_from is not None:
+        stmt = stmt.where(DocumentChunk.year_published >= filters.year_from)
+    if filters.year_to is not None:
+        stmt = stmt.where(DocumentChunk.year_published <= filters.year_to)
+    return stmt
+
+class VectorStore(ABC):
+    """Nearest-neighbour search over document chunk embeddings."""
+
+    @abstractmethod
+    async def upsert(self, db: AsyncSession, records: Sequence[VectorRecord]):
+        ...
+
+    @abstractmethod
+    async def delete_document(self, db: AsyncSession, document_id: int):
+        ...
+
+    @abstractmethod
+    async def search(
+        self, db: AsyncSession, vector: Sequence[float], limit: int, filters: Optional[ChunkFilter] = None
+    ) -> List[VectorHit]:
+        """Closest chunks first, restricted to `filters`."""
+        ...
+
+class PgVectorStore(VectorStore):
+    """
+    Search with pgvector in Postgres. Vectors live in the document_chunks
+    rows written by ingestion, so upsert and delete have nothing to do.
+    """
+
+    async def upsert(self, db: AsyncSession, records: Sequence[VectorRecord]):
+        pass
+
+    async def delete_document(self, db: AsyncSession, document_id: int):
+        pass
+
+    async def search(
+        self, db: AsyncSession, vector: Sequence[float], limit: int, filters: Optional[ChunkFilter] = None
+    ) -> List[VectorHit]:
+        filters = filters or ChunkFilter()
+        dist = distance(DocumentChunk.embedding, vector)
+        stmt = apply_chunk_filters(
+            select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.book_id, dist.label("distance")),
+            filters,
+        ).order_by(dist).limit(limit)
+        await apply_search_settings(db, filtered=filters != ChunkFilter())
+        result = await db.execute(stmt)
+        return [VectorHit(*row) for row in result.all()]
+
+# Sentinels for missing integer filter values
+NO_BOOK = -1
+NO_YEAR = np.iinfo(np.int32).min
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact search with NumPy.
+
+    Vectors are kept in one contiguous float32 matrix (rows normalized up
+    front for cosine, with cached squared norms for L2), so a search is a
+    single matrix-vector product over the rows that pass the filters plus
+    an argpartition top-k. The store can be saved to a directory and loaded
+    back memory-mapped.
+
+    Chunks are written to Postgres by the ingestion worker, possibly in
+    another process, so the store catches up with sync() before searching:
+    new chunk ids are pulled in, deleted ones dropped and the filter columns
+    of updated rows (DocumentChunk.updated_at) re-read.
+    """
+
+    def __init__(self, dim: int = 1536, metric: Optional[str] = None):
+        self.dim = dim
+        self.metric = metric or settings.VECTOR_DISTANCE
+        if self.metric not in ("cosine", "l2"):
+            raise ValueError(f"Unknown vector distance {self.metric!r}")
+        self._lock = threading.RLock()
+        self._last_sync = 0.0
+        # None until the first sync, which re-reads every row updated since it was written
+        self._updated_since: Optional[datetime] = None
+        self._allocate(0)
+
+    def _allocate(self, capacity: int):
+        self._size = 0
+        self._index: Dict[int, int] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._document_ids = np.zeros(capacity, dtype=np.int64)
+        self._book_ids = np.full(capacity, NO_BOOK, dtype=np.int64)
+        self._years = np.full(capacity, NO_YEAR, dtype=np.int32)
+        self._genres = np.full(capacity, None, dtype=object)
+        self._authors = np.full(capacity, None, dtype=object)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _grow(self, needed: int):
+        capacity = len(self._ids)
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        fills = {"_book_ids": NO_BOOK, "_years": NO_YEAR, "_genres": None, "_authors": None}
+        for name in ("_ids", "_document_ids", "_book_ids", "_years", "_genres", "_authors", "_alive", "_sq_norms"):
+            old = getattr(self, name)
+            new = np.full(new_capacity, fills.get(name, 0), dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+
+    def _compact(self):
+        """Drop deleted rows once they make up a quarter of the matrix."""
+        dead = self._size - len(self._index)
+        if dead == 0 or dead * 4 < self._size:
+            return
+        keep = np.flatnonzero(self._alive[:self._size])
+        for name in ("_ids", "_document_ids", "_book_ids", "_years", "_genres", "_authors", "_alive", "_sq_norms", "_vectors"):
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[keep]))
+        self._size = len(keep)
+        self._index = {int(chunk_id): row for row, chunk_id in enumerate(self._ids[:self._size])}
+
+    def _upsert(self, records: Sequence[VectorRecord]):
+        with self._lock:
+            self._grow(self._size + len(records))
+            for record in records:
+                row = self._index.get(record.chunk_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._index[record.chunk_id] = row
+                vector = np.asarray(record.embedding, dtype=np.float32)
+                if self.metric == "cosine":
+                    norm = np.linalg.norm(vector)
+                    vector = vector / norm if norm else vector
+                self._vectors[row] = vector
+                self._sq_norms[row] = float(vector @ vector)
+                self._ids[row] = record.chunk_id
+                self._document_ids[row] = record.document_id
+                self._book_ids[row] = NO_BOOK if record.book_id is None else record.book_id
+                self._years[row] = NO_YEAR if record.year_published is None else record.year_published
+                self._genres[row] = record.genre.lower() if record.genre else None
+                self._authors[row] = record.author.lower() if record.author else None
+                self._alive[row] = True
+
+    def _update_metadata(self, rows: Sequence[tuple]):
+        """Apply (chunk_id, book_id, genre, author, year_published) rows to chunks already held."""
+        with self._lock:
+            for chunk_id, book_id, genre, author, year_published in rows:
+                row = self._index.get(chunk_id)
+                if row is None:
+                    continue
+                self._book_ids[row] = NO_BOOK if book_id is None else book_id
+                self._years[row] = NO_YEAR if year_published is None else year_published
+                self._genres[row] = genre.lower() if genre else None
+                self._authors[row] = author.lower() if author else None
+
+    def _delete(self, chunk_ids: Optional[Sequence[int]] = None, document_id: Optional[int] = None):
+        with self._lock:
+            if document_id is not None:
+                rows = np.flatnonzero(self._alive[:self._size] & (self._document_ids[:self._size] == document_id))
+            else:
+                rows = [self._index[chunk_id] for chunk_id in chunk_ids if chunk_id in self._index]
+            for row in rows:
+                self._alive[row] = False
+                self._index.pop(int(self._ids[row]), None)
+            self._compact()
+
+    def _mask(self, filters: ChunkFilter) -> np.ndarray:
+        n = self._size
+        mask = self._alive[:n].copy()
+        if filters.book_ids is not None:
+            mask &= np.isin(self._book_ids[:n], filters.book_ids)
+        if filters.exclude_book_ids is not None:
+            mask &= (self._book_ids[:n] != NO_BOOK) & ~np.isin(self._book_ids[:n], filters.exclude_book_ids)
+        if filters.genre:
+            mask &= self._genres[:n] == filters.genre.lower()
+        if filters.author:
+            mask &= self._authors[:n] == filters.author.lower()
+        if filters.year_from is not None:
+            mask &= (self._years[:n] != NO_YEAR) & (self._years[:n] >= filters.year_from)
+        if filters.year_to is not None:
+            mask &= (self._years[:n] != NO_YEAR) & (self._years[:n] <= filters.year_to)
+        return mask
+
+    def search_sync(self, vector: Sequence[float], limit: int, filters: Optional[ChunkFilter] = None) -> List[VectorHit]:
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            mask = self._mask(filters or ChunkFilter())
+            rows = np.flatnonzero(mask)
+            if rows.size == 0 or limit <= 0:
+                return []
+            # A full scan avoids copying the matrix through fancy indexing
+            matrix = self._vectors[:self._size] if rows.size == self._size else self._vectors[rows]
+            products = matrix @ query
+            if self.metric == "cosine":
+                norm = np.linalg.norm(query)
+                distances = 1.0 - products / norm if norm else 1.0 - products
+            else:
+                sq_norms = self._sq_norms[:self._size] if rows.size == self._size else self._sq_norms[rows]
+                distances = np.sqrt(np.maximum(sq_norms - 2.0 * products + query @ query, 0.0))
+            k = min(limit, rows.size)
+            top = np.argpartition(distances, k - 1)[:k] if k < rows.size else np.arange(rows.size)
+            top = top[np.argsort(distances[top], kind="stable")]
+            hits = []
+            for i in top:
+                row = rows[i]
+                book_id = int(self._book_ids[row])
+                hits.append(VectorHit(
+                    int(self._ids[row]), int(self._document_ids[row]),
+                    None if book_id == NO_BOOK else book_id, float(distances[i]),
+                ))
+            return hits
+
+    async def upsert(self, db: AsyncSession, records: Sequence[VectorRecord]):
+        await run_io(self._upsert, records)
+
+    async def delete_document(self, db: AsyncSession, document_id: int):
+        await run_io(self._delete, document_id=document_id)
+
+    async def search(
+        self, db: AsyncSession, vector: Sequence[float], limit: int, filters: Optional[ChunkFilter] = None
+    ) -> List[VectorHit]:
+        if time.monotonic() - self._last_sync >= settings.VECTOR_STORE_SYNC_SECONDS:
+            await self.sync(db)
+        # NumPy releases the GIL in the matrix product, so search off the event loop
+        return await run_io(self.search_sync, vector, limit, filters)
+
+    async def sync(self, db: AsyncSession, batch_size: int = 2000) -> Dict[str, int]:
+        """Load chunks written since the last sync, refresh updated ones and forget deleted ones."""
+        self._last_sync = time.monotonic()
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            high_water = int(self._ids[:self._size].max()) if self._size else 0
+        # Ids are assigned before commit, so look back a little for late commits
+        result = await db.execute(
+            select(DocumentChunk.id).where(DocumentChunk.id > high_water - settings.VECTOR_STORE_SYNC_OVERLAP)
+        )
+        missing = [chunk_id for chunk_id in result.scalars().all() if chunk_id not in self._index]
+        for start in range(0, len(missing), batch_size):
+            result = await db.execute(
+                select(
+                    DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding, DocumentChunk.book_id,
+                    DocumentChunk.genre, DocumentChunk.author, DocumentChunk.year_published,
+                ).where(DocumentChunk.id.in_(missing[start:start + batch_size]), DocumentChunk.embedding.is_not(None))
+            )
+            await self.upsert(db, [VectorRecord(*row) for row in result.all()])
+
+        # Book edits and re-ingests rewrite the filter columns in place; embeddings never change
+        stmt = select(
+            DocumentChunk.id, DocumentChunk.book_id, DocumentChunk.genre, DocumentChunk.author,
+            DocumentChunk.year_published,
+        )
+        if self._updated_since is None:
+            stmt = stmt.where(DocumentChunk.updated_at.is_not(None))
+        else:
+            stmt = stmt.where(DocumentChunk.updated_at >= self._updated_since)
+        updated = (await db.execute(stmt)).all()
+        await run_io(self._update_metadata, updated)
+        self._updated_since = started - timedelta(seconds=settings.VECTOR_STORE_SYNC_LOOKBACK_SECONDS)
+
+        removed = 0
+        total = (await db.execute(select(func.count(DocumentChunk.id)).where(DocumentChunk.embedding.is_not(None)))).scalar()
+        if total != len(self):
+            existing = set((await db.execute(select(DocumentChunk.id))).scalars().all())
+            stale = [chunk_id for chunk_id in list(self._index) if chunk_id not in existing]
+            removed = len(stale)
+            await run_io(self._delete, chunk_ids=stale)
+        return {"added": len(missing), "updated": len(updated), "removed": removed, "size": len(self)}
+
+    def save(self, path: str):
+        """Write the live rows to `path` as .npy files that load() can memory-map."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._size])
+            os.makedirs(path, exist_ok=True)
+            np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(self._vectors[keep]))
+            for name in ("ids", "document_ids", "book_ids", "years"):
+                np.save(os.path.join(path, f"{name}.npy"), getattr(self, f"_{name}")[keep])
+            with open(os.path.join(path, "meta.json"), "w") as f:
+                json.dump({
+                    "dim": self.dim,
+                    "metric": self.metric,
+                    "genres": self._genres[keep].tolist(),
+                    "authors": self._authors[keep].tolist(),
+                }, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyVectorStore":
+        """Load a saved store; with mmap the vectors are paged in from disk on demand."""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        store = cls(dim=meta["dim"], metric=meta["metric"])
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        size = len(vectors)
+        store._vectors = vectors
+        for name in ("ids", "document_ids", "book_ids", "years"):
+            setattr(store, f"_{name}", np.load(os.path.join(path, f"{name}.npy")))
+        store._genres = np.array(meta["genres"], dtype=object)
+        store._authors = np.array(meta["authors"], dtype=object)
+        store._alive = np.ones(size, dtype=bool)
+        # Only L2 uses the norms; cosine rows are already unit length
+        if store.metric == "l2":
+            store._sq_norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+        else:
+            store._sq_norms = np.ones(size, dtype=np.float32)
+        store._size = size
+        store._index = {int(chunk_id): row for row, chunk_id in enumerate(store._ids)}
+        return store
+
+_vector_store: Optional[VectorStore] = None
+
+def get_vector_store() -> VectorStore:
+    """The configured store (VECTOR_STORE = pgvector or numpy), created on first use."""
+    global _vector_store
+    if _vector_store is None:
+        if settings.VECTOR_STORE == "numpy":
+            path = settings.VECTOR_STORE_PATH
+            if path and os.path.exists(os.path.join(path, "meta.json")):
+                _vector_store = NumpyVectorStore.load(path)
+            else:
+                _vector_store = NumpyVectorStore()
+        elif settings.VECTOR_STORE == "pgvector":
+            _vector_store = PgVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_STORE {settings.VECTOR_STORE!r}, expected pgvector or numpy")
+    return _vector_store
+
+def set_vector_store(store: Optional[VectorStore]):
+    global _vector_store
+    _vector_store = store
@@ -1,12 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.api import api_router
+from app.core.executors import shutdown_executors
+from app.db.session import AsyncSessionLocal
+from app.services.ingestion_worker import IngestionWorker
+from app.services.vector_store import NumpyVectorStore, get_vector_store
+from app.services.llm_gateway import llm_gateway
+from app.services.review_summaries import ReviewSummaryRefresher
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker = None
+    if settings.INGESTION_EMBEDDED_WORKER_SLOTS > 0:
+        worker = IngestionWorker(AsyncSessionLocal, slots=settings.INGESTION_EMBEDDED_WORKER_SLOTS)
+        worker_task = asyncio.create_task(worker.run())
+    refresher = None
+    if settings.REVIEW_SUMMARY_BACKGROUND and settings.REVIEW_SUMMARY_EMBEDDED_REFRESHER:
+        refresher = ReviewSummaryRefresher(AsyncSessionLocal)
+        refresher_task = asyncio.create_task(refresher.run())
+    yield
+    if worker:
+        worker.stop()
+        await worker_task
+    if refresher:
+        refresher.stop()
+        await refresher_task
+    store = get_vector_store()
+    if isinstance(store, NumpyVectorStore) and settings.VECTOR_STORE_PATH:
+        store.save(settings.VECTOR_STORE_PATH)
+    await llm_gateway.aclose()
+    shutdown_executors()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+
+# Add the parent directory (backend) to the python path to allow 'app' imports
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.session import engine as app_engine
+from app.models import user, book, review  # noqa: F401 - register tables
+from app.models.document import Document, DocumentChunk
+from app.crud.crud_document import document_chunk as crud_document_chunk
+
+DIM = 1536
+
+def make_rows(document_id: int, start: int, count: int):
+    return [
+        {
+            "document_id": document_id,
+            "chunk_index": start + i,
+            "page_number": (start + i) // 3 + 1,
+            "content": "Lorem ipsum dolor sit amet. " * 35,
+            "metadata_json": '{"title": "Benchmark"}',
+            "embedding": [random.random() for _ in range(DIM)],
+        }
+        for i in range(count)
+    ]
+
+async def orm_path(db: AsyncSession, document_id: int, batches):
+    for rows in batches:
+        db.add_all([DocumentChunk(**row) for row in rows])
+        await db.commit()
+
+async def bulk_path(db: AsyncSession, document_id: int, batches):
+    for rows in batches:
+        await crud_document_chunk.bulk_create(db, rows=rows)
+
+async def run(total: int, batch_size: int, sqlite: bool):
+    engine = create_async_engine("sqlite+aiosqlite:///./benchmark.db") if sqlite else app_engine
+    if sqlite:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"Writing {total} chunks in batches of {batch_size} ({engine.dialect.name})")
+    for name, path in [("orm", orm_path), ("bulk", bulk_path)]:
+        async with Session() as db:
+            doc = Document(filename=f"benchmark-{name}.txt", file_path="/dev/null", status="benchmark")
+            db.add(doc)
+            await db.commit()
+            # Vectors are generated up front so only the write is timed
+            batches = [make_rows(doc.id, start, min(batch_size, total - start)) for start in range(0, total, batch_size)]
+
+            started = time.perf_counter()
+            await path(db, doc.id, batches)
+            elapsed = time.perf_counter() - started
+            print(f"{name:>5}: {elapsed:7.2f}s  {total / elapsed:10.1f} rows/sec")
+
+            await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == doc.id))
+            await db.delete(doc)
+            await db.commit()
+
+    await engine.dispose()
+    if sqlite and os.path.exists("benchmark.db"):
+        os.remove("benchmark.db")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM and bulk write throughput for document chunks.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--sqlite", action="store_true", help="Use a throwaway SQLite file instead of Postgres")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.batch_size, args.sqlite))
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import random
+import shutil
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory (backend) to the python path to allow 'app' imports
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+WORDS = (
+    "the ship sailed north across a grey sea while the captain kept watch over her crew "
+    "and the old map promised an island of silver forests rivers towers and forgotten songs"
+).split()
+
+def write_book(path: str, paragraphs: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(paragraphs):
+            f.write(" ".join(rng.choice(WORDS) for _ in range(120)) + ".\n\n")
+
+async def run(args):
+    # Imported here: the fake providers are configured from the environment set in __main__
+    import numpy as np
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.core.config import settings
+    from app.db.base import Base
+    from app.db.session import engine as app_engine
+    from app.models import user, review  # noqa: F401 - register tables
+    from app.models.book import Book
+    from app.models.document import Document
+    from app.services.ingestion_service import IngestionService
+    from app.services.llm_gateway import llm_gateway
+    from app.services.rag_service import RAGService
+    from app.services.vector_store import NumpyVectorStore, set_vector_store
+
+    # Every question should reach the pipeline, not the answer cache
+    settings.RAG_ANSWER_CACHE_ENABLED = False
+    engine = create_async_engine("sqlite+aiosqlite:///./benchmark.db") if args.sqlite else app_engine
+    if args.sqlite:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        # pgvector operators are not available on SQLite
+        set_vector_store(NumpyVectorStore())
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    workdir = tempfile.mkdtemp()
+    print(f"Ingesting {args.docs} books of {args.paragraphs} paragraphs ({engine.dialect.name}, fake providers)")
+    started = time.perf_counter()
+    chunks = 0
+    for i in range(args.docs):
+        path = os.path.join(workdir, f"book-{i}.txt")
+        write_book(path, args.paragraphs, seed=i)
+        async with Session() as db:
+            book = Book(title=f"Benchmark Book {i}", author="Benchmark", genre="Test", year_published=2000)
+            db.add(book)
+            await db.commit()
+            doc = Document(filename=f"book-{i}.txt", file_path=path, book_id=book.id)
+            db.add(doc)
+            await db.commit()
+            report = await IngestionService(db).ingest_document(doc.id)
+            chunks += report["chunks"]
+    elapsed = time.perf_counter() - started
+    print(f"ingest: {elapsed:7.2f}s  {chunks / elapsed:10.1f} chunks/sec")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def ask(i: int):
+        async with semaphore, Session() as db:
+            asked = time.perf_counter()
+            await RAGService(db).answer_question(f"What happens to the captain in Benchmark Book {i % args.docs}? ({i})")
+            latencies.append(time.perf_counter() - asked)
+
+    print(f"Answering {args.questions} questions, {args.concurrency} at a time")
+    started = time.perf_counter()
+    await asyncio.gather(*(ask(i) for i in range(args.questions)))
+    elapsed = time.perf_counter() - started
+    p50, p95 = np.percentile(np.array(latencies) * 1000, [50, 95])
+    print(f"  chat: {elapsed:7.2f}s  {args.questions / elapsed:10.1f} answers/sec  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+
+    await llm_gateway.aclose()
+    await engine.dispose()
+    shutil.rmtree(workdir)
+    if args.sqlite and os.path.exists("benchmark.db"):
+        os.remove("benchmark.db")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ingestion and chat throughput with offline model providers.")
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--paragraphs", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated token rate, 0 for instant")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedding request")
+    parser.add_argument("--sqlite", action="store_true", help="Use a throwaway SQLite file instead of Postgres")
+    args = parser.parse_args()
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDING_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["FAKE_EMBEDDING_LATENCY_SECONDS"] = str(args.embedding_latency)
+    asyncio.run(run(args))
@@ -0,0 +1,63 @@
+import argparse
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory (backend) to the python path to allow 'app' imports
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.schemas.document import ChunkFilter
+from app.services.vector_store import NumpyVectorStore, VectorRecord
+
+DIM = 1536
+
+def build(rows: int, metric: str, books: int) -> NumpyVectorStore:
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(dim=DIM, metric=metric)
+    batch = 10_000
+    for start in range(0, rows, batch):
+        vectors = rng.standard_normal((min(batch, rows - start), DIM), dtype=np.float32)
+        store._upsert([
+            VectorRecord(start + i + 1, (start + i) // 100 + 1, vector, book_id=(start + i) % books + 1)
+            for i, vector in enumerate(vectors)
+        ])
+    return store
+
+def measure(store: NumpyVectorStore, queries: np.ndarray, limit: int, filters=None):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        store.search_sync(query, limit, filters)
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+def run(rows: int, queries: int, limit: int, metric: str, books: int):
+    print(f"Building a {metric} store with {rows} x {DIM} vectors")
+    store = build(rows, metric, books)
+    query_vectors = np.random.default_rng(1).standard_normal((queries, DIM), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as path:
+        store.save(path)
+        mapped = NumpyVectorStore.load(path, mmap=True)
+        cases = [
+            ("in-memory", store, None),
+            ("mmap", mapped, None),
+            ("filtered", store, ChunkFilter(book_ids=list(range(1, max(books // 10, 1) + 1)))),
+        ]
+        for name, target, filters in cases:
+            p50, p95 = measure(target, query_vectors, limit, filters)
+            print(f"{name:>10}: p50 {p50:7.2f}ms  p95 {p95:7.2f}ms  top-{limit}")
+        del mapped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure NumPy vector store search latency.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--metric", choices=["cosine", "l2"], default="cosine")
+    parser.add_argument("--books", type=int, default=500)
+    args = parser.parse_args()
+    run(args.rows, args.queries, args.limit, args.metric, args.books)
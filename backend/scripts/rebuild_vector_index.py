@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the parent directory (backend) to the python path to allow 'app' imports
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from app.core.config import settings
+from app.db.session import engine
+from app.db.vector_index import INDEX_METHODS, OPERATOR_CLASSES, create_index_sql, drop_index_sql
+
+async def rebuild(method: str, metric: str, drop_others: bool):
+    # CREATE/DROP INDEX CONCURRENTLY must run outside a transaction
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        rows = (await conn.execute(text("SELECT count(*) FROM document_chunks"))).scalar()
+        sql = create_index_sql("document_chunks", "embedding", method, metric, rows=rows)
+        print(f"{sql} ({rows} rows)")
+        await conn.execute(text(sql))
+        if drop_others:
+            for other_method in INDEX_METHODS:
+                for other_metric in OPERATOR_CLASSES:
+                    if (other_method, other_metric) != (method, metric):
+                        await conn.execute(text(drop_index_sql("document_chunks", "embedding", other_method, other_metric)))
+    await engine.dispose()
+    print(f"Done. Set VECTOR_INDEX={method} and VECTOR_DISTANCE={metric} so queries use this index.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the ANN index on document_chunks.embedding.")
+    parser.add_argument("--method", choices=INDEX_METHODS, default=settings.VECTOR_INDEX)
+    parser.add_argument("--distance", choices=tuple(OPERATOR_CLASSES), default=settings.VECTOR_DISTANCE)
+    parser.add_argument("--drop-others", action="store_true", help="Drop vector indexes for other methods/distances")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.method, args.distance, args.drop_others))
@@ -1,3 +1,9 @@
+import os
+# Offline models, unless a test swaps in its own; set before the settings are loaded
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("EMBEDDING_PROVIDER", "fake")
+
+import pytest
 import pytest_asyncio
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
@@ -9,6 +15,8 @@ from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
 from app.core.security import get_password_hash, create_access_token
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.answer_cache import answer_cache
 
 # Use a separate test database
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -66,4 +74,15 @@ async def superuser_token_headers(db_session: AsyncSession) -> dict:
     await db_session.refresh(user)
     
     token = create_access_token(subject=user.id)
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest_asyncio.fixture(scope="function")
+async def session_factory(db_session: AsyncSession):
+    """Session factory bound to the test database, for code that opens its own sessions."""
+    return TestingSessionLocal
+
+@pytest.fixture(autouse=True)
+def clear_query_caches():
+    """Fake embedding and LLM clients differ per test, so cached queries and answers must not leak between them."""
+    query_embedding_cache.clear()
+    answer_cache.clear()
@@ -0,0 +1,95 @@
+import pytest
+from types import SimpleNamespace
+
+from app.models.book import Book
+from app.models.document import Document, DocumentChunk, IngestionRun
+from app.services import rag_service as rag_module
+from app.services.answer_cache import answer_cache
+from app.services.llm_service import llm_service
+from app.services.rag_service import RAGService
+from app.services.vector_store import NumpyVectorStore, set_vector_store
+
+class TopicEmbeddings:
+    """Questions about the same topic get the same direction."""
+    model = "test-embedding"
+
+    async def aembed_query(self, text):
+        vector = [0.0] * 1536
+        vector[0 if "hero" in text.lower() else 1] = 1.0
+        return vector
+
+class ScriptedLLM:
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        if "extract its intent" in prompt:
+            return SimpleNamespace(content='{"intent": "CONTENT", "title": null}')
+        return SimpleNamespace(content=f"Answer {self.calls}")
+
+    async def astream(self, prompt):
+        yield await self.ainvoke(prompt)
+
+@pytest.fixture
+def scripted(monkeypatch):
+    llm = ScriptedLLM()
+    monkeypatch.setattr(llm_service, "llm", llm)
+    monkeypatch.setattr(rag_module, "embedding_service", TopicEmbeddings())
+    set_vector_store(NumpyVectorStore())
+    yield llm
+    set_vector_store(None)
+
+async def add_book(db_session):
+    book = Book(title="Dune", author="Frank Herbert", genre="Sci-Fi", year_published=1965)
+    db_session.add(book)
+    await db_session.commit()
+    doc = Document(filename="dune.txt", file_path="/dev/null", status="ready", book_id=book.id)
+    db_session.add(doc)
+    await db_session.commit()
+    db_session.add(DocumentChunk(
+        document_id=doc.id, chunk_index=0, content="Paul is the hero of the story.",
+        metadata_json='{"title": "Dune"}', embedding=[1.0] + [0.0] * 1535, book_id=book.id,
+    ))
+    await db_session.commit()
+    return book.id, doc.id
+
+async def test_similar_question_is_answered_from_cache(db_session, scripted):
+    book_id, doc_id = await add_book(db_session)
+    rag = RAGService(db_session)
+
+    answer, sources = await rag.answer_question("Who is the hero of Dune?")
+    calls = scripted.calls
+    again, again_sources = await rag.answer_question("Who's the hero in Dune?")
+    assert (again, again_sources) == (answer, sources)
+    assert scripted.calls == calls
+    assert answer_cache.stats()["hits"] == 1
+
+    # A different question misses
+    await rag.answer_question("What is the weather like?")
+    assert scripted.calls > calls
+
+async def test_reingested_book_invalidates_cached_answers(db_session, scripted):
+    book_id, doc_id = await add_book(db_session)
+    rag = RAGService(db_session)
+    first, _ = await rag.answer_question("Who is the hero of Dune?")
+
+    # Another process re-ingests the book: the recorded run changes the fingerprint
+    db_session.add(IngestionRun(document_id=doc_id, mode="full", status="succeeded", total_seconds=1.0))
+    await db_session.commit()
+    second, _ = await rag.answer_question("Who is the hero of Dune?")
+    assert second != first
+    assert answer_cache.stats()["stale"] == 1
+
+    # In-process invalidation by book
+    assert answer_cache.invalidate(book_ids=[book_id]) == 1
+    assert len(answer_cache) == 0
+
+async def test_follow_ups_bypass_the_cache(db_session, scripted):
+    await add_book(db_session)
+    rag = RAGService(db_session)
+    history = [{"role": "user", "content": "Tell me about Dune"}]
+    await rag.answer_question("Who is the hero?", history)
+    assert len(answer_cache) == 0
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+from app.core.config import settings
+from app.models.book import Book
+from app.models.document import Document
+from app.services import chunking, ingestion_service
+from app.services.ingestion_service import IngestionService
+from app.services.llm_service import llm_service
+from app.services.summarizer import book_summarizer
+
+class FakeLLM:
+    """Chat model that answers the summarizer's prompts and records their load."""
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.summarized_chars = 0
+        self.started = asyncio.Event()
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.started.set()
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        header, text = prompt.split(":\n\n", 1)
+        if header.startswith("Summarize this section"):
+            self.summarized_chars += len(text)
+            return SimpleNamespace(content=f"section of {len(text)} chars")
+        final = "whole book" in header
+        return SimpleNamespace(content=("book: " if final else "merged: ") + str(len(text.split("\n\n"))))
+
+class WaitingEmbeddings:
+    """Only answers once summarization has started, so a serial pipeline would time out."""
+    model = "test-embedding"
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    async def aembed_documents(self, texts):
+        await asyncio.wait_for(self.llm.started.wait(), timeout=5)
+        return [[0.3] * 1536 for _ in texts]
+
+async def test_summary_covers_whole_book_and_is_cached(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(settings, "SUMMARY_SECTION_CHARS", 500)
+    monkeypatch.setattr(settings, "SUMMARY_REDUCE_FANOUT", 3)
+    monkeypatch.setattr(book_summarizer, "max_concurrency", 2)
+    llm = FakeLLM()
+    monkeypatch.setattr(llm_service, "llm", llm)
+    monkeypatch.setattr(ingestion_service, "embedding_service", WaitingEmbeddings(llm))
+    read_pages = chunking.read_pages
+    reads = []
+
+    def counting_read_pages(file_path, filename, cursor=0, max_pages=1):
+        reads.append(cursor)
+        return read_pages(file_path, filename, cursor, max_pages)
+    monkeypatch.setattr(chunking, "read_pages", counting_read_pages)
+
+    book_path = tmp_path / "book.txt"
+    text = "\n".join(f"Sentence {i} of a long book that goes on and on." for i in range(200))
+    book_path.write_text(text)
+    book = Book(title="Long Book", author="Someone")
+    db_session.add(book)
+    await db_session.commit()
+    doc = Document(filename="book.txt", file_path=str(book_path), book_id=book.id)
+    db_session.add(doc)
+    await db_session.commit()
+    doc_id, book_id = doc.id, book.id
+
+    await IngestionService(db_session).ingest_document(doc_id)
+
+    book = await db_session.get(Book, book_id)
+    await db_session.refresh(book)
+    assert book.summary == "book: 3"
+    # Every section of the book was summarized, not just the opening
+    assert llm.summarized_chars >= len(text) - 200
+    assert llm.max_in_flight == 2
+    # Sections come from the embedding pass; the file is parsed once
+    assert reads.count(0) == 1
+    first_run_calls = llm.calls
+
+    # Re-ingesting the unchanged book reuses every cached section and merge
+    service = IngestionService(db_session)
+    await service.ingest_document(doc_id, mode="incremental")
+    assert llm.calls == first_run_calls
+    assert service.metrics.stages["summary"]["cached"] > 0
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.document import Document, DocumentChunk
+from app.services import rag_service as rag_module
+from app.services.answer_cache import answer_cache
+from app.services.llm_service import llm_service
+from app.services.rag_service import RAGService
+from app.services.vector_store import NumpyVectorStore, set_vector_store
+
+class StreamingLLM:
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.closed = False
+        self.tokens_sent = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        return SimpleNamespace(content='{"intent": "CONTENT"}')
+
+    async def astream(self, prompt):
+        try:
+            for word in ["Paul ", "is ", "the ", "hero."]:
+                await asyncio.sleep(0)
+                self.tokens_sent += 1
+                yield SimpleNamespace(content=word)
+        finally:
+            self.closed = True
+
+class FixedEmbeddings:
+    model = "test-embedding"
+
+    async def aembed_query(self, text):
+        return [1.0] + [0.0] * 1535
+
+@pytest.fixture
+def streaming(monkeypatch):
+    llm = StreamingLLM()
+    monkeypatch.setattr(llm_service, "llm", llm)
+    monkeypatch.setattr(rag_module, "embedding_service", FixedEmbeddings())
+    set_vector_store(NumpyVectorStore())
+    yield llm
+    set_vector_store(None)
+
+async def add_book(db_session):
+    book = Book(title="Dune", author="Frank Herbert", genre="Sci-Fi", year_published=1965)
+    db_session.add(book)
+    await db_session.commit()
+    doc = Document(filename="dune.txt", file_path="/dev/null", status="ready", book_id=book.id)
+    db_session.add(doc)
+    await db_session.commit()
+    db_session.add(DocumentChunk(
+        document_id=doc.id, chunk_index=0, content="Paul Atreides is the hero.",
+        metadata_json='{"title": "Dune"}', embedding=[1.0] + [0.0] * 1535, book_id=book.id,
+    ))
+    await db_session.commit()
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+async def test_chat_stream_sends_sources_then_tokens(client, normal_user_token_headers, db_session, streaming):
+    await add_book(db_session)
+    response = await client.post(
+        f"{settings.API_V1_STR}/documents/chat/stream",
+        json={"question": "Who is the hero of Dune?"},
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert events[0] == ("sources", ["Found in Dune"])
+    assert "".join(data for event, data in events if event == "token") == "Paul is the hero."
+    assert events[-1][0] == "done"
+    done = events[-1][1]
+    assert done["intent"] == "CONTENT"
+    assert done["ttfb"] <= done["ttft"] <= done["seconds"]
+
+async def test_closing_the_stream_stops_generation(db_session, streaming):
+    await add_book(db_session)
+    answer = RAGService(db_session).stream_answer("Who is the hero of Dune?")
+    assert (await answer.__anext__())[0] == "sources"
+    assert await answer.__anext__() == ("token", "Paul ")
+    await answer.aclose()
+
+    assert streaming.closed
+    assert streaming.tokens_sent == 1
+    # A partial answer is never cached
+    assert len(answer_cache) == 0
@@ -0,0 +1,57 @@
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.document import Document, DocumentChunk
+from app.schemas.document import ChunkFilter
+from app.services import ingestion_service
+from app.services.ingestion_service import IngestionService
+from app.services.rag_service import RAGService
+from app.services.summarizer import SummaryRun
+
+class FakeEmbeddings:
+    model = "test-embedding"
+
+    async def aembed_documents(self, texts):
+        return [[0.4] * 1536 for _ in texts]
+
+async def add_book(db_session, tmp_path, title, genre, author, year):
+    book = Book(title=title, genre=genre, author=author, year_published=year)
+    db_session.add(book)
+    await db_session.commit()
+    path = tmp_path / f"{title}.txt"
+    path.write_text("\n".join(f"{title} line {i}." for i in range(300)))
+    doc = Document(filename=f"{title}.txt", file_path=str(path), book_id=book.id)
+    db_session.add(doc)
+    await db_session.commit()
+    return book.id, doc.id
+
+async def test_chunks_carry_filterable_book_columns(client, db_session, normal_user_token_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(ingestion_service, "embedding_service", FakeEmbeddings())
+
+    async def fake_summary(*args, **kwargs):
+        return "A summary"
+    monkeypatch.setattr(SummaryRun, "result", fake_summary)
+    dune_id, dune_doc = await add_book(db_session, tmp_path, "Dune", "Science Fiction", "Frank Herbert", 1965)
+    hobbit_id, hobbit_doc = await add_book(db_session, tmp_path, "The Hobbit", "Fantasy", "J.R.R. Tolkien", 1937)
+    for doc_id in (dune_doc, hobbit_doc):
+        await IngestionService(db_session).ingest_document(doc_id)
+
+    rag = RAGService(db_session)
+
+    async def matching_books(filters):
+        stmt = rag.apply_filters(select(DocumentChunk.book_id).distinct(), filters)
+        return set((await db_session.execute(stmt)).scalars().all())
+
+    assert await matching_books(ChunkFilter(genre="fantasy")) == {hobbit_id}
+    assert await matching_books(ChunkFilter(author="FRANK HERBERT")) == {dune_id}
+    assert await matching_books(ChunkFilter(year_from=1950)) == {dune_id}
+    assert await matching_books(ChunkFilter(year_to=1950, book_ids=[dune_id])) == set()
+    assert await matching_books(ChunkFilter()) == {dune_id, hobbit_id}
+    assert await rag.find_book_ids('"hobbit"') == [hobbit_id]
+
+    # Editing the book updates the columns of its existing chunks
+    response = await client.put(f"/api/v1/books/{dune_id}", json={"genre": "Classic"}, headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert await matching_books(ChunkFilter(genre="classic")) == {dune_id}
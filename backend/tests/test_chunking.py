@@ -0,0 +1,81 @@
+from app.services.chunking import SectionBuilder, StreamingChunker, iter_chunks, iter_batches
+from app.services.ingestion_service import IngestionService
+
+def make_pages(n_pages: int, words_per_page: int):
+    pages = []
+    for p in range(n_pages):
+        # Short lines, like text extracted from a PDF page
+        lines = [
+            " ".join(f"p{p}w{i}" for i in range(start, min(start + 8, words_per_page)))
+            for start in range(0, words_per_page, 8)
+        ]
+        pages.append((p + 1, "\n".join(lines) + "\n"))
+    return pages
+
+def test_streaming_chunks_keep_overlap_across_pages():
+    pages = make_pages(5, 120)
+    chunks = list(iter_chunks(pages, chunk_size=300, chunk_overlap=100))
+
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert all(len(c.content) <= 300 for c in chunks)
+    # Consecutive chunks share text, including where a page boundary falls between them
+    for prev, nxt in zip(chunks, chunks[1:]):
+        first_word = nxt.content.split()[0]
+        assert first_word in prev.content
+
+def test_streaming_chunks_record_page_numbers():
+    pages = make_pages(3, 300)
+    chunks = list(iter_chunks(pages, chunk_size=500, chunk_overlap=50))
+
+    assert chunks[0].page_number == 1
+    assert chunks[-1].page_number == 3
+    for c in chunks:
+        assert c.content.split()[0].startswith(f"p{c.page_number - 1}w")
+
+def test_streaming_chunker_buffer_is_bounded():
+    chunker = StreamingChunker(chunk_size=200, chunk_overlap=40)
+    for page_number, text in make_pages(50, 120):
+        chunker.feed(text, page_number)
+        assert len(chunker._buffer) <= len(text) + 200
+    assert chunker.flush()
+
+def test_batches_and_legacy_get_chunks():
+    chunks = list(iter_chunks(make_pages(4, 200), chunk_size=100, chunk_overlap=20))
+    batches = list(iter_batches(chunks, batch_size=7))
+    assert sum(len(b) for b in batches) == len(chunks)
+    assert all(len(b) <= 7 for b in batches)
+
+    service = IngestionService(db=None)
+    assert service.get_chunks("hello world") == ["hello world"]
+
+def test_pdf_reader_is_released_at_end_of_file(tmp_path):
+    from pypdf import PdfWriter
+    from app.services import chunking
+
+    path = str(tmp_path / "blank.pdf")
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    pages, cursor = chunking.read_pages(path, "blank.pdf", 0, max_pages=2)
+    assert (len(pages), cursor) == (2, 2)
+    assert chunking._reader_cache[0][0] == path
+    pages, cursor = chunking.read_pages(path, "blank.pdf", cursor, max_pages=2)
+    assert (len(pages), cursor) == (1, None)
+    assert chunking._reader_cache == (None, None)
+
+def test_section_builder_bounds_section_count():
+    text = "".join(page for _, page in make_pages(40, 200))
+    builder = SectionBuilder(section_chars=500, max_sections=8)
+    step = 1000
+    for start in range(0, len(text), step):
+        builder.feed(text[start:start + step], min((start + step) / len(text), 1.0))
+        assert len(builder._buffer) < len(text) // 8 + step
+    builder.flush()
+    sections = builder.take()
+
+    assert 8 <= len(sections) <= 9
+    assert "".join(sections) == text
+    assert builder.take() == []
@@ -0,0 +1,45 @@
+from app.services.chunking import iter_chunks
+from app.services.context_builder import ContextBuilder, count_tokens
+from app.services.rag_service import ChunkHit
+
+def hits_from_text(document_id, text):
+    return [
+        ChunkHit(id=document_id * 100 + c.index, document_id=document_id, book_id=document_id,
+                 chunk_index=c.index, content=c.content, metadata_json="{}")
+        for c in iter_chunks([(1, text)], chunk_size=1000, chunk_overlap=200)
+    ]
+
+def test_neighbouring_chunks_are_merged_without_their_overlap():
+    text = " ".join(f"word{i}" for i in range(1500))
+    hits = hits_from_text(1, text)
+    other = hits_from_text(2, "Another book entirely. " * 10)
+    # Retrieval order: chunks 4 and 3 of the first book, the other book, then chunk 5
+    retrieved = [hits[4], hits[3], other[0], hits[5]]
+
+    passages = ContextBuilder().merge(retrieved)
+    assert [[c.chunk_index for c in p.chunks] for p in passages] == [[3, 4, 5], [0]]
+    merged = passages[0].text
+    # Exactly the original span: each overlap was sent once
+    assert merged in text
+    assert merged.startswith(hits[3].content) and merged.endswith(hits[5].content)
+    assert len(merged) < sum(len(hits[i].content) for i in (3, 4, 5))
+
+def test_context_respects_the_token_budget_in_retrieval_order():
+    hits = [
+        ChunkHit(id=i, document_id=i, book_id=i, chunk_index=0, content=f"Passage {i}. " + "text " * 200, metadata_json="{}")
+        for i in range(5)
+    ]
+    budget = count_tokens(hits[0].content) + count_tokens(hits[1].content) + 10
+    built = ContextBuilder(max_tokens=budget).build(list(reversed(hits)))
+    assert [c.id for c in built.chunks] == [4, 3, 2]
+    # The third passage is cut to what is left of the budget
+    assert built.context.split("\n\n")[-1].startswith("Passage 2.")
+    assert count_tokens(built.context) <= budget + 1
+    assert built.tokens_saved > 0
+
+def test_history_keeps_the_most_recent_turns_that_fit():
+    history = [{"role": "user", "content": f"Question {i} " + "about the book " * 20} for i in range(10)]
+    builder = ContextBuilder(history_tokens=count_tokens("user: " + history[0]["content"]) * 3)
+    lines = builder.format_history(history).split("\n")
+    assert [line.split()[2] for line in lines] == ["7", "8", "9"]
+    assert builder.format_history([]) == "None"
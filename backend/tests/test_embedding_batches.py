@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.document import Document, DocumentChunk, IngestionJob
+from app.services import ingestion_service
+from app.services.batch_embedder import BatchEmbedder
+from app.services.ingestion_service import IngestionService
+
+class FlakyEmbeddings:
+    """Fails the calls whose (1-based) number is in `fail_on`."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.calls = 0
+        self.embedded = []
+        self.active = 0
+        self.max_active = 0
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        call = self.calls
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if call in self.fail_on:
+                raise RuntimeError("upstream error")
+            self.embedded.extend(texts)
+            return [[0.0] * 1536 for _ in texts]
+        finally:
+            self.active -= 1
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+
+async def test_batch_is_retried_after_transient_failure():
+    embedder = BatchEmbedder(max_in_flight=2)
+    client = FlakyEmbeddings(fail_on={1, 2})
+
+    vectors = await embedder.embed(client, ["a", "b"])
+
+    assert len(vectors) == 2
+    assert client.calls == 3
+    assert embedder.retries == 2
+
+async def test_concurrent_batches_are_capped():
+    embedder = BatchEmbedder(max_in_flight=3)
+    client = FlakyEmbeddings()
+
+    await asyncio.gather(*[embedder.embed(client, [str(i)]) for i in range(12)])
+
+    assert client.max_active == 3
+
+async def test_failed_ingestion_resumes_from_last_committed_batch(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_BATCHES_IN_FLIGHT", 1)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_RETRIES", 0)
+
+    book_path = tmp_path / "book.txt"
+    book_path.write_text("\n".join(f"Line {i} of a book that needs many chunks." for i in range(2000)))
+    doc = Document(filename="book.txt", file_path=str(book_path))
+    db_session.add(doc)
+    await db_session.commit()
+    doc_id = doc.id
+
+    # The third batch fails and there are no retries left
+    failing = FlakyEmbeddings(fail_on={3})
+    monkeypatch.setattr(ingestion_service, "embedding_service", failing)
+    with pytest.raises(RuntimeError):
+        await IngestionService(db_session).ingest_document(doc_id)
+
+    result = await db_session.execute(select(DocumentChunk.chunk_index).where(DocumentChunk.document_id == doc_id))
+    assert sorted(result.scalars().all()) == list(range(20))
+
+    # The second run only embeds the chunks that were not committed
+    healthy = FlakyEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", healthy)
+    await IngestionService(db_session).ingest_document(doc_id)
+
+    result = await db_session.execute(select(DocumentChunk.chunk_index).where(DocumentChunk.document_id == doc_id))
+    indexes = sorted(result.scalars().all())
+    assert indexes == list(range(len(indexes)))
+    assert len(healthy.embedded) == len(indexes) - 20
+
+async def test_full_reingest_of_ready_document_rebuilds_its_chunks(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_BATCH_SIZE", 10)
+
+    book_path = tmp_path / "book.txt"
+    book_path.write_text("\n".join(f"Line {i} of the first edition." for i in range(500)))
+    doc = Document(filename="book.txt", file_path=str(book_path))
+    db_session.add(doc)
+    await db_session.commit()
+    doc_id = doc.id
+
+    first = FlakyEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", first)
+    first_report = await IngestionService(db_session).ingest_document(doc_id)
+    assert (await db_session.get(Document, doc_id)).status == "ready"
+
+    # Re-ingesting a finished document re-chunks and re-embeds the current file
+    book_path.write_text("\n".join(f"Line {i} of the revised edition, now longer." for i in range(700)))
+    second = FlakyEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", second)
+    report = await IngestionService(db_session).ingest_document(doc_id)
+
+    result = await db_session.execute(
+        select(DocumentChunk.chunk_index, DocumentChunk.content)
+        .where(DocumentChunk.document_id == doc_id)
+        .order_by(DocumentChunk.chunk_index)
+    )
+    rows = result.all()
+    assert [index for index, _ in rows] == list(range(report["chunks"]))
+    assert report["chunks"] > first_report["chunks"]
+    assert report["reused"] == 0
+    assert all("revised edition" in content for _, content in rows)
+    assert len(second.embedded) == report["chunks"]
+
+async def legacy_document(db_session, tmp_path, chunks):
+    """A ready document ingested before runs and reports were recorded."""
+    book_path = tmp_path / "book.txt"
+    book_path.write_text("\n".join(f"Line {i} of a book ingested long ago." for i in range(500)))
+    doc = Document(filename="book.txt", file_path=str(book_path), status="ready", ingest_report=None)
+    db_session.add(doc)
+    await db_session.commit()
+    db_session.add_all([
+        DocumentChunk(document_id=doc.id, chunk_index=i, content=f"old chunk {i}", embedding=[0.0] * 1536)
+        for i in range(chunks)
+    ])
+    await db_session.commit()
+    return doc.id
+
+async def test_full_reingest_of_document_without_report_rebuilds(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_BATCH_SIZE", 10)
+    doc_id = await legacy_document(db_session, tmp_path, chunks=3)
+    embeddings = FlakyEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", embeddings)
+
+    report = await IngestionService(db_session).ingest_document(doc_id)
+
+    result = await db_session.execute(select(DocumentChunk.content).where(DocumentChunk.document_id == doc_id))
+    contents = result.scalars().all()
+    assert len(contents) == report["chunks"] > 3
+    assert not any(content.startswith("old chunk") for content in contents)
+    assert len(embeddings.embedded) == report["chunks"]
+
+async def test_retried_job_resumes_after_worker_stopped(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_BATCH_SIZE", 10)
+    doc_id = await legacy_document(db_session, tmp_path, chunks=20)
+    # The first attempt's worker died after committing 20 chunks; this is the second attempt
+    db_session.add(IngestionJob(document_id=doc_id, mode="full", status="running", attempts=2))
+    await db_session.commit()
+    embeddings = FlakyEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", embeddings)
+
+    report = await IngestionService(db_session).ingest_document(doc_id)
+
+    assert report["reused"] == 20
+    assert len(embeddings.embedded) == report["chunks"] - 20
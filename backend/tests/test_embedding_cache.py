@@ -0,0 +1,56 @@
+from sqlalchemy import select, func
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.services import ingestion_service
+from app.services.embedding_cache import EmbeddingCache, embedding_cache, text_hash
+from app.services.ingestion_service import IngestionService
+
+class CountingEmbeddings:
+    model = "test-embedding"
+
+    def __init__(self):
+        self.embedded = 0
+
+    async def aembed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(t))] * 1536 for t in texts]
+
+def test_text_hash_ignores_whitespace_differences():
+    assert text_hash("The  quick\nbrown fox ") == text_hash("The quick brown fox")
+    assert text_hash("The quick brown fox") != text_hash("The quick brown cat")
+
+async def test_second_upload_of_same_file_is_served_from_cache(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    client = CountingEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", client)
+
+    book_path = tmp_path / "book.txt"
+    book_path.write_text("\n".join(f"Sentence number {i} of the first edition." for i in range(500)))
+    first = Document(filename="book.txt", file_path=str(book_path))
+    second = Document(filename="book-copy.txt", file_path=str(book_path))
+    db_session.add_all([first, second])
+    await db_session.commit()
+    first_id, second_id = first.id, second.id
+
+    hits_before = embedding_cache.hits
+    await IngestionService(db_session).ingest_document(first_id)
+    embedded_once = client.embedded
+    assert embedded_once > 0
+
+    await IngestionService(db_session).ingest_document(second_id)
+    assert client.embedded == embedded_once
+    assert embedding_cache.hits - hits_before == embedded_once
+
+async def test_eviction_keeps_cache_under_max_entries(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_MAX_ENTRIES", 5)
+    cache = EmbeddingCache()
+    texts = [f"text {i}" for i in range(8)]
+    await cache.put_many(db_session, "test-embedding", texts, [[0.0] * 1536 for _ in texts])
+
+    await cache.evict(db_session)
+    await db_session.commit()
+
+    count = await db_session.execute(select(func.count()).select_from(EmbeddingCacheEntry))
+    assert count.scalar() == 5
@@ -0,0 +1,35 @@
+import time
+import numpy as np
+
+from app.services.fake_providers import FakeChatModel, HashingEmbeddings
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_service import llm_service
+
+async def test_hashing_embeddings_are_deterministic_unit_vectors():
+    embeddings = HashingEmbeddings()
+    first, second = await embeddings.aembed_documents(["The hobbit went on a journey", "A tax form"])
+    assert len(first) == 1536
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert first == HashingEmbeddings().vector("the Hobbit went on a journey!")
+    # Shared words bring texts closer
+    query = embeddings.vector("hobbit journey")
+    assert np.dot(query, first) > np.dot(query, second)
+    # Texts without words still get a usable direction
+    assert np.isclose(np.linalg.norm(embeddings.vector("")), 1.0)
+
+async def test_fake_chat_model_scripts_routing_and_echoes_the_rest():
+    model = FakeChatModel(response_tokens=3)
+    route = await llm_service.route_query("Tell me about Dune")
+    assert route.intent == "CONTENT"
+    assert (await model.ainvoke("Question: who is the hero of Dune?")).content == "hero of Dune?"
+
+async def test_fake_chat_model_simulates_latency_and_token_rate():
+    model = FakeChatModel(latency=0.05, tokens_per_second=100, response_tokens=5)
+    started = time.perf_counter()
+    chunks = [chunk.content async for chunk in model.astream("one two three four five")]
+    assert chunks == ["one ", "two ", "three ", "four ", "five "]
+    assert time.perf_counter() - started >= 0.05 + 4 * 0.01
+
+def test_tests_run_on_the_offline_providers():
+    assert isinstance(llm_gateway.chat.model, FakeChatModel)
+    assert isinstance(llm_gateway.embeddings.embeddings, HashingEmbeddings)
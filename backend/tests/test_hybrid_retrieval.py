@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import event, select
+
+from app.models.document import Document, DocumentChunk
+from app.services.rag_service import ChunkHit, RAGService, reciprocal_rank_fusion
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    lexical = ["quote", "name", "a"]
+    vector = ["b", "name", "c", "quote"]
+    fused = reciprocal_rank_fusion([lexical, vector], key=lambda x: x, limit=3, k=60)
+    # Found by both legs beats the top hit of only one leg
+    assert fused == ["name", "quote", "b"]
+
+async def add_chunks(db_session, texts):
+    doc = Document(filename="book.txt", file_path="/dev/null", status="ready")
+    db_session.add(doc)
+    await db_session.commit()
+    chunks = [
+        DocumentChunk(document_id=doc.id, chunk_index=i, content=text, metadata_json="{}", embedding=[0.1] * 1536)
+        for i, text in enumerate(texts)
+    ]
+    db_session.add_all(chunks)
+    await db_session.commit()
+    return [c.id for c in chunks]
+
+async def test_hybrid_search_fuses_concurrent_legs(db_session, monkeypatch):
+    ids = await add_chunks(db_session, [
+        "The desert planet and its spice.",
+        "Paul Atreides walks into the sietch.",
+        "A quiet chapter about the weather.",
+    ])
+
+    async def fake_vector_search(self, db, query, filters, limit):
+        # Semantically close, but misses the chunk naming the character
+        result = await db.execute(select(DocumentChunk).where(DocumentChunk.id.in_([ids[0], ids[2]])))
+        return sorted(result.scalars().all(), key=lambda c: c.id)
+    monkeypatch.setattr(RAGService, "vector_search", fake_vector_search)
+
+    rag = RAGService(db_session)
+    lexical = await rag.search_similar_chunks("Where is Atreides?", mode="lexical")
+    assert [c.id for c in lexical] == [ids[1]]
+
+    hybrid = await rag.search_similar_chunks("Where is Atreides?", mode="hybrid", limit=2)
+    assert ids[1] in [c.id for c in hybrid]
+    assert rag.last_retrieval["mode"] == "hybrid"
+    assert set(rag.last_retrieval["timings"]) == {"lexical", "vector", "fusion"}
+
+    with pytest.raises(ValueError):
+        await rag.search_similar_chunks("anything", mode="keyword")
+
+async def test_retrieval_projects_columns_without_embeddings(db_session):
+    ids = await add_chunks(db_session, ["Paul Atreides walks into the sietch."])
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", record)
+    try:
+        hits = await RAGService(db_session).search_similar_chunks("Atreides", mode="lexical")
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", record)
+
+    assert hits == [ChunkHit(ids[0], hits[0].document_id, None, 0, "Paul Atreides walks into the sietch.", "{}")]
+    assert statements and not any("embedding" in s for s in statements)
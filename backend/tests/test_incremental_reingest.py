@@ -0,0 +1,66 @@
+import json
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.document import Document, DocumentChunk
+from app.services import ingestion_service
+from app.services.chunking import iter_chunks, iter_pages
+from app.services.ingestion_service import IngestionService
+
+class CountingEmbeddings:
+    model = "test-embedding"
+
+    def __init__(self):
+        self.embedded = 0
+
+    async def aembed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[0.5] * 1536 for _ in texts]
+
+def write_book(path, chapters):
+    path.write_text("\n\n".join(
+        "\n".join(f"Chapter {c} line {i}: {text}" for i in range(40))
+        for c, text in chapters
+    ))
+
+async def test_incremental_reingest_only_recomputes_changed_chunks(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    client = CountingEmbeddings()
+    monkeypatch.setattr(ingestion_service, "embedding_service", client)
+
+    book_path = tmp_path / "book.txt"
+    chapters = [(c, "the original text of this chapter") for c in range(10)]
+    write_book(book_path, chapters)
+    doc = Document(filename="book.txt", file_path=str(book_path))
+    db_session.add(doc)
+    await db_session.commit()
+    doc_id = doc.id
+
+    full = await IngestionService(db_session).ingest_document(doc_id)
+    assert full["recomputed"] == full["chunks"] == client.embedded
+
+    # Edit one chapter in the middle of the book
+    chapters[5] = (5, "a rewritten version of this chapter")
+    write_book(book_path, chapters)
+    client.embedded = 0
+
+    report = await IngestionService(db_session).ingest_document(doc_id, mode="incremental")
+
+    assert report["reused"] > report["recomputed"] > 0
+    assert report["recomputed"] == client.embedded
+    assert report["reused"] + report["inserted"] == report["chunks"]
+
+    result = await db_session.execute(
+        select(DocumentChunk.chunk_index, DocumentChunk.content)
+        .where(DocumentChunk.document_id == doc_id)
+        .order_by(DocumentChunk.chunk_index)
+    )
+    rows = result.all()
+    expected = [c.content for c in iter_chunks(iter_pages(str(book_path), "book.txt"))]
+    assert [index for index, _ in rows] == list(range(len(expected)))
+    assert [content for _, content in rows] == expected
+
+    stored = await db_session.get(Document, doc_id)
+    await db_session.refresh(stored)
+    assert json.loads(stored.ingest_report)["mode"] == "incremental"
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import select, func
+
+from app.core import executors
+from app.core.config import settings
+from app.models.document import Document, DocumentChunk
+from app.services import ingestion_service
+from app.services.ingestion_service import IngestionService
+
+class FakeEmbeddings:
+    async def aembed_documents(self, texts):
+        return [[0.0] * 1536 for _ in texts]
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 2)
+    executors.shutdown_executors()
+    yield
+    executors.shutdown_executors()
+
+async def test_event_loop_responsive_during_large_ingestion(db_session, tmp_path, monkeypatch, process_pool):
+    monkeypatch.setattr(ingestion_service, "embedding_service", FakeEmbeddings())
+    # Large chunks keep the splitting work high and the number of stored rows low
+    monkeypatch.setattr(settings, "INGESTION_CHUNK_SIZE", 4000)
+
+    book_path = tmp_path / "large_book.txt"
+    line = "It was the best of times, it was the worst of times, it was the age of wisdom.\n"
+    book_path.write_text(line * 60000)
+
+    doc = Document(filename="large_book.txt", file_path=str(book_path))
+    db_session.add(doc)
+    await db_session.commit()
+
+    gaps = []
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(heartbeat())
+    try:
+        await IngestionService(db_session).ingest_document(doc.id)
+    finally:
+        ticker.cancel()
+
+    count = await db_session.execute(select(func.count(DocumentChunk.id)))
+    assert count.scalar() > 1000
+    assert doc.status == "ready"
+    # Parsing and splitting ran on other processes, so the loop kept ticking
+    assert len(gaps) > 10
+    assert max(gaps) < 0.25
@@ -0,0 +1,86 @@
+import json
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.document import Document, IngestionRun
+from app.services import ingestion_service
+from app.services.ingestion_metrics import IngestionMetrics, render_prometheus
+from app.services.ingestion_service import IngestionService
+
+class FakeEmbeddings:
+    model = "test-embedding"
+
+    async def aembed_documents(self, texts):
+        return [[0.2] * 1536 for _ in texts]
+
+class BrokenEmbeddings:
+    model = "broken-embedding"
+
+    async def aembed_documents(self, texts):
+        raise ValueError("upstream is down")
+
+async def make_document(db_session, tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_text("\n".join(f"Line {i} of a measured book." for i in range(600)))
+    doc = Document(filename="book.txt", file_path=str(path))
+    db_session.add(doc)
+    await db_session.commit()
+    return doc.id, path.stat().st_size
+
+def test_metrics_report_per_stage_throughput():
+    metrics = IngestionMetrics()
+    metrics.add("embed", 2.0, chunks=10, tokens=500)
+    metrics.add("embed", 2.0, chunks=10, tokens=500)
+    metrics.add("parse", 0.5, pages=4)
+    stages = metrics.as_dict()["stages"]
+    assert list(stages) == ["parse", "embed"]
+    assert stages["embed"] == {"seconds": 4.0, "calls": 2, "chunks": 20, "tokens": 1000,
+                               "chunks_per_second": 5.0, "tokens_per_second": 250.0}
+    assert stages["parse"]["pages_per_second"] == 8.0
+
+def test_prometheus_rendering_escapes_labels():
+    text = render_prometheus([("runs_total", "counter", "Runs.", [({"mode": 'a"b'}, 3)])])
+    assert text == '# HELP runs_total Runs.\n# TYPE runs_total counter\nruns_total{mode="a\\"b"} 3\n'
+
+async def test_ingestion_records_stage_timings(client, db_session, normal_user_token_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(ingestion_service, "embedding_service", FakeEmbeddings())
+    doc_id, file_bytes = await make_document(db_session, tmp_path)
+
+    report = await IngestionService(db_session).ingest_document(doc_id)
+
+    run = (await db_session.execute(select(IngestionRun))).scalars().one()
+    assert run.status == "succeeded"
+    assert run.file_bytes == file_bytes
+    assert run.text_bytes == file_bytes
+    assert run.chunks == report["chunks"] > 0
+    assert run.tokens > 0
+    stages = json.loads(run.stages)
+    assert set(stages) == {"parse", "chunk", "cache_lookup", "embed", "db_write"}
+    assert stages["chunk"]["chunks"] == stages["db_write"]["chunks"] == run.chunks
+
+    response = await client.get(f"/api/v1/documents/{doc_id}/runs", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["stages"]["embed"]["chunks"] == run.chunks
+
+    assert (await client.get("/api/v1/metrics")).status_code == 401
+    response = await client.get("/api/v1/metrics", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert 'ingestion_runs_total{mode="full",status="succeeded"} 1' in response.text
+    assert f'ingestion_stage_chunks{{stage="embed"}} {run.chunks}' in response.text
+    monkeypatch.setattr(settings, "METRICS_PUBLIC", True)
+    assert (await client.get("/api/v1/metrics")).status_code == 200
+
+async def test_failed_ingestion_is_recorded(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_RETRIES", 0)
+    monkeypatch.setattr(ingestion_service, "embedding_service", BrokenEmbeddings())
+    doc_id, _ = await make_document(db_session, tmp_path)
+
+    with pytest.raises(ValueError):
+        await IngestionService(db_session).ingest_document(doc_id)
+
+    run = (await db_session.execute(select(IngestionRun))).scalars().one()
+    assert run.status == "failed"
+    assert run.error == "ValueError: upstream is down"
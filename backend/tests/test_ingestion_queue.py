@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.crud.crud_ingestion_job import ingestion_job as crud_ingestion_job
+from app.models.document import Document, IngestionJob
+from app.services import ingestion_service
+from app.services.ingestion_worker import IngestionWorker
+
+class FakeEmbeddings:
+    model = "test-embedding"
+
+    async def aembed_documents(self, texts):
+        return [[0.1] * 1536 for _ in texts]
+
+async def make_document(db_session, tmp_path, name="book.txt"):
+    path = tmp_path / name
+    path.write_text("\n".join(f"Line {i} of a queued book." for i in range(800)))
+    doc = Document(filename=name, file_path=str(path))
+    db_session.add(doc)
+    await db_session.commit()
+    return doc.id
+
+async def test_ingest_endpoint_queues_a_job(client, db_session, normal_user_token_headers, tmp_path):
+    doc_id = await make_document(db_session, tmp_path)
+
+    response = await client.post(f"/api/v1/documents/{doc_id}/ingest", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "processing"
+
+    response = await client.post(f"/api/v1/documents/{doc_id}/ingest", headers=normal_user_token_headers)
+    assert response.status_code == 409
+
+    response = await client.get("/api/v1/documents/queue", headers=normal_user_token_headers)
+    assert response.json() == {"queued": 1, "running": 0}
+
+    response = await client.get(f"/api/v1/documents/{doc_id}/jobs", headers=normal_user_token_headers)
+    jobs = response.json()
+    assert len(jobs) == 1
+    assert jobs[0]["status"] == "queued"
+
+async def test_worker_runs_jobs_and_reports_progress(db_session, session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_PROCESS_WORKERS", 0)
+    monkeypatch.setattr(ingestion_service, "embedding_service", FakeEmbeddings())
+    first = await make_document(db_session, tmp_path, "first.txt")
+    second = await make_document(db_session, tmp_path, "second.txt")
+    await crud_ingestion_job.enqueue(db_session, document_id=first)
+    await crud_ingestion_job.enqueue(db_session, document_id=second, priority=5)
+
+    worker = IngestionWorker(session_factory, slots=1, worker_id="test-worker")
+    assert await worker.poll_once() == 1
+    # The higher priority job is leased first
+    assert [job_id for job_id in worker.running] == [2]
+    await asyncio.gather(*worker.running.values())
+    assert await worker.poll_once() == 1
+    await asyncio.gather(*worker.running.values())
+
+    async with session_factory() as session:
+        jobs = (await session.execute(select(IngestionJob))).scalars().all()
+        docs = (await session.execute(select(Document))).scalars().all()
+    assert all(job.status == "succeeded" for job in jobs)
+    assert all(job.chunks_done == job.chunks_total > 0 for job in jobs)
+    assert all(doc.status == "ready" for doc in docs)
+
+async def test_stalled_jobs_are_requeued_then_failed(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_JOB_MAX_ATTEMPTS", 2)
+    doc_id = await make_document(db_session, tmp_path)
+    job = await crud_ingestion_job.enqueue(db_session, document_id=doc_id)
+
+    for expected in ("queued", "failed"):
+        leased = await crud_ingestion_job.lease(db_session, worker_id="crashed-worker")
+        assert [j.id for j in leased] == [job.id]
+        # The worker died: no heartbeat arrives before the lease runs out
+        leased[0].lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await db_session.commit()
+
+        assert await crud_ingestion_job.recover_stalled(db_session) == 1
+        await db_session.refresh(job)
+        assert job.status == expected
+
+    doc = await db_session.get(Document, doc_id)
+    await db_session.refresh(doc)
+    assert doc.status == "failed"
+
+async def test_lost_lease_waits_for_the_cancelled_ingestion(db_session, session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_JOB_HEARTBEAT_SECONDS", 0.01)
+    doc_id = await make_document(db_session, tmp_path)
+    await crud_ingestion_job.enqueue(db_session, document_id=doc_id)
+    [job] = await crud_ingestion_job.lease(db_session, worker_id="test-worker")
+    unwound = []
+
+    async def slow_ingest(self, document_id, mode="full"):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Cleanup that still needs the ingestion session
+            await asyncio.sleep(0.01)
+            unwound.append(document_id)
+            raise
+
+    async def lost_heartbeat(*args, **kwargs):
+        return False
+    monkeypatch.setattr(ingestion_service.IngestionService, "ingest_document", slow_ingest)
+    monkeypatch.setattr(crud_ingestion_job, "heartbeat", lost_heartbeat)
+
+    await IngestionWorker(session_factory, slots=1, worker_id="test-worker").run_job(job)
+    assert unwound == [doc_id]
+
+async def test_racing_ingest_requests_enqueue_one_job(client, db_session, normal_user_token_headers, tmp_path, monkeypatch):
+    doc_id = await make_document(db_session, tmp_path)
+    await crud_ingestion_job.enqueue(db_session, document_id=doc_id)
+
+    # Both requests passed the check before either inserted; the database rejects the second
+    async def nothing_active(*args, **kwargs):
+        return None
+    monkeypatch.setattr(crud_ingestion_job, "get_active_for_document", nothing_active)
+    response = await client.post(f"/api/v1/documents/{doc_id}/ingest", headers=normal_user_token_headers)
+    assert response.status_code == 409
+
+    jobs = (await db_session.execute(select(IngestionJob))).scalars().all()
+    assert len(jobs) == 1
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from sqlalchemy import select, func, update
+
+from app.core.config import settings
+from app.models.llm_response_cache import LLMResponseCacheEntry
+from app.services import llm_service as llm_module
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service import llm_service
+
+class CountingLLM:
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=f"Summary {len(self.calls)}")
+
+async def test_review_summary_is_served_from_cache(db_session, monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(llm_service, "llm", llm)
+    reviews = ["Loved it", "A bit long"]
+
+    first = await llm_service.generate_review_summary(reviews, db_session.bind)
+    assert await llm_service.generate_review_summary(reviews, db_session.bind) == first
+    assert len(llm.calls) == 1
+    # Deterministic, not the chat temperature
+    assert llm.calls[0] == {"temperature": settings.LLM_CACHED_TEMPERATURE}
+
+    # Opting out regenerates; different input misses
+    assert await llm_service.generate_review_summary(reviews, db_session.bind, cache=False) != first
+    await llm_service.generate_review_summary(["Loved it"], db_session.bind)
+    assert len(llm.calls) == 3
+
+async def test_template_version_change_misses(db_session, monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(llm_service, "llm", llm)
+    await llm_service.generate_summary("Some text", db_session.bind)
+    monkeypatch.setitem(llm_module.TEMPLATE_VERSIONS, "summary", 2)
+    await llm_service.generate_summary("Some text", db_session.bind)
+    assert len(llm.calls) == 2
+
+async def test_expired_entries_miss_and_are_evicted(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_MAX_ENTRIES", 3)
+    cache = LLMResponseCache()
+    engine = db_session.bind
+    for i in range(5):
+        await cache.put(engine, "test-llm", "summary", 1, f"prompt {i}", f"response {i}")
+    await db_session.execute(
+        update(LLMResponseCacheEntry)
+        .where(LLMResponseCacheEntry.response == "response 0")
+        .values(last_used_at=datetime.now(timezone.utc) - timedelta(days=settings.LLM_CACHE_TTL_DAYS + 1))
+    )
+    await db_session.commit()
+    assert await cache.get(engine, "test-llm", "summary", 1, "prompt 0") is None
+    assert await cache.get(engine, "test-llm", "summary", 1, "prompt 4") == "response 4"
+
+    assert await cache.evict(db_session) == 2
+    await db_session.commit()
+    count = await db_session.execute(select(func.count()).select_from(LLMResponseCacheEntry))
+    assert count.scalar() == 3
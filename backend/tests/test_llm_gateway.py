@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.services.llm_gateway import GatedChatModel, GatedEmbeddings, LLMGateway
+
+class SlowChat:
+    model_name = "fake-chat"
+    temperature = 0.7
+
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        return SimpleNamespace(content=f"reply to {prompt}")
+
+    async def astream(self, prompt):
+        for word in ("a", "b", "c"):
+            yield SimpleNamespace(content=word)
+
+class CountingEmbeddings:
+    model = "fake-embedding"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [1.0, 2.0]
+
+@pytest.fixture
+def gateway():
+    return LLMGateway()
+
+async def test_identical_concurrent_requests_are_coalesced(gateway):
+    chat = SlowChat()
+    model = GatedChatModel(gateway, chat)
+    replies = await asyncio.gather(model.ainvoke("same"), model.ainvoke("same"), model.ainvoke("other"))
+    assert [r.content for r in replies] == ["reply to same", "reply to same", "reply to other"]
+    assert chat.calls == 2
+    stats = gateway.stats["fake-chat"]
+    assert (stats.requests, stats.coalesced) == (2, 1)
+
+    # Once finished, the same prompt goes upstream again
+    await model.ainvoke("same")
+    assert chat.calls == 3
+
+    embeddings = CountingEmbeddings()
+    gated = GatedEmbeddings(gateway, embeddings)
+    assert gated.model == "fake-embedding"
+    await asyncio.gather(gated.aembed_query("q"), gated.aembed_query("q"))
+    assert embeddings.calls == 1
+
+async def test_per_model_concurrency_limit_and_queue_time(gateway, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MODEL_CONCURRENCY", {"fake-chat": 1})
+    chat = SlowChat()
+    model = GatedChatModel(gateway, chat)
+    await asyncio.gather(*(model.ainvoke(f"prompt {i}") for i in range(3)))
+    assert chat.peak == 1
+    stats = gateway.stats["fake-chat"]
+    assert stats.queue_seconds > 0.02
+    assert stats.upstream_seconds >= 0.06
+    assert (stats.waiting, stats.in_flight) == (0, 0)
+
+async def test_cancelled_follower_does_not_cancel_the_shared_request(gateway):
+    chat = SlowChat()
+    model = GatedChatModel(gateway, chat)
+    leader = asyncio.ensure_future(model.ainvoke("same"))
+    follower = asyncio.ensure_future(model.ainvoke("same"))
+    await asyncio.sleep(0)
+    follower.cancel()
+    assert (await leader).content == "reply to same"
+    assert chat.calls == 1
+
+async def test_stream_holds_a_slot_until_closed(gateway):
+    model = GatedChatModel(gateway, SlowChat())
+    stream = model.astream("prompt")
+    assert (await stream.__anext__()).content == "a"
+    assert gateway.stats["fake-chat"].in_flight == 1
+    await stream.aclose()
+    assert gateway.stats["fake-chat"].in_flight == 0
@@ -0,0 +1,59 @@
+import numpy as np
+
+from app.services import rag_service as rag_module
+from app.services.query_embedding_cache import QueryEmbeddingCache
+from app.services.rag_service import RAGService
+from app.services.vector_store import NumpyVectorStore, set_vector_store
+
+class CountingEmbeddings:
+    model = "test-embedding"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        return [float(len(text))] * 1536
+
+async def test_repeated_queries_are_embedded_once():
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+    client = CountingEmbeddings()
+
+    first = await cache.embed_query(client, "List some fantasy books")
+    again = await cache.embed_query(client, "  list some   FANTASY books")
+    assert client.calls == 1
+    assert again is first
+    assert first.dtype == np.float32 and first.shape == (1536,)
+    assert not first.flags.writeable
+    assert cache.stats()["hit_rate"] == 0.5
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", "a") is not None  # a is now most recently used
+    cache.put("m", "c", [3.0])
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None and cache.get("m", "c") is not None
+    assert cache.evicted == 1
+    # Different models never share entries
+    assert cache.get("other", "a") is None
+
+    now = [1000.0]
+    monkeypatch.setattr("app.services.query_embedding_cache.time.monotonic", lambda: now[0])
+    cache.put("m", "d", [4.0])
+    now[0] += 61
+    assert cache.get("m", "d") is None
+    assert len(cache) == 1
+
+async def test_vector_search_reuses_cached_query_embedding(db_session, monkeypatch):
+    client = CountingEmbeddings()
+    monkeypatch.setattr(rag_module, "embedding_service", client)
+    set_vector_store(NumpyVectorStore())
+    try:
+        rag = RAGService(db_session)
+        await rag.search_similar_chunks("List some fantasy books", mode="vector")
+        await rag.search_similar_chunks("list some fantasy books", mode="vector")
+    finally:
+        set_vector_store(None)
+    assert client.calls == 1
@@ -0,0 +1,63 @@
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.book import Book
+from app.services.chat_metrics import chat_metrics
+from app.services.llm_service import llm_service, parse_route
+from app.services.rag_service import RAGService
+
+def test_parse_route_validates_and_falls_back():
+    route = parse_route('```json\n{"intent": "metadata", "genre": "Fantasy", "limit": 3, "title": "none"}\n```')
+    assert (route.intent, route.genre, route.limit, route.title) == ("METADATA", "Fantasy", 3, None)
+    assert route.metadata_params() == {"genre": "Fantasy", "limit": 3}
+
+    # Not JSON, or JSON that fails validation: keep the intent word, drop the criteria
+    assert parse_route("The intent is NON_BOOK.").intent == "NON_BOOK"
+    assert parse_route('{"intent": "METADATA", "genre": ["Fantasy"]}').intent == "METADATA"
+    assert parse_route("no idea").intent == "CONTENT"
+
+def test_parse_route_clamps_limit_and_keeps_criteria():
+    route = parse_route('{"intent": "METADATA", "genre": "Fantasy", "author": "Tolkien", "title": "The Hobbit", "limit": 100}')
+    assert (route.intent, route.genre, route.author, route.title, route.limit) == ("METADATA", "Fantasy", "Tolkien", "The Hobbit", 50)
+    assert parse_route('{"intent": "METADATA", "limit": 0}').limit == 1
+    assert parse_route('{"intent": "METADATA", "limit": "many"}').limit is None
+
+class RecordingLLM:
+    model_name = "test-llm"
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.prompts = []
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        for marker, reply in self.replies.items():
+            if marker in prompt:
+                return SimpleNamespace(content=reply)
+        return SimpleNamespace(content="unexpected")
+
+    async def astream(self, prompt):
+        yield await self.ainvoke(prompt)
+
+@pytest.mark.parametrize("router, calls", [("structured", 1), ("sequential", 2)])
+async def test_metadata_question_routes_in_one_call(db_session, monkeypatch, router, calls):
+    monkeypatch.setattr(settings, "RAG_ROUTER", router)
+    monkeypatch.setattr(settings, "RAG_ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "RAG_SPECULATIVE_RETRIEVAL", False)
+    llm = RecordingLLM({
+        "extract its intent": '{"intent": "METADATA", "genre": "Fantasy", "limit": 5}',
+        "decide the intent": "METADATA",
+        "Extract search criteria": '{"genre": "Fantasy", "limit": 5}',
+    })
+    monkeypatch.setattr(llm_service, "llm", llm)
+    db_session.add(Book(title="The Hobbit", author="J.R.R. Tolkien", genre="Fantasy", year_published=1937))
+    await db_session.commit()
+
+    rag = RAGService(db_session)
+    answer, sources = await rag.answer_question("List some fantasy books")
+    assert "The Hobbit" in answer and sources == ["Database Query"]
+    assert len(llm.prompts) == calls
+    assert rag.last_answer["intent"] == "METADATA"
+    assert rag.last_answer["ttft"] == rag.last_answer["seconds"]
+    assert any(row["intent"] == "METADATA" and row["path"] == router for row in chat_metrics.stats())
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.crud.crud_book import book as crud_book
+from app.models.book import Book
+from app.models.review import Review
+from app.models.user import User
+from app.services.llm_service import llm_service
+from app.services.review_summaries import ReviewSummaryRefresher
+
+class RecordingLLM:
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0)
+        return SimpleNamespace(content=f"Summary {len(self.prompts)}")
+
+@pytest.fixture
+def llm(monkeypatch):
+    recording = RecordingLLM()
+    monkeypatch.setattr(llm_service, "llm", recording)
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_DEBOUNCE_SECONDS", 0.0)
+    return recording
+
+async def add_book(db_session, reviews):
+    book = Book(title="Dune", author="Frank Herbert", genre="Sci-Fi", year_published=1965)
+    db_session.add_all([book] + [User(email=f"reader{i}@example.com", hashed_password="x") for i in range(10)])
+    await db_session.commit()
+    for text in reviews:
+        await add_review(db_session, book.id, text)
+    return book.id
+
+async def add_review(db_session, book_id, text, user_id=None):
+    review = Review(book_id=book_id, user_id=user_id or 1, review_text=text, rating=4)
+    db_session.add(review)
+    await db_session.commit()
+    await crud_book.mark_review_summary_stale(db_session, book_id=book_id)
+    return review.id
+
+async def summary_state(session_factory, book_id):
+    async with session_factory() as session:
+        book = await session.get(Book, book_id)
+        return book.ai_review_summary, book.review_summary_dirty_at, book.review_summary_updates
+
+async def test_new_reviews_are_folded_into_the_summary(db_session, session_factory, llm, monkeypatch):
+    book_id = await add_book(db_session, ["Epic world building", "Slow start"])
+    refresher = ReviewSummaryRefresher(session_factory)
+
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_DEBOUNCE_SECONDS", 60.0)
+    assert await refresher.poll_once() == 0 # Still inside the debounce window
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_DEBOUNCE_SECONDS", 0.0)
+    assert await refresher.poll_once() == 1
+    assert len(llm.prompts) == 1 # Both reviews in one call
+    assert await summary_state(session_factory, book_id) == ("Summary 1", None, 0)
+
+    await add_review(db_session, book_id, "The ending is perfect")
+    assert await refresher.poll_once() == 1
+    assert "Summary 1" in llm.prompts[-1] and "The ending is perfect" in llm.prompts[-1]
+    assert "Epic world building" not in llm.prompts[-1]
+    assert await summary_state(session_factory, book_id) == ("Summary 2", None, 1)
+
+    # Full rebuild once enough incremental updates have piled up
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_FULL_REBUILD_EVERY", 1)
+    await add_review(db_session, book_id, "Too long for me")
+    await refresher.poll_once()
+    assert all(text in llm.prompts[-1] for text in ("Epic world building", "The ending is perfect", "Too long for me"))
+    assert await summary_state(session_factory, book_id) == ("Summary 3", None, 0)
+
+async def test_deleted_review_forces_a_full_rebuild(db_session, session_factory, llm):
+    book_id = await add_book(db_session, ["Epic world building", "Slow start"])
+    refresher = ReviewSummaryRefresher(session_factory)
+    await refresher.poll_once()
+
+    slow = (await db_session.execute(select(Review).where(Review.review_text == "Slow start"))).scalar_one()
+    await db_session.delete(slow)
+    await db_session.commit()
+    await crud_book.mark_review_summary_stale(db_session, book_id=book_id, deleted=True)
+
+    await refresher.poll_once()
+    assert "Epic world building" in llm.prompts[-1] and "Slow start" not in llm.prompts[-1]
+    assert "Summary 1" not in llm.prompts[-1]
+
+async def test_concurrent_refreshers_summarize_once(db_session, session_factory, llm):
+    await add_book(db_session, ["Epic world building"])
+    first, second = ReviewSummaryRefresher(session_factory), ReviewSummaryRefresher(session_factory)
+    assert sum(await asyncio.gather(first.poll_once(), second.poll_once())) == 1
+    assert len(llm.prompts) == 1
+
+async def test_summary_endpoint_serves_the_stale_summary(client, db_session, session_factory, llm):
+    book_id = await add_book(db_session, ["Epic world building"])
+    await ReviewSummaryRefresher(session_factory).poll_once()
+    await add_review(db_session, book_id, "Slow start", user_id=2)
+
+    response = await client.get(f"/api/v1/books/{book_id}/summary")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["review_summary"] == "Summary 1"
+    assert body["review_summary_stale"] is True
+    assert body["average_rating"] == 4.0
+    assert len(llm.prompts) == 1 # Not regenerated on the read path
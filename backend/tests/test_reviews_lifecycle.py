@@ -78,11 +78,12 @@ async def test_review_lifecycle(client: AsyncClient, db_session, normal_user_tok
     assert len(response.json()) == 0
 
     # 10. Check AI Summary invalidation
-    # We expected the summary to be cleared (None) after reviews were added/deleted.
-    # Since we can't easily check the DB state for 'None' via API if the API generates it on fly,
-    # we can check if the API returns a NEW summary or attempts to generate one.
-    # But a better check is inspecting the DB directly.
-    
-    result = await db_session.execute(text(f"SELECT ai_review_summary FROM books WHERE id = {book_id}"))
-    summary = result.scalar()
-    assert summary is None, "AI Summary should be invalidated (None) after review operations"
\ No newline at end of file
+    # The old summary is kept (served stale) and the book is queued for a background refresh;
+    # a deleted review forces a full rebuild.
+    result = await db_session.execute(
+        text(f"SELECT ai_review_summary, review_summary_dirty_at, review_summary_rebuild FROM books WHERE id = {book_id}")
+    )
+    summary, dirty_at, rebuild = result.one()
+    assert summary == "Old Summary"
+    assert dirty_at is not None, "AI Summary should be marked stale after review operations"
+    assert rebuild
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.document import Document, DocumentChunk
+from app.services import rag_service as rag_module
+from app.services.chat_metrics import chat_metrics
+from app.services.llm_service import llm_service
+from app.services.rag_service import RAGService
+from app.services.vector_store import NumpyVectorStore, set_vector_store
+
+class SlowRouterLLM:
+    """The router takes a while; records what had started by the time it answered."""
+    model_name = "test-llm"
+
+    def __init__(self, route, events):
+        self.route = route
+        self.events = events
+
+    async def ainvoke(self, prompt, **kwargs):
+        if "extract its intent" in prompt:
+            await asyncio.sleep(0.05)
+            self.events.append("routed")
+            return SimpleNamespace(content=self.route)
+        return SimpleNamespace(content="An answer.")
+
+    async def astream(self, prompt):
+        yield await self.ainvoke(prompt)
+
+class RecordingEmbeddings:
+    model = "test-embedding"
+
+    def __init__(self, events):
+        self.events = events
+
+    async def aembed_query(self, text):
+        self.events.append("embedded")
+        return [1.0] + [0.0] * 1535
+
+@pytest.fixture
+def speculative(monkeypatch):
+    events = []
+    monkeypatch.setattr(settings, "RAG_ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "RAG_SPECULATIVE_RETRIEVAL", True)
+    monkeypatch.setattr(rag_module, "embedding_service", RecordingEmbeddings(events))
+    set_vector_store(NumpyVectorStore())
+    yield events
+    set_vector_store(None)
+
+async def add_books(db_session):
+    dune = Book(title="Dune", author="Frank Herbert", genre="Sci-Fi", year_published=1965)
+    hobbit = Book(title="The Hobbit", author="J.R.R. Tolkien", genre="Fantasy", year_published=1937)
+    db_session.add_all([dune, hobbit])
+    await db_session.commit()
+    for book, count in ((dune, 4), (hobbit, 1)):
+        doc = Document(filename=f"{book.title}.txt", file_path="/dev/null", status="ready", book_id=book.id)
+        db_session.add(doc)
+        await db_session.commit()
+        db_session.add_all([
+            DocumentChunk(document_id=doc.id, chunk_index=i, content=f"{book.title} part {i}",
+                          metadata_json=f'{{"title": "{book.title}"}}', embedding=[1.0] + [0.0] * 1535,
+                          book_id=book.id)
+            for i in range(count)
+        ])
+        await db_session.commit()
+
+def counts():
+    return dict(chat_metrics.speculation)
+
+async def test_content_question_uses_speculative_hits(db_session, monkeypatch, speculative):
+    await add_books(db_session)
+    monkeypatch.setattr(llm_service, "llm", SlowRouterLLM('{"intent": "CONTENT"}', speculative))
+    before = counts()
+
+    answer, sources = await RAGService(db_session).answer_question("Tell me about the desert")
+    # Retrieval started before the router answered, and was not repeated
+    assert speculative == ["embedded", "routed"]
+    assert answer == "An answer." and sources
+    assert chat_metrics.speculation["used"] == before["used"] + 1
+    assert chat_metrics.speculation_inflight == 0
+
+async def test_title_filter_redoes_search_when_too_few_hits(db_session, monkeypatch, speculative):
+    await add_books(db_session)
+    monkeypatch.setattr(settings, "RAG_SPECULATIVE_CANDIDATES", 4)
+    monkeypatch.setattr(llm_service, "llm", SlowRouterLLM('{"intent": "CONTENT", "title": "The Hobbit"}', speculative))
+    before = counts()
+
+    rag = RAGService(db_session)
+    _, sources = await rag.answer_question("Who is Bilbo in The Hobbit?")
+    assert sources == ["Found in The Hobbit"]
+    assert chat_metrics.speculation["redone"] == before["redone"] + 1
+
+async def test_other_intents_discard_speculation(db_session, monkeypatch, speculative):
+    await add_books(db_session)
+    monkeypatch.setattr(llm_service, "llm", SlowRouterLLM('{"intent": "METADATA", "genre": "Fantasy"}', speculative))
+    before = counts()
+
+    answer, _ = await RAGService(db_session).answer_question("List some fantasy books")
+    assert "The Hobbit" in answer
+    assert chat_metrics.speculation["discarded"] == before["discarded"] + 1
+    assert chat_metrics.speculation_inflight == 0
+
+async def test_speculation_is_bounded(db_session, monkeypatch, speculative):
+    monkeypatch.setattr(settings, "RAG_SPECULATIVE_MAX_INFLIGHT", 0)
+    before = counts()
+    assert RAGService(db_session).start_speculation("anything") is None
+    assert chat_metrics.speculation["skipped"] == before["skipped"] + 1
+
+async def test_speculation_cancelled_before_it_starts_frees_its_slot(db_session, speculative):
+    before = chat_metrics.speculation_inflight
+    rag = RAGService(db_session)
+    task = rag.start_speculation("anything")
+    assert chat_metrics.speculation_inflight == before + 1
+    # Discarded before the task ever ran, e.g. when the router fails right away
+    await rag.discard_speculation(task)
+    assert task.cancelled()
+    assert chat_metrics.speculation_inflight == before == 0
@@ -0,0 +1,83 @@
+import os
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.storage import storage
+
+async def upload(client, headers, name, content):
+    return await client.post(
+        "/api/v1/documents/upload",
+        files={"file": (name, content, "text/plain")},
+        headers=headers,
+    )
+
+async def test_duplicate_uploads_share_one_file(client, db_session, normal_user_token_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "root", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 1000)
+    monkeypatch.setattr(settings, "STORAGE_DELETE_GRACE_SECONDS", 0)
+    content = b"The same book, uploaded twice.\n" * 200
+
+    first = (await upload(client, normal_user_token_headers, "book.txt", content)).json()
+    second = (await upload(client, normal_user_token_headers, "book (1).txt", content)).json()
+    other = (await upload(client, normal_user_token_headers, "book.txt", b"A different book.")).json()
+
+    assert first["content_hash"] == second["content_hash"] != other["content_hash"]
+    assert first["file_size"] == len(content)
+    paths = (await db_session.execute(select(Document.file_path).order_by(Document.id))).scalars().all()
+    assert paths[0] == paths[1] != paths[2]
+    # Same-named uploads no longer overwrite each other
+    with open(paths[2], "rb") as f:
+        assert f.read() == b"A different book."
+    with open(paths[0], "rb") as f:
+        assert f.read() == content
+    assert not os.listdir(tmp_path / "tmp")
+
+    await client.delete(f"/api/v1/documents/{first['id']}", headers=normal_user_token_headers)
+    assert os.path.exists(paths[0])
+    await client.delete(f"/api/v1/documents/{second['id']}", headers=normal_user_token_headers)
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[2])
+
+async def test_upload_over_size_limit_is_rejected(client, db_session, normal_user_token_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "root", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 100)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 1000)
+
+    response = await upload(client, normal_user_token_headers, "big.txt", b"x" * 1001)
+    assert response.status_code == 413
+    assert not os.listdir(tmp_path / "tmp")
+    assert (await db_session.execute(select(Document))).scalars().first() is None
+
+    response = await upload(client, normal_user_token_headers, "small.txt", b"x" * 1000)
+    assert response.status_code == 200
+
+async def test_sweep_removes_files_released_during_the_grace_period(db_session, session_factory, tmp_path, monkeypatch):
+    from app.services.ingestion_worker import IngestionWorker
+
+    monkeypatch.setattr(storage, "root", str(tmp_path))
+    monkeypatch.setattr(settings, "STORAGE_DELETE_GRACE_SECONDS", 60)
+    orphan, kept, fresh = (storage.path_for(c * 64) for c in "abc")
+    uploading = str(tmp_path / "tmp" / "partial")
+    for path in (orphan, kept, fresh, uploading):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("book")
+    for path in (orphan, kept, uploading):
+        os.utime(path, (0, 0))
+    db_session.add(Document(filename="kept.txt", file_path=kept))
+    await db_session.commit()
+
+    # Released while still within the grace period: kept for now
+    assert not await storage.release(db_session, fresh)
+
+    worker = IngestionWorker(session_factory, slots=1)
+    assert await worker.sweep_storage() == 1
+    assert not os.path.exists(orphan)
+    assert all(os.path.exists(path) for path in (kept, fresh, uploading))
+    # Swept at most once per STORAGE_SWEEP_SECONDS
+    os.utime(fresh, (0, 0))
+    assert await worker.sweep_storage() == 0
+    worker._last_sweep = None
+    assert await worker.sweep_storage() == 1
+    assert not os.path.exists(fresh)
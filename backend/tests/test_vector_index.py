@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.db.vector_index import apply_search_settings, create_index_sql, distance, ivfflat_lists, supports_iterative_scan
+from app.models.document import DocumentChunk
+
+def compile_order_by(metric):
+    stmt = select(DocumentChunk.id).order_by(distance(DocumentChunk.embedding, [0.1] * 1536, metric)).limit(3)
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+def test_distance_operator_matches_metric():
+    assert "<=>" in compile_order_by("cosine")
+    assert "<->" in compile_order_by("l2")
+    with pytest.raises(ValueError):
+        compile_order_by("dot")
+
+def test_index_sql_uses_matching_operator_class(monkeypatch):
+    monkeypatch.setattr(settings, "HNSW_M", 24)
+    assert create_index_sql("document_chunks", "embedding", "hnsw", "cosine") == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_chunks_embedding_hnsw_cosine "
+        "ON document_chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 64)"
+    )
+    sql = create_index_sql("document_chunks", "embedding", "ivfflat", "l2", rows=250_000)
+    assert "USING ivfflat (embedding vector_l2_ops) WITH (lists = 250)" in sql
+    assert ivfflat_lists(500) == 10
+    assert ivfflat_lists(4_000_000) == 2000
+
+async def test_search_settings_are_skipped_off_postgres(db_session):
+    await apply_search_settings(db_session)
+
+def test_iterative_scan_needs_pgvector_0_8():
+    assert supports_iterative_scan("0.8.0")
+    assert supports_iterative_scan("1.0")
+    assert not supports_iterative_scan("0.7.4")
+    assert not supports_iterative_scan(None)
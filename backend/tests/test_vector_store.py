@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.crud.crud_book import book as crud_book
+from app.models.book import Book
+from app.models.document import Document, DocumentChunk
+from app.schemas.document import ChunkFilter
+from app.services import rag_service as rag_module
+from app.services.rag_service import RAGService
+from app.services.vector_store import NumpyVectorStore, VectorRecord, set_vector_store
+
+DIM = 8
+
+def random_store(metric, rows=200):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((rows, DIM)).astype(np.float32)
+    store = NumpyVectorStore(dim=DIM, metric=metric)
+    store._upsert([
+        VectorRecord(i + 1, i // 10 + 1, vector, book_id=i % 5 + 1, genre="Sci-Fi" if i % 2 else "Fantasy")
+        for i, vector in enumerate(vectors)
+    ])
+    return store, vectors
+
+@pytest.mark.parametrize("metric", ["cosine", "l2"])
+def test_search_matches_brute_force(metric):
+    store, vectors = random_store(metric)
+    query = np.random.default_rng(1).standard_normal(DIM).astype(np.float32)
+    if metric == "cosine":
+        expected = 1 - (vectors @ query) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    else:
+        expected = np.linalg.norm(vectors - query, axis=1)
+
+    hits = store.search_sync(query, 10)
+    assert [h.chunk_id for h in hits] == list(np.argsort(expected)[:10] + 1)
+    assert np.allclose([h.distance for h in hits], np.sort(expected)[:10], atol=1e-5)
+
+def test_filters_and_delete():
+    store, _ = random_store("cosine")
+    query = np.ones(DIM, dtype=np.float32)
+
+    hits = store.search_sync(query, 50, ChunkFilter(book_ids=[2], genre="sci-fi"))
+    assert hits and all(h.book_id == 2 for h in hits)
+    hits = store.search_sync(query, 500, ChunkFilter(exclude_book_ids=[1, 2]))
+    assert {h.book_id for h in hits} == {3, 4, 5}
+
+    store._delete(document_id=1)
+    assert len(store) == 190
+    assert all(h.document_id != 1 for h in store.search_sync(query, 500))
+
+    # Deleting a quarter of the rows compacts the matrix
+    store._delete(document_id=2)
+    store._delete(document_id=3)
+    store._delete(document_id=4)
+    assert store._size == 200
+    store._delete(document_id=5)
+    assert store._size == len(store) == 150
+    assert len(store.search_sync(query, 500)) == 150
+
+def test_save_and_load_memory_mapped(tmp_path):
+    store, vectors = random_store("l2")
+    store._delete(chunk_ids=[1])
+    store.save(str(tmp_path))
+
+    loaded = NumpyVectorStore.load(str(tmp_path), mmap=True)
+    assert isinstance(loaded._vectors, np.memmap)
+    assert len(loaded) == 199
+    query = vectors[5]
+    assert loaded.search_sync(query, 3) == store.search_sync(query, 3)
+
+    # Writes copy the mapped matrix into memory first
+    loaded._upsert([VectorRecord(1000, 99, query, book_id=9)])
+    assert loaded.search_sync(query, 1, ChunkFilter(book_ids=[9]))[0].chunk_id == 1000
+
+async def test_sync_follows_the_database(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_STORE_SYNC_SECONDS", 0)
+    doc = Document(filename="book.txt", file_path="/dev/null", status="ready")
+    db_session.add(doc)
+    await db_session.commit()
+    chunks = [
+        DocumentChunk(document_id=doc.id, chunk_index=i, content=f"chunk {i}", metadata_json="{}",
+                      embedding=[float(i + 1)] + [0.0] * 1535, book_id=7)
+        for i in range(3)
+    ]
+    db_session.add_all(chunks)
+    await db_session.commit()
+
+    store = NumpyVectorStore(metric="l2")
+    hits = await store.search(db_session, [3.0] + [0.0] * 1535, 2)
+    assert [h.chunk_id for h in hits] == [chunks[2].id, chunks[1].id]
+    assert hits[0].book_id == 7
+
+    await db_session.delete(chunks[2])
+    await db_session.commit()
+    hits = await store.search(db_session, [3.0] + [0.0] * 1535, 2)
+    assert [h.chunk_id for h in hits] == [chunks[1].id, chunks[0].id]
+
+async def test_sync_picks_up_book_edits(db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "VECTOR_STORE_SYNC_SECONDS", 0)
+    book = Book(title="Dune", author="Frank Herbert", genre="Fantasy", year_published=1965)
+    db_session.add(book)
+    await db_session.commit()
+    doc = Document(book_id=book.id, filename="dune.txt", file_path="/dev/null", status="ready")
+    db_session.add(doc)
+    await db_session.commit()
+    db_session.add_all([
+        DocumentChunk(document_id=doc.id, chunk_index=i, content=f"chunk {i}", metadata_json="{}",
+                      embedding=[float(i + 1)] + [0.0] * 1535, book_id=book.id, genre="Fantasy",
+                      author="Frank Herbert", year_published=1965)
+        for i in range(3)
+    ])
+    await db_session.commit()
+
+    store = NumpyVectorStore(metric="l2")
+    query = [1.0] + [0.0] * 1535
+    assert len(await store.search(db_session, query, 5, ChunkFilter(genre="fantasy"))) == 3
+    store.save(str(tmp_path))
+
+    await crud_book.update(db_session, db_obj=book, obj_in={"genre": "Sci-Fi", "year_published": 1966})
+    assert await store.search(db_session, query, 5, ChunkFilter(genre="fantasy")) == []
+    hits = await store.search(db_session, query, 5, ChunkFilter(genre="sci-fi", year_from=1966))
+    assert len(hits) == 3
+
+    # A store saved before the edit catches up on its first sync
+    loaded = NumpyVectorStore.load(str(tmp_path))
+    assert len(await loaded.search(db_session, query, 5, ChunkFilter(genre="sci-fi"))) == 3
+
+async def test_rag_vector_mode_uses_configured_store(db_session, monkeypatch):
+    doc = Document(filename="book.txt", file_path="/dev/null", status="ready")
+    db_session.add(doc)
+    await db_session.commit()
+    near = DocumentChunk(document_id=doc.id, chunk_index=0, content="near", metadata_json="{}",
+                         embedding=[1.0] + [0.0] * 1535)
+    far = DocumentChunk(document_id=doc.id, chunk_index=1, content="far", metadata_json="{}",
+                        embedding=[0.0, 1.0] + [0.0] * 1534)
+    db_session.add_all([near, far])
+    await db_session.commit()
+
+    class FakeEmbeddings:
+        async def aembed_query(self, text):
+            return [1.0, 0.1] + [0.0] * 1534
+    monkeypatch.setattr(rag_module, "embedding_service", FakeEmbeddings())
+    set_vector_store(NumpyVectorStore())
+    try:
+        chunks = await RAGService(db_session).search_similar_chunks("anything", limit=2, mode="vector")
+    finally:
+        set_vector_store(None)
+    assert [c.content for c in chunks] == ["near", "far"]
+    # Hits carry the store's distance instead of the embedding
+    assert chunks[0].distance < chunks[1].distance
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.executors import shutdown_executors
+from app.db.session import AsyncSessionLocal
+from app.services.ingestion_worker import IngestionWorker
+from app.services.llm_gateway import llm_gateway
+from app.services.review_summaries import ReviewSummaryRefresher
+
+async def main(slots: int):
+    worker = IngestionWorker(AsyncSessionLocal, slots=slots)
+    refresher = ReviewSummaryRefresher(AsyncSessionLocal)
+
+    def stop():
+        worker.stop()
+        refresher.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    try:
+        runs = [worker.run()]
+        if settings.REVIEW_SUMMARY_BACKGROUND:
+            runs.append(refresher.run())
+        await asyncio.gather(*runs)
+    finally:
+        await llm_gateway.aclose()
+        shutdown_executors()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued document ingestion jobs and refresh review summaries.")
+    parser.add_argument("--slots", type=int, default=settings.INGESTION_WORKER_SLOTS, help="Concurrent jobs")
+    args = parser.parse_args()
+    asyncio.run(main(args.slots))